@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any
 import datetime
 from pydantic import BaseModel
 import models, database
 from models import User
 from middleware import get_current_user
+from services import study_rollup
 
 router = APIRouter(
     prefix="/api/analytics",
@@ -29,16 +30,16 @@ class SessionResponse(BaseModel):
     duration_seconds: int
 
 @router.post("/session/start", response_model=SessionResponse)
-def start_session(
+async def start_session(
     session_data: SessionStart, 
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Check if document exists and belongs to user
-    document = db.query(models.Document).filter(
+    document = await db.scalar(select(models.Document).where(
         models.Document.id == session_data.document_id,
         models.Document.user_id == current_user.id
-    ).first()
+    ))
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
         
@@ -49,22 +50,23 @@ def start_session(
     )
     
     db.add(new_session)
-    db.commit()
-    db.refresh(new_session)
+    await study_rollup.record_start(db, current_user.id, new_session)
+    await db.commit()
+    await db.refresh(new_session)
     
     return new_session
 
 @router.post("/session/end", response_model=SessionResponse)
-def end_session(
+async def end_session(
     session_data: SessionEnd, 
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Verify session belongs to user's document
-    session = db.query(models.StudySession).join(models.Document).filter(
+    session = await db.scalar(select(models.StudySession).join(models.Document).where(
         models.StudySession.id == session_data.session_id,
         models.Document.user_id == current_user.id
-    ).first()
+    ))
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
         
@@ -81,35 +83,33 @@ def end_session(
     
     session.end_time = end_time
     session.duration_seconds = duration
+    await study_rollup.record_end(db, current_user.id, session, duration)
     
-    db.commit()
-    db.refresh(session)
+    await db.commit()
+    await db.refresh(session)
     
     return session
 
 @router.get("/stats")
-def get_stats(
+async def get_stats(
     timezone_offset: int = 0, 
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Filter all queries by user's documents
+    # Everything below comes from the user's daily rollups for this offset
+    days = await study_rollup.load_days(db, current_user.id, timezone_offset)
+    seconds_by_date = {}
+    for day in days:
+        seconds_by_date[day.local_date] = seconds_by_date.get(day.local_date, 0) + day.seconds
+
     # 1. Total Study Time
-    total_seconds = db.query(func.sum(models.StudySession.duration_seconds)).join(
-        models.Document
-    ).filter(
-        models.Document.user_id == current_user.id
-    ).scalar() or 0
+    total_seconds = sum(seconds_by_date.values())
     
     # 2. Activity Breakdown
-    breakdown = db.query(
-        models.StudySession.activity_type, 
-        func.count(models.StudySession.id)
-    ).join(models.Document).filter(
-        models.Document.user_id == current_user.id
-    ).group_by(models.StudySession.activity_type).all()
-    
-    activity_stats = {type_: count for type_, count in breakdown}
+    activity_stats = {}
+    for day in days:
+        if day.sessions:
+            activity_stats[day.activity_type] = activity_stats.get(day.activity_type, 0) + day.sessions
     
     # Calculate client-side "today"
     # timezone_offset is in minutes (e.g., 300 for EST).
@@ -120,33 +120,15 @@ def get_stats(
     today_local = client_now.date()
     
     # 3. Current Streak
-    # Get all unique dates where a session occurred, converted to LOCAL time
-    sessions = db.query(models.StudySession.start_time).join(models.Document).filter(
-        models.Document.user_id == current_user.id
-    ).order_by(models.StudySession.start_time.desc()).all()
+    # Local dates with at least one session started, in the client's time zone
+    dates = sorted({day.local_date for day in days if day.sessions}, reverse=True)
     
     streak = 0
-    if sessions:
-        # Use calculated local today
+    if dates:
         today = today_local
         
-        # Convert all session timestamps to local dates
-        # Note: session.start_time is UTC (tz-aware or naive-as-utc depending on driver)
-        # We assume stored as UTC.
-        local_dates = set()
-        for s in sessions:
-            utc_dt = s.start_time
-            if utc_dt.tzinfo is None:
-                utc_dt = utc_dt.replace(tzinfo=datetime.timezone.utc)
-            local_dt = utc_dt.astimezone() # Converts to system local time
-            local_dates.add(local_dt.date())
-            
-        dates = sorted(list(local_dates), reverse=True)
-        
         # Check if we studied today or yesterday to keep streak alive
-        if not dates:
-            streak = 0
-        elif dates[0] == today:
+        if dates[0] == today:
             streak = 1
             current_check = today - datetime.timedelta(days=1)
             idx = 1
@@ -182,32 +164,7 @@ def get_stats(
     for i in range(7):
         current_day_date = start_of_week + datetime.timedelta(days=i)
         
-        # Create local datetime range for this day
-        # midnight local
-        start_of_day_local = datetime.datetime.combine(current_day_date, datetime.time.min)
-        # next midnight local
-        end_of_day_local = datetime.datetime.combine(current_day_date + datetime.timedelta(days=1), datetime.time.min)
-        
-        # Convert to UTC for DB query
-        # UTC = Local + Offset (minutes)
-        # We use the offset provided by the client
-        start_of_day_utc = start_of_day_local + datetime.timedelta(minutes=timezone_offset)
-        end_of_day_utc = end_of_day_local + datetime.timedelta(minutes=timezone_offset)
-        
-        # Ensure they are timezone-aware (UTC) for SQLAlchemy comparison
-        start_of_day_utc = start_of_day_utc.replace(tzinfo=datetime.timezone.utc)
-        end_of_day_utc = end_of_day_utc.replace(tzinfo=datetime.timezone.utc)
-        
-        # Ensure db timestamps are treated as UTC for comparison if they are naive
-        # (SQLAlchemy + SQLite often returns naive datetimes)
-        
-        daily_sum = db.query(func.sum(models.StudySession.duration_seconds)).join(
-            models.Document
-        ).filter(
-            models.StudySession.start_time >= start_of_day_utc,
-            models.StudySession.start_time < end_of_day_utc,
-            models.Document.user_id == current_user.id
-        ).scalar() or 0
+        daily_sum = seconds_by_date.get(current_day_date, 0)
         
         daily_stats.append({
             "date": current_day_date.strftime("%Y-%m-%d"),
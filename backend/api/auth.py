@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from database import get_db
 from models import User, Session as SessionModel
+import middleware
 import secrets
 import datetime
 import os
@@ -51,7 +53,7 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 @router.post("/login", response_model=LoginResponse)
-def login(credentials: LoginRequest, db: Session = Depends(get_db)):
+async def login(credentials: LoginRequest, db: AsyncSession = Depends(get_db)):
     """Authenticate user with hardcoded credentials from .env"""
     env_users = get_env_users()
     
@@ -69,12 +71,12 @@ def login(credentials: LoginRequest, db: Session = Depends(get_db)):
         )
     
     # Get or create user in database
-    user = db.query(User).filter(User.username == credentials.username).first()
+    user = await db.scalar(select(User).where(User.username == credentials.username))
     if not user:
         user = User(username=credentials.username)
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     
     # Create session token
     token = secrets.token_urlsafe(32)
@@ -86,55 +88,27 @@ def login(credentials: LoginRequest, db: Session = Depends(get_db)):
         expires_at=expires_at
     )
     db.add(session)
-    db.commit()
+    await db.commit()
     
     return LoginResponse(token=token, username=user.username)
 
 @router.post("/logout")
-def logout(
+async def logout(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Invalidate current session"""
     token = credentials.credentials
     
-    session = db.query(SessionModel).filter(SessionModel.token == token).first()
+    session = await db.scalar(select(SessionModel).where(SessionModel.token == token))
     if session:
-        db.delete(session)
-        db.commit()
+        await db.delete(session)
+        await middleware.revoke(db, token)
+        await db.commit()
     
     return {"message": "Logged out successfully"}
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-):
+async def get_current_user(current_user: User = Depends(middleware.get_current_user)):
     """Get current authenticated user"""
-    token = credentials.credentials
-    
-    session = db.query(SessionModel).filter(SessionModel.token == token).first()
-    
-    if not session:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired session"
-        )
-    
-    # Check if session expired
-    if session.expires_at < datetime.datetime.utcnow():
-        db.delete(session)
-        db.commit()
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Session expired"
-        )
-    
-    user = db.query(User).filter(User.id == session.user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found"
-        )
-    
-    return user
+    return current_user
@@ -1,29 +1,124 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
 import models, schemas, database
-from services import parser, ai
+from services import ai, conversation, metrics, retrieval
 from models import User
 from middleware import get_current_user
+from api import sse
+import anyio
+import asyncio
 import datetime
+import time
 
 router = APIRouter(
     prefix="/api/chat",
     tags=["chat"]
 )
 
+# User turns (including the current one) used as the retrieval query
+RETRIEVAL_QUERY_TURNS = 3
+
 @router.post("/send/{document_id}", response_model=schemas.ChatMessage)
 async def send_message(
     document_id: int, 
     message: schemas.ChatMessageCreate, 
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
+    current_user: User = Depends(get_current_user)
+):
+    chat_history, summary_text, context_text, overview_text = await _prepare_chat(db, document_id, message, current_user)
+    
+    # 5. Generate AI response
+    ai_response_text = await ai.generate_chat_response(
+        chat_history, context_text, overview_text, summary_text=summary_text
+    )
+    
+    # 6. Save AI response
+    return await _save_assistant_message(db, document_id, ai_response_text)
+
+@router.post("/stream/{document_id}")
+async def stream_message(
+    document_id: int, 
+    message: schemas.ChatMessageCreate, 
+    db: AsyncSession = Depends(database.get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Same as /send, but relays the reply as server-sent events:
+    "token" events carry text fragments, and a final "done" event carries the
+    saved message with time-to-first-token, total latency and token usage
+    (including prompt-cache reads and writes).
+    """
+    chat_history, summary_text, context_text, overview_text = await _prepare_chat(db, document_id, message, current_user)
+    
+    async def event_stream():
+        started = time.perf_counter()
+        first_token_ms = None
+        parts = []
+        saved = None
+        usage = {}
+        try:
+            async for text in ai.stream_chat_response(
+                chat_history, context_text, overview_text, usage, summary_text=summary_text
+            ):
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                    metrics.observe("chat_stream.ttft_ms", first_token_ms)
+                parts.append(text)
+                yield sse.event("token", {"text": text})
+        except asyncio.CancelledError:
+            metrics.incr("chat_stream.cancelled")
+            raise
+        finally:
+            total_ms = (time.perf_counter() - started) * 1000
+            metrics.observe("chat_stream.total_ms", total_ms)
+            # Persist whatever was generated, even if the client went away.
+            # Shielded: after a disconnect the request's cancel scope would
+            # cancel the save at its first await
+            if parts:
+                with anyio.CancelScope(shield=True):
+                    saved = await _save_assistant_message(db, document_id, "".join(parts))
+        
+        yield sse.event("done", {
+            "message": schemas.ChatMessage.model_validate(saved).model_dump(mode="json") if saved else None,
+            "ttft_ms": round(first_token_ms, 1) if first_token_ms is not None else None,
+            "total_ms": round(total_ms, 1),
+            "usage": usage or None
+        })
+    
+    return sse.response(event_stream())
+
+@router.get("/history/{document_id}", response_model=List[schemas.ChatMessage])
+async def get_chat_history(
+    document_id: int, 
+    db: AsyncSession = Depends(database.get_db),
     current_user: User = Depends(get_current_user)
 ):
+    # Verify document belongs to user
+    document = await db.scalar(select(models.Document).where(
+        models.Document.id == document_id,
+        models.Document.user_id == current_user.id
+    ))
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    messages = await db.scalars(select(models.ChatMessage).where(
+        models.ChatMessage.document_id == document_id
+    ).order_by(models.ChatMessage.timestamp.asc()))
+    return messages.all()
+
+async def _prepare_chat(db: AsyncSession, document_id: int, message: schemas.ChatMessageCreate, current_user: User):
+    """
+    Save the user's message and return (recent history, conversation summary,
+    retrieved context, document overview).
+    """
     # 1. Verify document exists and belongs to user
-    document = db.query(models.Document).filter(
+    document = await db.scalar(select(models.Document).where(
         models.Document.id == document_id,
         models.Document.user_id == current_user.id
-    ).first()
+    ))
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
@@ -35,56 +130,49 @@ async def send_message(
         timestamp=datetime.datetime.now(datetime.timezone.utc)
     )
     db.add(user_msg)
-    db.commit()
-    db.refresh(user_msg)
-    
-    # 3. Get context from document
-    context_text = parser.extract_text(document.file_path, document.file_type)
-    if not context_text:
-        raise HTTPException(status_code=400, detail="Could not extract text from document")
+    await db.commit()
     
-    # 4. Get recent history (last 10 messages) for context
-    history = db.query(models.ChatMessage).filter(
-        models.ChatMessage.document_id == document_id
-    ).order_by(models.ChatMessage.timestamp.desc()).limit(10).all()
+    # 3. Recent turns within the history budget, plus a rolling summary of
+    #    everything older (compacted here when the window overflows)
+    summary_text, chat_history = await conversation.build_history(db, document_id)
     
-    # Reverse to chronological order and format for AI
-    chat_history = [
-        {"role": msg.role, "content": msg.content} 
-        for msg in reversed(history)
-    ]
-    
-    # 5. Generate AI response
-    ai_response_text = ai.generate_chat_response(chat_history, context_text)
+    # 4. Document overview and the passages most relevant to the question
+    #    and recent turns
+    recent_questions = [msg["content"] for msg in chat_history if msg["role"] == "user"][-RETRIEVAL_QUERY_TURNS:]
+    overview_text, context_text = await run_in_threadpool(
+        _retrieve, document_id, document.summary, "\n".join(recent_questions)
+    )
+    if not overview_text and not context_text:
+        raise HTTPException(status_code=400, detail="Could not extract text from document")
     
-    # 6. Save AI response
+    return chat_history, summary_text, context_text, overview_text
+
+def _retrieve(document_id: int, summary: Optional[str], query: str) -> Tuple[str, str]:
+    """
+    Return (overview, context). Loading the index, or building it for
+    documents ingested before retrieval existed, is CPU-bound, so this runs
+    in a thread with its own session.
+    """
+    db = database.SessionLocal()
+    try:
+        document = db.get(models.Document, document_id)
+        # Stable overview (cacheable prefix). The ingest-time summary covers
+        # the whole document in far fewer tokens than its opening chunks
+        if summary:
+            overview_text, overview_ordinals = summary, set()
+        else:
+            overview_text, overview_ordinals = retrieval.document_overview(db, document)
+        return overview_text, retrieval.select_context(db, document, query, exclude=overview_ordinals)
+    finally:
+        db.close()
+
+async def _save_assistant_message(db: AsyncSession, document_id: int, content: str) -> models.ChatMessage:
     ai_msg = models.ChatMessage(
         document_id=document_id,
         role="assistant",
-        content=ai_response_text,
+        content=content,
         timestamp=datetime.datetime.now(datetime.timezone.utc)
     )
     db.add(ai_msg)
-    db.commit()
-    db.refresh(ai_msg)
-    
+    await db.commit()
     return ai_msg
-
-@router.get("/history/{document_id}", response_model=List[schemas.ChatMessage])
-async def get_chat_history(
-    document_id: int, 
-    db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
-):
-    # Verify document belongs to user
-    document = db.query(models.Document).filter(
-        models.Document.id == document_id,
-        models.Document.user_id == current_user.id
-    ).first()
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
-    
-    messages = db.query(models.ChatMessage).filter(
-        models.ChatMessage.document_id == document_id
-    ).order_by(models.ChatMessage.timestamp.asc()).all()
-    return messages
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-import shutil
 import os
 from models import Document, User
 import models, schemas, database
-from services import parser, ai
+from services import classifier, jobs, storage, study_rollup
 from middleware import get_current_user
 
 router = APIRouter(
@@ -13,104 +14,160 @@ router = APIRouter(
     tags=["documents"]
 )
 
-UPLOAD_DIR = os.path.join(os.getcwd(), "uploads")
-
 @router.post("/upload", response_model=schemas.Document)
 async def upload_document(
     file: UploadFile = File(...), 
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Create upload directory if it doesn't exist
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    
-    # Generate file path
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
+    extension = os.path.splitext(file.filename)[1].lower()
     
-    # Save file
+    # Stream to content-addressed storage, hashing as we go
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        content_hash, staged_path, size_bytes = await run_in_threadpool(
+            storage.save_stream, file.file
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Could not save file: {str(e)}")
     
     # Determine file type
-    file_type = os.path.splitext(file.filename)[1].lower().replace(".", "").upper()
+    file_type = extension.replace(".", "").upper()
     
-    # Create database record
-    # Extract text for categorization
-    text = parser.extract_text(file_path, file_type)
-    category = "Uncategorized"
-    if text:
-        category = ai.suggest_category(text)
-
+    stored = await db.run_sync(storage.acquire, content_hash, staged_path, size_bytes)
     db_document = models.Document(
         filename=file.filename,
-        file_path=file_path,
+        file_path=stored.file_path,
         file_type=file_type,
-        category=category,
+        content_hash=content_hash,
+        status="pending",
         user_id=current_user.id
     )
     
+    # Known bytes: reuse the earlier ingestion. Another user's copy only
+    # lends its summary; the category comes from this user's own classifier
+    processed = await db.run_sync(storage.find_processed, content_hash, current_user.id)
+    own_copy = processed is not None and processed.user_id == current_user.id
+    if processed:
+        db_document.summary = processed.summary
+    if own_copy:
+        db_document.category = processed.category
+        db_document.status = "ready"
+    
     db.add(db_document)
-    db.commit()
-    db.refresh(db_document)
+    await db.commit()
+    await db.refresh(db_document)
+
+    if not own_copy:
+        # Extraction and categorization run in the background; stages
+        # already done for these bytes are served from their caches
+        job = await db.run_sync(jobs.create_job, db_document)
+        jobs.enqueue(job.id)
     
     return db_document
 
 @router.get("/", response_model=List[schemas.Document])
-def read_documents(
+async def read_documents(
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: User = Depends(get_current_user)
 ):
-    documents = db.query(models.Document).filter(
+    documents = await db.scalars(select(models.Document).where(
         models.Document.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
-    return documents
+    ).offset(skip).limit(limit))
+    return documents.all()
+
+@router.get("/{document_id}/status", response_model=schemas.DocumentStatus)
+async def get_document_status(
+    document_id: int, 
+    db: AsyncSession = Depends(database.get_db),
+    current_user: User = Depends(get_current_user)
+):
+    document = await db.scalar(select(models.Document).where(
+        models.Document.id == document_id,
+        models.Document.user_id == current_user.id
+    ))
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    job = await db.scalar(select(models.IngestionJob).where(
+        models.IngestionJob.document_id == document_id
+    ).order_by(models.IngestionJob.id.desc()))
+    
+    return schemas.DocumentStatus(
+        document_id=document.id,
+        status=document.status,
+        category=document.category,
+        job=job
+    )
+
+@router.get("/jobs/{job_id}", response_model=schemas.IngestionJob)
+async def get_job(
+    job_id: int, 
+    db: AsyncSession = Depends(database.get_db),
+    current_user: User = Depends(get_current_user)
+):
+    job = await db.scalar(select(models.IngestionJob).join(models.Document).where(
+        models.IngestionJob.id == job_id,
+        models.Document.user_id == current_user.id
+    ))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 @router.put("/{document_id}/category", response_model=schemas.Document)
 async def update_category(
     document_id: int, 
     category: str, 
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: User = Depends(get_current_user)
 ):
-    document = db.query(models.Document).filter(
+    document = await db.scalar(select(models.Document).where(
         models.Document.id == document_id,
         models.Document.user_id == current_user.id
-    ).first()
+    ))
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
     document.category = category
-    db.commit()
-    db.refresh(document)
+    await db.commit()
+    # Corrections train the user's category classifier
+    await run_in_threadpool(_learn_category, document.id, category)
+    await db.refresh(document)
     return document
 
+def _learn_category(document_id: int, category: str):
+    # Parses the document (and a first model's training set), so it runs in a
+    # thread with its own session, like ingestion stages
+    db = database.SessionLocal()
+    try:
+        classifier.learn(db, db.get(models.Document, document_id), category)
+    finally:
+        db.close()
+
 @router.delete("/{document_id}")
-def delete_document(
+async def delete_document(
     document_id: int, 
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: User = Depends(get_current_user)
 ):
-    document = db.query(models.Document).filter(
+    document = await db.scalar(select(models.Document).where(
         models.Document.id == document_id,
         models.Document.user_id == current_user.id
-    ).first()
+    ))
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    # Remove file from filesystem
-    if os.path.exists(document.file_path):
-        try:
-            os.remove(document.file_path)
-        except Exception as e:
-            print(f"Error deleting file {document.file_path}: {e}")
-            # Continue to delete from DB even if file delete fails
+    content_hash, file_path = document.content_hash, document.file_path
+    await db.run_sync(storage.release, document)
+    await db.run_sync(classifier.forget_document, document)
+    # Its study sessions go with it; stats rebuild from the rest
+    await study_rollup.invalidate(db, current_user.id)
             
-    db.delete(document)
-    db.commit()
+    await db.delete(document)
+    await db.commit()
+
+    # Remove file from filesystem once no other document uses it
+    await db.run_sync(storage.collect, content_hash, file_path)
     
     return {"message": "Document deleted successfully"}
@@ -0,0 +1,21 @@
+"""
+Server-sent event helpers for the streaming endpoints.
+"""
+
+import json
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+def event(name: str, data: dict) -> str:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+def response(events) -> StreamingResponse:
+    # X-Accel-Buffering: nginx would otherwise hold events until the response ends
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # A client that disconnects while the generator waits between events
+        # leaves it suspended; closing it runs its cleanup now, not at garbage collection
+        background=BackgroundTask(events.aclose)
+    )
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any, Literal, Optional
 import models, database
-from services import parser, ai
+from services import ai, coverage, text_store
+from services.singleflight import SingleFlight
 from models import User
 from middleware import get_current_user
+from api import sse
 import os
 import datetime
 
@@ -13,48 +16,109 @@ router = APIRouter(
     tags=["study-tools"]
 )
 
+# Concurrent identical generation requests share one provider call
+flashcard_flights = SingleFlight("flashcards")
+quiz_flights = SingleFlight("quiz")
+
 @router.post("/flashcards/{document_id}")
 async def create_flashcards(
     document_id: int, 
     num_cards: int = 5, 
-    db: Session = Depends(database.get_db),
+    mode: Literal["standard", "coverage"] = "standard", 
+    db: AsyncSession = Depends(database.get_db),
+    current_user: User = Depends(get_current_user)
+):
+    document = await db.scalar(select(models.Document).where(
+        models.Document.id == document_id,
+        models.Document.user_id == current_user.id
+    ))
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    key = (current_user.id, document_id, num_cards, mode)
+    return await flashcard_flights.do(key, lambda: _generate_flashcards(document_id, num_cards, mode))
+
+@router.post("/flashcards/{document_id}/stream")
+async def stream_flashcards(
+    document_id: int, 
+    num_cards: int = 5, 
+    db: AsyncSession = Depends(database.get_db),
     current_user: User = Depends(get_current_user)
 ):
-    document = db.query(models.Document).filter(
+    """
+    Generate flashcards as server-sent events: each card is saved and sent in
+    a "flashcard" event as soon as the model finishes it, then a "done" event
+    reports the count and whether the output was cut off.
+    """
+    document = await db.scalar(select(models.Document).where(
         models.Document.id == document_id,
         models.Document.user_id == current_user.id
-    ).first()
+    ))
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    # Extract text
-    text = parser.extract_text(document.file_path, document.file_type)
+    text = await text_store.get_text_async(db, document)
     if not text:
         raise HTTPException(status_code=400, detail="Could not extract text from document")
     
-    # Query existing flashcards to avoid duplicates
-    existing_cards = db.query(models.Flashcard).filter(models.Flashcard.document_id == document_id).all()
-    exclude_topics = [card.front for card in existing_cards] if existing_cards else None
-
-    # Generate flashcards with exclusion list
-    flashcards_data = ai.generate_flashcards(text, num_cards=num_cards, exclude_topics=exclude_topics)
+    exclude_topics = await _existing_fronts(db, document_id)
     
-    # Save to DB
-    new_cards = []
-    for card in flashcards_data:
-        new_card = models.Flashcard(
-            document_id=document_id,
-            front=card["front"],
-            back=card["back"]
-        )
-        db.add(new_card)
-        new_cards.append(new_card)
+    async def event_stream():
+        stats = {}
+        count = 0
+        async for card in ai.stream_flashcards(text, num_cards=num_cards, exclude_topics=exclude_topics, stats=stats):
+            new_card = models.Flashcard(document_id=document_id, front=card["front"], back=card["back"])
+            db.add(new_card)
+            await db.commit()
+            await db.refresh(new_card)
+            count += 1
+            yield sse.event("flashcard", _card_json(new_card))
+        yield sse.event("done", {"count": count, **stats})
     
-    db.commit()
-    for card in new_cards:
-        db.refresh(card)
+    return sse.response(event_stream())
+
+async def _generate_flashcards(document_id: int, num_cards: int, mode: str):
+    # Uses its own session: the work is shared by every coalesced request
+    async with database.AsyncSessionLocal() as db:
+        document = await db.get(models.Document, document_id)
+        
+        # Extract text
+        text = await text_store.get_text_async(db, document)
+        if not text:
+            raise HTTPException(status_code=400, detail="Could not extract text from document")
+        
+        # Query existing flashcards to avoid duplicates
+        exclude_topics = await _existing_fronts(db, document_id)
+
+        # Generate flashcards with exclusion list
+        if mode == "coverage":
+            # Spread generation across every section of the document
+            flashcards_data = await coverage.generate_flashcards(document, num_cards, exclude_topics)
+        else:
+            flashcards_data = await ai.generate_flashcards(text, num_cards=num_cards, exclude_topics=exclude_topics)
         
-    return new_cards
+        # Save to DB
+        new_cards = []
+        for card in flashcards_data:
+            new_card = models.Flashcard(
+                document_id=document_id,
+                front=card["front"],
+                back=card["back"]
+            )
+            db.add(new_card)
+            new_cards.append(new_card)
+        
+        await db.commit()
+        for card in new_cards:
+            await db.refresh(card)
+            
+        return new_cards
+
+async def _existing_fronts(db: AsyncSession, document_id: int) -> Optional[List[str]]:
+    fronts = (await db.scalars(
+        select(models.Flashcard.front).where(models.Flashcard.document_id == document_id)
+    )).all()
+    return list(fronts) or None
 
 from pydantic import BaseModel
 from services import srs
@@ -63,17 +127,17 @@ class ReviewData(BaseModel):
     grade: int # 0-5
 
 @router.post("/flashcards/{card_id}/review")
-def review_flashcard(
+async def review_flashcard(
     card_id: int, 
     review: ReviewData, 
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Get card and verify it belongs to user's document
-    card = db.query(models.Flashcard).join(models.Document).filter(
+    card = await db.scalar(select(models.Flashcard).join(models.Document).where(
         models.Flashcard.id == card_id,
         models.Document.user_id == current_user.id
-    ).first()
+    ))
     if not card:
         raise HTTPException(status_code=404, detail="Card not found")
         
@@ -89,40 +153,89 @@ def review_flashcard(
     card.interval = result["interval"]
     card.next_review = result["next_review"]
     
-    db.commit()
+    await db.commit()
     return result
 
 @router.get("/flashcards/due")
-def get_due_flashcards(
-    db: Session = Depends(database.get_db),
+async def get_due_flashcards(
+    db: AsyncSession = Depends(database.get_db),
     current_user: User = Depends(get_current_user)
 ):
     from sqlalchemy.orm import joinedload
     now = datetime.datetime.utcnow()
-    due_cards = db.query(models.Flashcard).join(models.Document).options(
+    due_cards = await db.scalars(select(models.Flashcard).join(models.Document).options(
         joinedload(models.Flashcard.document)
-    ).filter(
+    ).where(
         models.Flashcard.next_review <= now,
         models.Document.user_id == current_user.id
-    ).all()
-    return due_cards
+    ))
+    return due_cards.all()
 
 @router.post("/quiz/{document_id}")
 async def create_quiz(
     document_id: int, 
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
+    current_user: User = Depends(get_current_user)
+):
+    document = await db.scalar(select(models.Document).where(
+        models.Document.id == document_id,
+        models.Document.user_id == current_user.id
+    ))
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    key = (current_user.id, document_id)
+    return await quiz_flights.do(key, lambda: _generate_quiz(document_id))
+
+@router.post("/quiz/{document_id}/stream")
+async def stream_quiz(
+    document_id: int, 
+    db: AsyncSession = Depends(database.get_db),
     current_user: User = Depends(get_current_user)
 ):
-    document = db.query(models.Document).filter(
+    """
+    Generate a quiz as server-sent events: one "question" event per question
+    as soon as the model finishes it, then a "done" event.
+    """
+    document = await db.scalar(select(models.Document).where(
         models.Document.id == document_id,
         models.Document.user_id == current_user.id
-    ).first()
+    ))
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    text = parser.extract_text(document.file_path, document.file_type)
+    text = await _quiz_text(db, document)
     if not text:
         raise HTTPException(status_code=400, detail="Could not extract text from document")
     
-    quiz = ai.generate_quiz(text)
-    return quiz
+    async def event_stream():
+        stats = {}
+        count = 0
+        async for question in ai.stream_quiz(text, stats=stats):
+            count += 1
+            yield sse.event("question", question)
+        yield sse.event("done", {"count": count, **stats})
+    
+    return sse.response(event_stream())
+
+async def _generate_quiz(document_id: int):
+    async with database.AsyncSessionLocal() as db:
+        document = await db.get(models.Document, document_id)
+        text = await _quiz_text(db, document)
+        if not text:
+            raise HTTPException(status_code=400, detail="Could not extract text from document")
+    
+    return await ai.generate_quiz(text)
+
+async def _quiz_text(db: AsyncSession, document: models.Document) -> str:
+    # The summary spans the whole document; the raw text prompt only sees its start
+    return document.summary or await text_store.get_text_async(db, document)
+
+def _card_json(card: models.Flashcard) -> Dict[str, Any]:
+    return {
+        "id": card.id,
+        "document_id": card.document_id,
+        "front": card.front,
+        "back": card.back,
+        "next_review": card.next_review.isoformat() if card.next_review else None
+    }
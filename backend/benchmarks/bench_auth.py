@@ -0,0 +1,94 @@
+"""
+Per-request cost of the auth dependency, with and without the token cache.
+
+Uses a temporary SQLite database holding many sessions; each request picks a
+token from a working set of active users.
+
+Run from backend/:  python -m benchmarks.bench_auth [requests] [active users]
+"""
+
+import asyncio
+import datetime
+import os
+import random
+import secrets
+import statistics
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+import database
+import middleware
+import models
+
+TOTAL_SESSIONS = 10000
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def _seed(session_factory) -> list:
+    db = session_factory()
+    expires_at = datetime.datetime.utcnow() + datetime.timedelta(days=7)
+    users = [models.User(username=f"bench-{i}") for i in range(TOTAL_SESSIONS // 10)]
+    db.add_all(users)
+    db.flush()
+    tokens = []
+    for i in range(TOTAL_SESSIONS):
+        token = secrets.token_urlsafe(32)
+        db.add(models.Session(user_id=users[i % len(users)].id, token=token, expires_at=expires_at))
+        tokens.append(token)
+    db.commit()
+    db.close()
+    return tokens
+
+def _request(token: str) -> Request:
+    return Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+async def _run(tokens: list, requests: int) -> list:
+    rng = random.Random(42)
+    latencies = []
+    for _ in range(requests):
+        request = _request(rng.choice(tokens))
+        start = time.perf_counter()
+        await middleware.get_current_user(request)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+async def _measure(db_path: str, tokens: list, requests: int) -> list:
+    # The async engine is bound to the loop it first connects on
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    database.AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        return await _run(tokens, requests)
+    finally:
+        await async_engine.dispose()
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    active = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'auth.db')
+        engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+        database.Base.metadata.create_all(bind=engine)
+        tokens = _seed(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+        working_set = tokens[:active]
+
+        print(f"Auth dependency benchmark: {TOTAL_SESSIONS} sessions, {active} active tokens, {requests} requests\n")
+        print(f"{'':14} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>9}")
+        for label, cache_size in [("cache off", 0), ("cache on", middleware.AUTH_CACHE_SIZE)]:
+            middleware.AUTH_CACHE_SIZE = cache_size
+            middleware.clear_cache()
+            latencies = asyncio.run(_measure(db_path, working_set, requests))
+            print(
+                f"{label:14} {statistics.median(latencies):8.3f} {_percentile(latencies, 95):8.3f} "
+                f"{_percentile(latencies, 99):8.3f} {len(latencies) / (sum(latencies) / 1000):9.0f}"
+            )
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
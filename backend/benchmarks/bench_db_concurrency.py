@@ -0,0 +1,128 @@
+"""
+Whether concurrent requests serialize behind the database.
+
+Seeds a temporary SQLite database with a large study history, then runs
+the /stats total-time query from many concurrent coroutines two ways: on a
+sync Session called from async code (how the handlers used to work) and on
+an AsyncSession (how they work now). A ticker coroutine wakes every
+millisecond meanwhile; how late it wakes is how long the event loop was
+blocked, i.e. how long every other request on the worker had to wait.
+
+Run from backend/:  python -m benchmarks.bench_db_concurrency [concurrency] [study sessions]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+import database
+import models
+
+TICK_SECONDS = 0.001
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def _seed(engine, study_sessions: int):
+    with Session(engine) as db:
+        user = models.User(username="bench")
+        db.add(user)
+        db.flush()
+        document = models.Document(filename="bench.txt", file_path="bench.txt", file_type="TXT", user_id=user.id)
+        db.add(document)
+        db.flush()
+        # Generated inside SQLite: inserting this many ORM objects would take minutes
+        db.execute(text("""
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :rows)
+            INSERT INTO study_sessions (document_id, activity_type, start_time, duration_seconds)
+            SELECT :document_id, 'flashcards', datetime('now', '-' || (i % 365) || ' days'), 60 FROM n
+        """), {"rows": study_sessions, "document_id": document.id})
+        db.commit()
+        return user.id
+
+async def _ticker(stop: asyncio.Event, stalls: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        stalls.append((time.perf_counter() - started - TICK_SECONDS) * 1000)
+
+async def _with_ticker(work):
+    """Run work() with a ticker; returns (wall seconds, loop stalls in ms)."""
+    stop, stalls = asyncio.Event(), []
+    ticker = asyncio.create_task(_ticker(stop, stalls))
+    await asyncio.sleep(TICK_SECONDS)
+    started = time.perf_counter()
+    await work()
+    wall = time.perf_counter() - started
+    stop.set()
+    await ticker
+    return wall, stalls
+
+def _total_time_query(user_id: int):
+    return select(func.sum(models.StudySession.duration_seconds)).join(models.Document).where(
+        models.Document.user_id == user_id
+    )
+
+async def _sync_queries(sync_factory, user_id: int, concurrency: int):
+    async def one():
+        # The old handler shape: an async def making a blocking ORM call
+        db = sync_factory()
+        try:
+            db.execute(_total_time_query(user_id)).scalar()
+        finally:
+            db.close()
+        await asyncio.sleep(0)
+    await asyncio.gather(*[one() for _ in range(concurrency)])
+
+async def _async_queries(async_factory, user_id: int, concurrency: int):
+    async def one():
+        async with async_factory() as db:
+            await db.scalar(_total_time_query(user_id))
+    await asyncio.gather(*[one() for _ in range(concurrency)])
+
+async def _query_level(db_path: str, user_id: int, concurrency: int):
+    sync_engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    sync_factory = sessionmaker(bind=sync_engine)
+    async_factory = async_sessionmaker(async_engine, class_=AsyncSession)
+    try:
+        # Warm both pools and the page cache
+        await _sync_queries(sync_factory, user_id, 1)
+        await _async_queries(async_factory, user_id, concurrency)
+
+        print(f"{'':16} {'wall ms':>9} {'stall p50':>10} {'stall p99':>10} {'stall max':>10}")
+        for label, run in [
+            ("sync session", lambda: _sync_queries(sync_factory, user_id, concurrency)),
+            ("async session", lambda: _async_queries(async_factory, user_id, concurrency)),
+        ]:
+            wall, stalls = await _with_ticker(run)
+            print(
+                f"{label:16} {wall * 1000:9.1f} {statistics.median(stalls):10.2f} "
+                f"{_percentile(stalls, 99):10.2f} {max(stalls):10.2f}"
+            )
+    finally:
+        sync_engine.dispose()
+        await async_engine.dispose()
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    study_sessions = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        engine = create_engine(f"sqlite:///{db_path}")
+        database.Base.metadata.create_all(bind=engine)
+        user_id = _seed(engine, study_sessions)
+        engine.dispose()
+
+        print(f"DB concurrency benchmark: {study_sessions} study sessions, {concurrency} concurrent queries\n")
+        asyncio.run(_query_level(db_path, user_id, concurrency))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Mixed read/write load under each engine profile.
+
+Reader tasks run the due-cards query while writer tasks record flashcard
+reviews (an UPDATE plus a study session INSERT per transaction), all on the
+async request-path engine, for a fixed time per profile. Compares SQLAlchemy's
+defaults ("plain") with the tuned profile for the backend.
+
+SQLite runs against a temporary file. For Postgres, pass a scratch database
+URL; the benchmark creates the schema if missing and deletes the rows it
+seeded afterwards.
+
+Run from backend/:  python -m benchmarks.bench_db_profiles [seconds] [readers] [writers] [postgresql://...]
+"""
+
+import asyncio
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+from sqlalchemy import delete, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+import database
+import models
+
+DOCUMENTS = 20
+CARDS_PER_DOCUMENT = 500
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def _seed(url: str) -> dict:
+    engine = database.make_engine(url, "plain")
+    database.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    rng = random.Random(3)
+    now = datetime.datetime.utcnow()
+    try:
+        user = models.User(username=f"bench-profiles-{os.getpid()}-{int(time.time())}")
+        db.add(user)
+        db.flush()
+        documents = [models.Document(filename=f"doc-{i}.txt", file_path="", file_type="TXT", user_id=user.id) for i in range(DOCUMENTS)]
+        db.add_all(documents)
+        db.flush()
+        db.add_all([
+            models.Flashcard(
+                document_id=document.id, front=f"Q{i}", back=f"A{i}",
+                next_review=now + datetime.timedelta(days=rng.randint(-30, 30))
+            )
+            for document in documents for i in range(CARDS_PER_DOCUMENT)
+        ])
+        db.commit()
+        card_ids = [row[0] for row in db.execute(
+            select(models.Flashcard.id).where(models.Flashcard.document_id.in_([d.id for d in documents]))
+        )]
+        return {"user_id": user.id, "document_ids": [d.id for d in documents], "card_ids": card_ids}
+    finally:
+        db.close()
+        engine.dispose()
+
+def _cleanup(url: str, seeded: dict):
+    engine = database.make_engine(url, "plain")
+    with engine.begin() as conn:
+        document_ids = seeded["document_ids"]
+        conn.execute(delete(models.StudySession).where(models.StudySession.document_id.in_(document_ids)))
+        conn.execute(delete(models.Flashcard).where(models.Flashcard.document_id.in_(document_ids)))
+        conn.execute(delete(models.Document).where(models.Document.id.in_(document_ids)))
+        conn.execute(delete(models.User).where(models.User.id == seeded["user_id"]))
+    engine.dispose()
+
+async def _reader(sessions, seeded: dict, deadline: float, stats: dict, rng: random.Random):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            async with sessions() as db:
+                # Same shape as GET /api/study/flashcards/due for one document
+                cards = await db.scalars(select(models.Flashcard).join(models.Document).where(
+                    models.Flashcard.next_review <= datetime.datetime.utcnow(),
+                    models.Document.user_id == seeded["user_id"],
+                    models.Document.id == rng.choice(seeded["document_ids"]),
+                ))
+                cards.all()
+            stats["reads"].append((time.perf_counter() - started) * 1000)
+        except Exception:
+            stats["errors"] += 1
+
+async def _writer(sessions, seeded: dict, deadline: float, stats: dict, rng: random.Random):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            async with sessions() as db:
+                now = datetime.datetime.utcnow()
+                # Same writes as a flashcard review followed by ending a study session
+                await db.execute(update(models.Flashcard).where(
+                    models.Flashcard.id == rng.choice(seeded["card_ids"])
+                ).values(
+                    next_review=now + datetime.timedelta(days=rng.randint(1, 30)),
+                    repetitions=models.Flashcard.repetitions + 1,
+                ))
+                db.add(models.StudySession(
+                    document_id=rng.choice(seeded["document_ids"]), activity_type="flashcards",
+                    start_time=now, end_time=now, duration_seconds=rng.randint(30, 600)
+                ))
+                await db.commit()
+            stats["writes"].append((time.perf_counter() - started) * 1000)
+        except Exception:
+            stats["errors"] += 1
+
+async def _run_profile(url: str, profile: str, seeded: dict, seconds: float, readers: int, writers: int) -> dict:
+    engine = database.make_async_engine(database.async_url(url), profile)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    stats = {"reads": [], "writes": [], "errors": 0}
+    try:
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(
+            *[_reader(sessions, seeded, deadline, stats, random.Random(i)) for i in range(readers)],
+            *[_writer(sessions, seeded, deadline, stats, random.Random(1000 + i)) for i in range(writers)],
+        )
+    finally:
+        await engine.dispose()
+    return stats
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    writers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    postgres_url = sys.argv[4] if len(sys.argv) > 4 else None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = postgres_url or f"sqlite:///{os.path.join(tmp, 'profiles.db')}"
+        tuned = database.resolve_profile(url, "auto")
+        seeded = _seed(url)
+        print(f"Engine profile benchmark ({make_url(url).get_backend_name()}): "
+              f"{readers} readers, {writers} writers, {seconds:.0f}s per profile\n")
+        print(f"{'':10} {'reads/s':>9} {'read p50':>9} {'read p99':>9} {'writes/s':>9} {'write p50':>10} {'write p99':>10} {'errors':>7}")
+        try:
+            for profile in ("plain", tuned):
+                stats = asyncio.run(_run_profile(url, profile, seeded, seconds, readers, writers))
+                reads, writes = stats["reads"], stats["writes"]
+                print(
+                    f"{profile:10} {len(reads) / seconds:9.0f} {_percentile(reads, 50):9.2f} {_percentile(reads, 99):9.2f} "
+                    f"{len(writes) / seconds:9.0f} {_percentile(writes, 50):10.2f} {_percentile(writes, 99):10.2f} {stats['errors']:7d}"
+                )
+        finally:
+            if postgres_url:
+                _cleanup(url, seeded)
+
+if __name__ == "__main__":
+    main()
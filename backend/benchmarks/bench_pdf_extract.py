@@ -0,0 +1,40 @@
+"""
+Wall-clock of PDF text extraction against page count, serial vs page-parallel.
+
+Run from backend/:  python -m benchmarks.bench_pdf_extract [pages ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from benchmarks.synthetic import write_pdf
+from services import parser
+
+DEFAULT_PAGE_COUNTS = [50, 100, 200, 400, 800]
+
+def _time_extract(path: str, min_pages: int) -> tuple:
+    parser.PARALLEL_PDF_MIN_PAGES = min_pages
+    start = time.perf_counter()
+    text = parser.extract_text(path, "PDF")
+    return time.perf_counter() - start, text
+
+def main():
+    page_counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_PAGE_COUNTS
+    print(f"PDF extraction benchmark ({parser.PDF_WORKERS} workers)\n")
+    print(f"{'pages':>6} {'serial s':>10} {'parallel s':>11} {'speedup':>8}")
+
+    # Warm the process pool so worker start-up is not counted
+    list(parser._get_pdf_pool().map(time.sleep, [0.2] * parser.PDF_WORKERS))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in page_counts:
+            path = os.path.join(tmp, f"synthetic-{pages}.pdf")
+            write_pdf(path, pages)
+            serial, serial_text = _time_extract(path, min_pages=sys.maxsize)
+            parallel, parallel_text = _time_extract(path, min_pages=1)
+            assert serial_text == parallel_text, "parallel output differs from serial"
+            print(f"{pages:>6} {serial:>10.2f} {parallel:>11.2f} {serial / parallel:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+BM25 retrieval latency on a synthetic 1,000-page document.
+
+Run from backend/:  python -m benchmarks.bench_retrieval [pages] [queries]
+"""
+
+import random
+import statistics
+import sys
+import time
+from benchmarks.synthetic import WORDS, lecture_lines
+from services import chunker, retrieval
+from services.parser import TextSegment
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    segments = (
+        TextSegment("\n".join(lecture_lines(page)) + "\n", "page", page)
+        for page in range(pages)
+    )
+
+    start = time.perf_counter()
+    chunks = list(chunker.chunk_segments(segments))
+    chunk_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = retrieval.BM25Index.build((i, chunk.text) for i, chunk in enumerate(chunks))
+    build_time = time.perf_counter() - start
+
+    data = index.to_json()
+    start = time.perf_counter()
+    retrieval.BM25Index.from_json(data)
+    load_time = time.perf_counter() - start
+
+    rng = random.Random(42)
+    latencies = []
+    for _ in range(queries):
+        query = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))
+        start = time.perf_counter()
+        index.search(query, retrieval.CHAT_CONTEXT_TOP_K)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    print(f"BM25 retrieval benchmark: {pages} pages, {len(chunks)} chunks\n")
+    print(f"chunking:      {chunk_time * 1000:8.1f} ms")
+    print(f"index build:   {build_time * 1000:8.1f} ms")
+    print(f"index load:    {load_time * 1000:8.1f} ms ({len(data) / 1024:.0f} KiB JSON)")
+    print(f"query p50:     {statistics.median(latencies):8.2f} ms")
+    print(f"query p95:     {_percentile(latencies, 95):8.2f} ms")
+    print(f"query p99:     {_percentile(latencies, 99):8.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Synthetic study material for benchmarks.
+"""
+
+import random
+
+WORDS = (
+    "cell membrane protein enzyme energy photosynthesis respiration gene "
+    "chromosome mitosis meiosis evolution selection population ecosystem "
+    "empire treaty revolution parliament monarchy trade colony war economy "
+    "market demand supply inflation interest capital labor algorithm graph "
+    "matrix vector integral derivative theorem proof function variable"
+).split()
+
+def lecture_lines(page: int, lines: int = 40, seed: int = 0):
+    """
+    Deterministic pseudo-lecture text for one page.
+    """
+    rng = random.Random(seed * 100003 + page)
+    for _ in range(lines):
+        yield " ".join(rng.choice(WORDS) for _ in range(12))
+
+def write_pdf(path: str, pages: int, lines_per_page: int = 40, seed: int = 0):
+    """
+    Write a minimal text PDF with `pages` pages of lecture-like text.
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None, # Pages, filled in once page object ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page in range(pages):
+        ops = ["BT /F1 10 Tf 12 TL 50 780 Td"]
+        ops.append(f"(Page {page + 1}) Tj T*")
+        for line in lecture_lines(page, lines_per_page, seed):
+            ops.append(f"({line}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
@@ -0,0 +1,94 @@
+import os
+
+# Keep tests (and modules that create the app engine at import) off the dev database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+import migrations
+import models
+
+@pytest.fixture(autouse=True)
+def fresh_llm_cache():
+    from services import llm_cache
+    llm_cache.clear()
+    yield
+    llm_cache.clear()
+
+@pytest.fixture(autouse=True)
+def fresh_breakers():
+    from services import resilience
+    resilience.reset()
+    yield
+    resilience.reset()
+
+@pytest.fixture(autouse=True)
+def fresh_auth_cache():
+    import middleware
+    middleware.clear_cache()
+    yield
+    middleware.clear_cache()
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A file-backed SQLite database with the full schema, so the sync and async engines share it."""
+    path = tmp_path / "test.db"
+    engine = create_engine(f"sqlite:///{path}")
+    migrations.upgrade(engine)
+    engine.dispose()
+    return path
+
+@pytest.fixture
+def db(db_path):
+    """Sync session on the test database."""
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+@pytest.fixture
+def async_sessions(db_path):
+    """AsyncSession factory on the test database, as request handlers get it."""
+    # NullPool: each asyncio.run (and each TestClient request) has its own loop
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+    yield async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+@pytest.fixture
+def client(db, user, async_sessions):
+    """TestClient for the app, bound to the test database and user."""
+    from fastapi.testclient import TestClient
+    import database, main
+    from middleware import get_current_user
+
+    async def override_db():
+        async with async_sessions() as session:
+            yield session
+
+    main.app.dependency_overrides[database.get_db] = override_db
+    main.app.dependency_overrides[get_current_user] = lambda: user
+    # Work that opens its own sessions uses the same database
+    original_session_local = database.SessionLocal
+    original_async_session_local = database.AsyncSessionLocal
+    database.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+    database.AsyncSessionLocal = async_sessions
+    try:
+        # No context manager: startup hooks (workers, provider clients) stay off
+        yield TestClient(main.app)
+    finally:
+        main.app.dependency_overrides.clear()
+        database.SessionLocal = original_session_local
+        database.AsyncSessionLocal = original_async_session_local
+
+@pytest.fixture
+def user(db):
+    user = models.User(username="tester")
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
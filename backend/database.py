@@ -1,6 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
 from dotenv import load_dotenv
 
@@ -9,16 +12,122 @@ load_dotenv()
 # Default to sqlite for local dev if no POSTGRES URL provided, to allow running without Docker
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./studyai.db")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {}
-)
+# Async drivers for the request path, by backend
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+# Engine profile: "auto" picks the tuned profile for the database's backend,
+# "plain" keeps SQLAlchemy's defaults
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "auto")
+PROFILES = ("plain", "sqlite", "postgres")
+
+# sqlite profile: WAL lets readers run alongside the writer; NORMAL sync is
+# durable across application crashes in WAL mode and skips most fsyncs
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "65536"))
+SQLITE_MMAP_BYTES = int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "8"))
+
+# postgres profile: sized per engine, so a worker holds at most
+# 2 x (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+# Prepared statements cached per asyncpg connection; 0 behind a transaction-mode pgbouncer
+DB_PREPARED_STATEMENT_CACHE = int(os.getenv("DB_PREPARED_STATEMENT_CACHE", "500"))
+
+def async_url(url: str) -> str:
+    """
+    The async-driver form of a database URL, e.g. postgresql://... ->
+    postgresql+asyncpg://... ASYNC_DATABASE_URL overrides it.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases; set ASYNC_DATABASE_URL")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+def resolve_profile(url: str, profile: str = None) -> str:
+    profile = profile or DATABASE_PROFILE
+    if profile == "auto":
+        backend = make_url(url).get_backend_name()
+        return {"sqlite": "sqlite", "postgresql": "postgres"}.get(backend, "plain")
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DATABASE_PROFILE '{profile}'; expected auto or one of {', '.join(PROFILES)}")
+    return profile
+
+def engine_options(url: str, profile: str = None) -> dict:
+    """
+    Keyword arguments for create_engine / create_async_engine under a
+    profile. Connection-level settings for SQLite are applied by tune().
+    """
+    parsed = make_url(url)
+    profile = resolve_profile(url, profile)
+    options = {}
+    if parsed.get_backend_name() == "sqlite" and parsed.get_driver_name() == "pysqlite":
+        options["connect_args"] = {"check_same_thread": False}
+
+    if profile == "sqlite" and parsed.get_driver_name() == "aiosqlite" and parsed.database not in (None, "", ":memory:"):
+        # aiosqlite defaults to a new connection (and new pragmas) per session
+        options.update(poolclass=AsyncAdaptedQueuePool, pool_size=SQLITE_POOL_SIZE, max_overflow=SQLITE_POOL_SIZE)
+    elif profile == "postgres":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+        if parsed.get_driver_name() == "asyncpg":
+            options["connect_args"] = {
+                "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)},
+                "prepared_statement_cache_size": DB_PREPARED_STATEMENT_CACHE,
+            }
+        else:
+            # psycopg2 has no server-side prepared statements; those are on the asyncpg request path
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+def tune(engine, profile: str = None):
+    """
+    Register per-connection settings for the engine's profile. Accepts sync
+    and async engines.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if resolve_profile(str(sync_engine.url), profile) != "sqlite":
+        return engine
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+    return engine
+
+def make_engine(url: str, profile: str = None):
+    return tune(create_engine(url, **engine_options(url, profile)), profile)
+
+def make_async_engine(url: str, profile: str = None):
+    return tune(create_async_engine(url, **engine_options(url, profile)), profile)
+
+# Sync engine: ingestion workers, background tasks and scripts
+engine = make_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: request handlers, so database waits never block the event loop
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_url(SQLALCHEMY_DATABASE_URL)
+async_engine = make_async_engine(ASYNC_DATABASE_URL)
+# Objects stay usable after commit; reloading them would need an await
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
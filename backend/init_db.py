@@ -2,7 +2,7 @@
 Database initialization script for authentication system.
 This script will:
 1. Drop all existing tables
-2. Recreate tables with new user relationships
+2. Recreate tables by running the migrations
 3. Sync users from .env to database
 """
 
@@ -11,6 +11,7 @@ from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from database import engine, Base, SessionLocal
 from models import User
+import migrations
 
 load_dotenv()
 
@@ -39,7 +40,7 @@ def init_database():
     Base.metadata.drop_all(bind=engine)
     
     print("📦 Creating new database schema...")
-    Base.metadata.create_all(bind=engine)
+    migrations.upgrade(engine)
     
     print("👥 Syncing users from .env...")
     env_users = get_env_users()
@@ -0,0 +1,73 @@
+"""
+Compare load-test results across runs (e.g. before and after a commit).
+
+Run from backend/:  python -m loadtest.compare BASELINE.json CANDIDATE.json [MORE.json ...]
+
+Each candidate is shown against the baseline, per endpoint, with the change
+in throughput and latency percentiles. Latency increases and throughput drops
+beyond --threshold percent are flagged.
+"""
+
+import argparse
+import json
+from typing import Optional
+
+METRICS = [("rps", "rps", True), ("p50_ms", "p50", False), ("p95_ms", "p95", False), ("p99_ms", "p99", False)]
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+def change(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old * 100
+
+def describe(run: dict) -> str:
+    config = run.get("config", {})
+    tag = f"{run['commit']}{' (dirty)' if run.get('dirty') else ''}"
+    label = f" {run['label']}" if run.get("label") else ""
+    return f"{tag}{label} @ {run['timestamp']}, {config.get('concurrency')} users, mix {config.get('mix')}"
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> int:
+    print(f"baseline:  {describe(baseline)}")
+    print(f"candidate: {describe(candidate)}")
+    if baseline.get("config", {}).get("mix") != candidate.get("config", {}).get("mix"):
+        print("warning: traffic mixes differ")
+    print()
+    print(f"{'endpoint':<15}" + "".join(f"{label:>24}" for _, label, _ in METRICS))
+
+    regressions = 0
+    names = list(baseline["endpoints"]) + [n for n in candidate["endpoints"] if n not in baseline["endpoints"]]
+    for name in names:
+        old, new = baseline["endpoints"].get(name, {}), candidate["endpoints"].get(name, {})
+        cells = []
+        for key, _, higher_is_better in METRICS:
+            pct = change(old.get(key), new.get(key))
+            flag = ""
+            if pct is not None and (pct < -threshold if higher_is_better else pct > threshold):
+                flag = " !"
+                regressions += 1
+            delta = f"{pct:+.0f}%" if pct is not None else "n/a"
+            cells.append(f"{_fmt(old.get(key))} -> {_fmt(new.get(key))} {delta}{flag}")
+        print(f"{name:<15}" + "".join(f"{cell:>24}" for cell in cells))
+    print()
+    return regressions
+
+def _fmt(value) -> str:
+    return "-" if value is None else f"{value:g}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidates", nargs="+")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change flagged as a regression")
+    args = parser.parse_args()
+
+    baseline = load(args.baseline)
+    regressions = sum(compare(baseline, load(path), args.threshold) for path in args.candidates)
+    if regressions:
+        print(f"{regressions} metric(s) regressed by more than {args.threshold:g}% (marked !)")
+
+if __name__ == "__main__":
+    main()
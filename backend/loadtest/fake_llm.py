@@ -0,0 +1,154 @@
+"""
+Local stand-in for the Ollama and Anthropic APIs.
+
+Answers every request with canned but well-formed output: flashcard and quiz
+prompts get JSON arrays of the requested size, category prompts a single word,
+everything else prose. Each response waits FIRST_TOKEN_LATENCY seconds and
+then produces tokens at TOKENS_PER_SECOND, streamed or not.
+
+Run from backend/:  python -m loadtest.fake_llm [--port 11500] [--latency 0.3] [--tps 80]
+"""
+
+import argparse
+import asyncio
+import json
+import re
+from typing import AsyncIterator, List
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FIRST_TOKEN_LATENCY = 0.3 # Seconds before the first token
+TOKENS_PER_SECOND = 80.0
+CHAT_WORDS = 120 # Length of prose replies
+
+_PROSE = (
+    "The passage explains how the process works step by step and why each stage "
+    "matters for the overall result, using the examples given in the document."
+).split()
+
+app = FastAPI(title="Fake LLM")
+
+def _completion(prompt: str) -> str:
+    cards = re.search(r"EXACTLY (\d+) flashcards", prompt)
+    if cards:
+        return json.dumps([
+            {"front": f"Key idea {i + 1}?", "back": f"Explanation of key idea {i + 1}."}
+            for i in range(int(cards.group(1)))
+        ], indent=1)
+    questions = re.search(r"EXACTLY (\d+) multiple-choice", prompt)
+    if questions:
+        return json.dumps([
+            {
+                "question": f"Which statement about topic {i + 1} is correct?",
+                "options": ["Option A", "Option B", "Option C", "Option D"],
+                "correct_answer": "Option A"
+            }
+            for i in range(int(questions.group(1)))
+        ], indent=1)
+    if "Classify the following text" in prompt:
+        return "Science"
+    return " ".join(_PROSE[i % len(_PROSE)] for i in range(CHAT_WORDS))
+
+def _tokens(text: str) -> List[str]:
+    # Roughly one token per word or punctuation run, keeping whitespace
+    return re.findall(r"\s*\S+", text) or [""]
+
+async def _emit(text: str) -> AsyncIterator[str]:
+    await asyncio.sleep(FIRST_TOKEN_LATENCY)
+    for token in _tokens(text):
+        yield token
+        await asyncio.sleep(1 / TOKENS_PER_SECOND)
+
+async def _collect(text: str) -> str:
+    return "".join([token async for token in _emit(text)])
+
+def _last_user_text(messages: list) -> str:
+    content = messages[-1]["content"] if messages else ""
+    if isinstance(content, list):
+        content = "".join(block.get("text", "") for block in content)
+    return content
+
+# --- Ollama ----------------------------------------------------------------
+
+@app.post("/api/generate")
+async def ollama_generate(request: Request):
+    payload = await request.json()
+    text = _completion(payload.get("prompt", ""))
+    if payload.get("stream", True):
+        return StreamingResponse(_ollama_lines(text, "response"), media_type="application/x-ndjson")
+    return JSONResponse({"model": payload.get("model"), "response": await _collect(text), "done": True})
+
+@app.post("/api/chat")
+async def ollama_chat(request: Request):
+    payload = await request.json()
+    text = _completion(_last_user_text(payload.get("messages", [])))
+    if payload.get("stream", True):
+        return StreamingResponse(_ollama_lines(text, "message"), media_type="application/x-ndjson")
+    return JSONResponse({
+        "model": payload.get("model"),
+        "message": {"role": "assistant", "content": await _collect(text)},
+        "done": True
+    })
+
+async def _ollama_lines(text: str, field: str) -> AsyncIterator[str]:
+    async for token in _emit(text):
+        value = {"role": "assistant", "content": token} if field == "message" else token
+        yield json.dumps({field: value, "done": False}) + "\n"
+    yield json.dumps({field: {"role": "assistant", "content": ""} if field == "message" else "", "done": True}) + "\n"
+
+# --- Anthropic -------------------------------------------------------------
+
+@app.post("/v1/messages")
+async def anthropic_messages(request: Request):
+    payload = await request.json()
+    text = _completion(_last_user_text(payload.get("messages", [])))
+    system = payload.get("system") or ""
+    system_text = system if isinstance(system, str) else "".join(block.get("text", "") for block in system)
+    usage = {
+        "input_tokens": len(_tokens(_last_user_text(payload.get("messages", [])))),
+        "output_tokens": len(_tokens(text)),
+        "cache_read_input_tokens": 0,
+        "cache_creation_input_tokens": len(system_text) // 4
+    }
+    message = {
+        "id": "msg_fake", "type": "message", "role": "assistant", "model": payload.get("model"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn", "stop_sequence": None, "usage": usage
+    }
+    if not payload.get("stream"):
+        message["content"][0]["text"] = await _collect(text)
+        return JSONResponse(message)
+    return StreamingResponse(_anthropic_events(text, message), media_type="text/event-stream")
+
+async def _anthropic_events(text: str, message: dict) -> AsyncIterator[str]:
+    def event(name, data):
+        return f"event: {name}\ndata: {json.dumps(dict(type=name, **data))}\n\n"
+
+    yield event("message_start", {"message": dict(message, content=[], stop_reason=None)})
+    yield event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+    async for token in _emit(text):
+        yield event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": token}})
+    yield event("content_block_stop", {"index": 0})
+    yield event("message_delta", {
+        "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+        "usage": {"output_tokens": message["usage"]["output_tokens"]}
+    })
+    yield event("message_stop", {})
+
+def main():
+    global FIRST_TOKEN_LATENCY, TOKENS_PER_SECOND
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency", type=float, default=FIRST_TOKEN_LATENCY, help="seconds before the first token")
+    parser.add_argument("--tps", type=float, default=TOKENS_PER_SECOND, help="output tokens per second")
+    args = parser.parse_args()
+
+    FIRST_TOKEN_LATENCY = args.latency
+    TOKENS_PER_SECOND = args.tps
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+End-to-end load test.
+
+Boots the fake LLM server (loadtest.fake_llm) and the app in uvicorn
+subprocesses against a freshly seeded database, drives a weighted mix of
+traffic from concurrent virtual users, and reports p50/p95/p99 latency and
+throughput per endpoint. Results are saved as JSON tagged with the git commit
+so runs can be compared with loadtest.compare.
+
+Run from backend/:
+    python -m loadtest.run [--duration 60] [--concurrency 20]
+        [--mix chat=30,review=25,stats=20,flashcards=10,upload=10,study_session=5]
+        [--latency 0.3] [--tps 80] [--provider ollama] [--workers 1]
+        [--database-url URL] [--out loadtest/results]
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = "chat=30,review=25,stats=20,flashcards=10,upload=10,study_session=5"
+QUESTIONS = [
+    "Summarize the main idea of this section.",
+    "What is the role of enzymes in the process?",
+    "Explain the difference between the two mechanisms.",
+    "Which page discusses the experimental results?",
+    "Give an example from the document.",
+]
+
+# --- Traffic ---------------------------------------------------------------
+# Each action makes one or more requests for a virtual user and records them.
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+
+    async def request(self, name: str, send: Callable) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await send()
+            # Streaming endpoints are timed until the last byte
+            await response.aread()
+        except httpx.HTTPError:
+            if self.recording:
+                self.errors[name] += 1
+                self.statuses[name][0] += 1
+            return None
+        if self.recording:
+            self.samples[name].append((time.perf_counter() - start) * 1000)
+            self.statuses[name][response.status_code] += 1
+            if response.status_code >= 400:
+                self.errors[name] += 1
+        return response
+
+async def chat(client, user, rng, rec):
+    document_id = rng.choice(user["documents"])
+    await rec.request("chat", lambda: client.post(
+        f"/api/chat/send/{document_id}", json={"role": "user", "content": rng.choice(QUESTIONS)}
+    ))
+
+async def chat_stream(client, user, rng, rec):
+    document_id = rng.choice(user["documents"])
+    await rec.request("chat_stream", lambda: client.post(
+        f"/api/chat/stream/{document_id}", json={"role": "user", "content": rng.choice(QUESTIONS)}
+    ))
+
+async def flashcards(client, user, rng, rec):
+    document_id = rng.choice(user["documents"])
+    response = await rec.request("flashcards", lambda: client.post(f"/api/study/flashcards/{document_id}?num_cards=5"))
+    if response is not None and response.status_code == 200:
+        user["flashcards"].extend(card["id"] for card in response.json())
+
+async def quiz(client, user, rng, rec):
+    document_id = rng.choice(user["documents"])
+    await rec.request("quiz", lambda: client.post(f"/api/study/quiz/{document_id}"))
+
+async def review(client, user, rng, rec):
+    card_id = rng.choice(user["flashcards"])
+    await rec.request("review", lambda: client.post(
+        f"/api/study/flashcards/{card_id}/review", json={"grade": rng.randint(0, 5)}
+    ))
+
+async def stats(client, user, rng, rec):
+    await rec.request("stats", lambda: client.get("/api/analytics/stats?timezone_offset=300"))
+
+async def upload(client, user, rng, rec):
+    # Unique bytes each time, so every upload goes through ingestion
+    body = f"Lecture notes {rng.random()}\n" + "\n".join(QUESTIONS * 40)
+    await rec.request("upload", lambda: client.post(
+        "/api/documents/upload", files={"file": ("notes.txt", body.encode("utf-8"), "text/plain")}
+    ))
+
+async def study_session(client, user, rng, rec):
+    document_id = rng.choice(user["documents"])
+    activity = rng.choice(["flashcards", "quiz", "chat"])
+    response = await rec.request("session_start", lambda: client.post(
+        "/api/analytics/session/start", json={"document_id": document_id, "activity_type": activity}
+    ))
+    if response is not None and response.status_code == 200:
+        session_id = response.json()["id"]
+        await rec.request("session_end", lambda: client.post(
+            "/api/analytics/session/end", json={"session_id": session_id}
+        ))
+
+ACTIONS = {
+    "chat": chat,
+    "chat_stream": chat_stream,
+    "flashcards": flashcards,
+    "quiz": quiz,
+    "review": review,
+    "stats": stats,
+    "upload": upload,
+    "study_session": study_session,
+}
+
+def parse_mix(mix: str) -> List[Tuple[str, float]]:
+    weights = []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ACTIONS:
+            raise SystemExit(f"Unknown action '{name}'. Choose from: {', '.join(ACTIONS)}")
+        weights.append((name, float(weight or 1)))
+    return weights
+
+async def drive(base_url: str, manifest: dict, mix: List[Tuple[str, float]], concurrency: int,
+                duration: float, warmup: float, seed: int) -> Tuple[Recorder, float]:
+    rec = Recorder()
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    users = manifest["users"]
+    clients = {
+        user["token"]: httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {user['token']}"},
+            timeout=120.0
+        )
+        for user in users
+    }
+
+    stop_at = time.monotonic() + warmup + duration
+
+    async def virtual_user(n: int):
+        rng = random.Random(seed + n)
+        while time.monotonic() < stop_at:
+            user = rng.choice(users)
+            action = ACTIONS[rng.choices(names, weights)[0]]
+            await action(clients[user["token"]], user, rng, rec)
+
+    tasks = [asyncio.create_task(virtual_user(n)) for n in range(concurrency)]
+    await asyncio.sleep(warmup)
+    rec.recording = True
+    started = time.monotonic()
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - started
+    for client in clients.values():
+        await client.aclose()
+    return rec, elapsed
+
+# --- Reporting -------------------------------------------------------------
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def summarize(rec: Recorder, elapsed: float) -> Dict[str, dict]:
+    endpoints = {}
+    for name in sorted(set(rec.samples) | set(rec.errors)):
+        samples = rec.samples.get(name, [])
+        endpoints[name] = {
+            "count": len(samples),
+            "errors": rec.errors.get(name, 0),
+            "rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(percentile(samples, 50), 1) if samples else None,
+            "p95_ms": round(percentile(samples, 95), 1) if samples else None,
+            "p99_ms": round(percentile(samples, 99), 1) if samples else None,
+            "max_ms": round(max(samples), 1) if samples else None,
+            "statuses": {str(code): n for code, n in sorted(rec.statuses[name].items())},
+        }
+    all_samples = [value for samples in rec.samples.values() for value in samples]
+    endpoints["TOTAL"] = {
+        "count": len(all_samples),
+        "errors": sum(rec.errors.values()),
+        "rps": round(len(all_samples) / elapsed, 2),
+        "p50_ms": round(percentile(all_samples, 50), 1) if all_samples else None,
+        "p95_ms": round(percentile(all_samples, 95), 1) if all_samples else None,
+        "p99_ms": round(percentile(all_samples, 99), 1) if all_samples else None,
+        "max_ms": round(max(all_samples), 1) if all_samples else None,
+    }
+    return endpoints
+
+def print_table(endpoints: Dict[str, dict]):
+    print(f"{'endpoint':<15}{'count':>8}{'rps':>9}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, row in endpoints.items():
+        cells = [row[key] if row[key] is not None else "-" for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")]
+        print(f"{name:<15}{row['count']:>8}{row['rps']:>9}{row['errors']:>8}" + "".join(f"{cell:>10}" for cell in cells))
+
+def git_commit() -> Tuple[str, bool]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+# --- Process management ----------------------------------------------------
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Process for {url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise SystemExit(f"Timed out waiting for {url}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=60, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before recording")
+    parser.add_argument("--concurrency", type=int, default=20, help="virtual users")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="action=weight pairs")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake LLM seconds to first token")
+    parser.add_argument("--tps", type=float, default=80, help="fake LLM output tokens per second")
+    parser.add_argument("--provider", choices=["ollama", "anthropic"], default="ollama")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the app")
+    parser.add_argument("--users", type=int, default=20, help="seeded users")
+    parser.add_argument("--docs", type=int, default=3, help="seeded documents per user")
+    parser.add_argument("--database-url", help="defaults to a fresh SQLite file")
+    parser.add_argument("--seed", type=int, default=1, help="traffic RNG seed")
+    parser.add_argument("--label", default="", help="free-form note stored with the results")
+    parser.add_argument("--out", default=os.path.join(BACKEND_DIR, "loadtest", "results"))
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    workdir = tempfile.mkdtemp(prefix="studyai-loadtest-")
+    llm_port, app_port = free_port(), free_port()
+    llm_url = f"http://127.0.0.1:{llm_port}"
+    env = dict(
+        os.environ,
+        DATABASE_URL=args.database_url or f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        UPLOAD_DIR=os.path.join(workdir, "uploads"),
+        DEFAULT_SUMMARY_METHOD=args.provider,
+        OLLAMA_URL=llm_url,
+        # Always point the SDK at the fake server so a real key is never used
+        ANTHROPIC_BASE_URL=llm_url,
+        ANTHROPIC_API_KEY="loadtest",
+        LLM_FALLBACK_PROVIDER="",
+    )
+
+    manifest_path = os.path.join(workdir, "manifest.json")
+    print(f"Seeding {args.users} users x {args.docs} documents in {workdir} ...")
+    subprocess.run(
+        [sys.executable, "-m", "loadtest.seed", manifest_path, "--users", str(args.users), "--docs", str(args.docs)],
+        cwd=BACKEND_DIR, env=env, check=True
+    )
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    processes = []
+    try:
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "loadtest.fake_llm", "--port", str(llm_port),
+             "--latency", str(args.latency), "--tps", str(args.tps)],
+            cwd=BACKEND_DIR, env=env
+        ))
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env
+        ))
+        wait_until_up(f"{llm_url}/docs", processes[0])
+        wait_until_up(f"http://127.0.0.1:{app_port}/health", processes[1])
+
+        print(f"Driving {args.concurrency} virtual users for {args.duration:.0f}s (+{args.warmup:.0f}s warmup): {args.mix}")
+        rec, elapsed = asyncio.run(drive(
+            f"http://127.0.0.1:{app_port}", manifest, mix, args.concurrency, args.duration, args.warmup, args.seed
+        ))
+        # Saved before teardown, so a slow shutdown cannot lose a completed run
+        save_results(args, rec, elapsed)
+    finally:
+        stop(processes)
+
+def save_results(args: argparse.Namespace, rec: Recorder, elapsed: float):
+    endpoints = summarize(rec, elapsed)
+    commit, dirty = git_commit()
+    result = {
+        "commit": commit,
+        "dirty": dirty,
+        "label": args.label,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "elapsed_seconds": round(elapsed, 1),
+        "config": {key: value for key, value in vars(args).items() if key not in ("out", "label")},
+        "endpoints": endpoints,
+    }
+
+    print()
+    print_table(endpoints)
+    os.makedirs(args.out, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(args.out, f"{stamp}-{commit}{'-dirty' if dirty else ''}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nSaved {path}")
+
+def stop(processes: List[subprocess.Popen], timeout: float = 30.0):
+    """
+    Terminate the child servers, killing any that do not exit within timeout.
+    """
+    for process in processes:
+        process.terminate()
+    deadline = time.monotonic() + timeout
+    for process in processes:
+        try:
+            process.wait(timeout=max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            print(f"Process {process.pid} did not exit after {timeout:.0f}s; killing it")
+            process.kill()
+            process.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Seed a database for load testing.
+
+Creates users with session tokens, and for each user a few processed
+documents (chunked and indexed, as after ingestion) with flashcards, chat
+history and study sessions. Writes a manifest of tokens and ids that the
+traffic driver uses.
+
+Run from backend/ with DATABASE_URL and UPLOAD_DIR pointing at the test
+environment:  python -m loadtest.seed manifest.json [--users 20] [--docs 3]
+"""
+
+import argparse
+import datetime
+import io
+import json
+import random
+import secrets
+import database
+import migrations
+import models
+from benchmarks.synthetic import lecture_lines
+from services import chunker, retrieval, storage, text_store
+
+def document_text(seed: int, pages: int) -> str:
+    return "\n\n".join("\n".join(lecture_lines(page, seed=seed)) for page in range(pages))
+
+def seed(users: int, docs_per_user: int, pages: int, cards_per_doc: int) -> dict:
+    migrations.upgrade(database.engine)
+    db = database.SessionLocal()
+    rng = random.Random(7)
+    manifest = {"users": []}
+    try:
+        for u in range(users):
+            user = models.User(username=f"loadtest-{u}-{secrets.token_hex(3)}")
+            db.add(user)
+            db.flush()
+            token = secrets.token_urlsafe(32)
+            db.add(models.Session(
+                user_id=user.id,
+                token=token,
+                expires_at=datetime.datetime.utcnow() + datetime.timedelta(days=1)
+            ))
+
+            entry = {"token": token, "documents": [], "flashcards": []}
+            for d in range(docs_per_user):
+                content = document_text(u * docs_per_user + d, pages).encode("utf-8")
+                content_hash, staged_path, size = storage.save_stream(io.BytesIO(content))
+                stored = storage.acquire(db, content_hash, staged_path, size)
+                document = models.Document(
+                    filename=f"lecture-{d}.txt",
+                    file_path=stored.file_path,
+                    file_type="TXT",
+                    content_hash=content_hash,
+                    category="Science",
+                    status="ready",
+                    user_id=user.id
+                )
+                db.add(document)
+                db.commit()
+
+                # What the ingestion pipeline would have stored
+                text_store.get_text(db, document)
+                chunker.ensure_chunks(db, document)
+                retrieval.build_index(db, document)
+
+                for c in range(cards_per_doc):
+                    card = models.Flashcard(
+                        document_id=document.id,
+                        front=f"Seed question {c}?",
+                        back=f"Seed answer {c}.",
+                        next_review=datetime.datetime.utcnow() - datetime.timedelta(days=rng.randint(0, 5))
+                    )
+                    db.add(card)
+                for turn in range(4):
+                    db.add(models.ChatMessage(document_id=document.id, role="user", content=f"Seed question {turn}?"))
+                    db.add(models.ChatMessage(document_id=document.id, role="assistant", content=f"Seed answer {turn}."))
+                for day in range(14):
+                    start = datetime.datetime.utcnow() - datetime.timedelta(days=day, minutes=rng.randint(0, 600))
+                    duration = rng.randint(60, 1800)
+                    db.add(models.StudySession(
+                        document_id=document.id,
+                        activity_type=rng.choice(["flashcards", "quiz", "chat"]),
+                        start_time=start,
+                        end_time=start + datetime.timedelta(seconds=duration),
+                        duration_seconds=duration
+                    ))
+                db.commit()
+
+                entry["documents"].append(document.id)
+                entry["flashcards"].extend(
+                    card.id for card in db.query(models.Flashcard.id).filter(models.Flashcard.document_id == document.id)
+                )
+            manifest["users"].append(entry)
+        db.commit()
+    finally:
+        db.close()
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("manifest")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--docs", type=int, default=3, help="documents per user")
+    parser.add_argument("--pages", type=int, default=20, help="pages per document")
+    parser.add_argument("--cards", type=int, default=20, help="flashcards per document")
+    args = parser.parse_args()
+
+    manifest = seed(args.users, args.docs, args.pages, args.cards)
+    with open(args.manifest, "w") as f:
+        json.dump(manifest, f)
+    print(f"Seeded {args.users} users x {args.docs} documents into {database.SQLALCHEMY_DATABASE_URL}")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
-from database import engine, Base
+import database
+from database import engine
+import migrations
 from api import documents, study_tools, chat, analytics, auth
+from services import ai, jobs, llm_cache, metrics, resilience, sessions
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create or update the database schema
+migrations.upgrade(engine)
 
 # Auto-sync users from environment variables on startup
 def sync_users_from_env():
@@ -52,6 +55,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def start_background_workers():
+    await ai.startup()
+    await jobs.start()
+    await sessions.start()
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    await sessions.stop()
+    await jobs.stop()
+    await ai.shutdown()
+    # Pooled aiosqlite connections each hold a non-daemon thread that would keep the process alive
+    await database.async_engine.dispose()
+    database.engine.dispose()
+
 app.include_router(auth.router)
 app.include_router(documents.router)
 app.include_router(study_tools.router)
@@ -64,4 +82,13 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    providers = resilience.snapshot(ai.providers())
+    # Degraded once every provider in the failover chain is failing fast
+    status = "degraded" if all(p["state"] == "open" for p in providers.values()) else "healthy"
+    return {"status": status, "providers": providers}
+
+@app.get("/metrics")
+async def get_metrics():
+    snapshot = metrics.snapshot()
+    snapshot["llm_cache"] = {"entries": llm_cache.size(), "db_tier": llm_cache.LLM_CACHE_DB}
+    return snapshot
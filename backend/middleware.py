@@ -1,12 +1,33 @@
 from fastapi import Request, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from database import get_db
-from models import User, Session as SessionModel
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from collections import OrderedDict
+import database
+from models import AuthState, User, Session as SessionModel
+from services import metrics
 import datetime
+import os
+import threading
+import time
 
 security = HTTPBearer(auto_error=False)
 
+# Token -> user cache, so most requests skip the sessions and users queries.
+# Entries live for AUTH_CACHE_TTL seconds at most and never past the
+# session's expires_at. Logout bumps a revocation version in the database;
+# each worker checks it every AUTH_REVOCATION_POLL seconds and drops its
+# cache when it changes, so a token logged out on another worker stops
+# working within that interval.
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+AUTH_REVOCATION_POLL = float(os.getenv("AUTH_REVOCATION_POLL", "1"))
+
+_cache: "OrderedDict[str, tuple]" = OrderedDict() # token -> (cached until, session expires_at, user id, username, created_at)
+_cache_lock = threading.Lock()
+_revocation = {"version": None, "checked_at": None}
+
 async def get_current_user(request: Request) -> User:
     """
     Dependency to get the current authenticated user from the request.
@@ -20,43 +41,105 @@ async def get_current_user(request: Request) -> User:
             detail="Not authenticated",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+
     token = auth_header.replace("Bearer ", "")
-    
-    # Get database session
-    db = next(get_db())
-    
-    try:
-        # Find session by token
-        session = db.query(SessionModel).filter(SessionModel.token == token).first()
-        
-        if not session:
+
+    # Serve recently validated tokens from the cache
+    await _check_revocations()
+    cached = _cache_get(token)
+    if cached is not None:
+        metrics.incr("auth.cache_hits")
+        return cached
+    metrics.incr("auth.cache_misses")
+
+    async with database.AsyncSessionLocal() as db:
+        # Find session and user together
+        row = (await db.execute(
+            select(SessionModel, User).outerjoin(User, User.id == SessionModel.user_id).where(SessionModel.token == token)
+        )).first()
+
+        if not row:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid or expired session",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        
+        session, user = row
+
         # Check if session expired
         if session.expires_at < datetime.datetime.utcnow():
-            db.delete(session)
-            db.commit()
+            await db.delete(session)
+            await db.commit()
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Session expired",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        
-        # Get user
-        user = db.query(User).filter(User.id == session.user_id).first()
+
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        
+
+        _cache_put(token, session.expires_at, user)
         return user
-        
-    finally:
-        db.close()
+
+async def revoke(db: AsyncSession, token: str):
+    """
+    Stop accepting a logged-out token: drop it from this worker's cache and
+    bump the revocation version (committed with the caller's transaction)
+    so other workers drop theirs.
+    """
+    with _cache_lock:
+        _cache.pop(token, None)
+    bump = update(AuthState).where(AuthState.id == 1).values(revocation_version=AuthState.revocation_version + 1)
+    if (await db.execute(bump)).rowcount:
+        return
+    try:
+        async with db.begin_nested():
+            db.add(AuthState(id=1, revocation_version=1))
+    except IntegrityError:
+        # Another logout created the row first
+        await db.execute(bump)
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+    _revocation.update(version=None, checked_at=None)
+
+async def _check_revocations():
+    now = time.monotonic()
+    if _revocation["checked_at"] is not None and now - _revocation["checked_at"] < AUTH_REVOCATION_POLL:
+        return
+    async with database.AsyncSessionLocal() as db:
+        version = (await db.execute(
+            select(AuthState.revocation_version).where(AuthState.id == 1)
+        )).scalar() or 0
+    if version != _revocation["version"]:
+        with _cache_lock:
+            _cache.clear()
+    _revocation.update(version=version, checked_at=now)
+
+def _cache_get(token: str):
+    with _cache_lock:
+        entry = _cache.get(token)
+        if entry is None:
+            return None
+        cached_until, expires_at, user_id, username, created_at = entry
+        if time.monotonic() >= cached_until or datetime.datetime.utcnow() >= expires_at:
+            del _cache[token]
+            return None
+        _cache.move_to_end(token)
+    # A fresh detached object per request, so no route can change a shared one
+    return User(id=user_id, username=username, created_at=created_at)
+
+def _cache_put(token: str, expires_at: datetime.datetime, user: User):
+    if AUTH_CACHE_SIZE <= 0:
+        return
+    with _cache_lock:
+        _cache[token] = (time.monotonic() + AUTH_CACHE_TTL, expires_at, user.id, user.username, user.created_at)
+        _cache.move_to_end(token)
+        while len(_cache) > AUTH_CACHE_SIZE:
+            _cache.popitem(last=False)
@@ -0,0 +1,9 @@
+"""
+Create missing tables from the models (what main.py's create_all used to do).
+"""
+
+import database
+import models # noqa: F401  (registers the tables on Base.metadata)
+
+def upgrade(conn):
+    database.Base.metadata.create_all(bind=conn)
@@ -0,0 +1,29 @@
+"""
+Indexes for the per-request queries, on databases created before them:
+
+- flashcards(document_id, next_review): due cards
+- chat_messages(document_id, timestamp): chat history
+- study_sessions(document_id, start_time): analytics stats
+- documents(user_id, id): ownership checks, and the user -> documents side
+  of the joins above
+- sessions(expires_at): the expired-session sweep (was created ad hoc in
+  main.py)
+
+Plain CREATE INDEX runs inside the migration transaction and blocks writes
+to the table while it builds; on a large Postgres table, create the index
+CONCURRENTLY by hand first and this becomes a no-op.
+"""
+
+from sqlalchemy import text
+
+INDEXES = [
+    ("ix_flashcards_document_id_next_review", "flashcards", "document_id, next_review"),
+    ("ix_chat_messages_document_id_timestamp", "chat_messages", 'document_id, "timestamp"'),
+    ("ix_study_sessions_document_id_start_time", "study_sessions", "document_id, start_time"),
+    ("ix_documents_user_id_id", "documents", "user_id, id"),
+    ("ix_sessions_expires_at", "sessions", "expires_at"),
+]
+
+def upgrade(conn):
+    for name, table, columns in INDEXES:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
@@ -0,0 +1,9 @@
+"""
+Daily study rollup table (see services/study_rollup.py). Rows are built
+lazily from study_sessions the first time a user's stats are requested.
+"""
+
+import models
+
+def upgrade(conn):
+    models.StudyDay.__table__.create(conn, checkfirst=True)
@@ -0,0 +1,17 @@
+"""
+Columns added to documents after the original schema, for databases created
+before them: content_hash (file dedup and the text/chunk caches) and status
+(background ingestion). Documents that predate ingestion jobs were processed
+at upload, so they are marked ready.
+"""
+
+from sqlalchemy import inspect, text
+
+def upgrade(conn):
+    columns = {column["name"] for column in inspect(conn).get_columns("documents")}
+    if "content_hash" not in columns:
+        conn.execute(text("ALTER TABLE documents ADD COLUMN content_hash VARCHAR"))
+    if "status" not in columns:
+        conn.execute(text("ALTER TABLE documents ADD COLUMN status VARCHAR"))
+        conn.execute(text("UPDATE documents SET status = 'ready'"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_documents_content_hash ON documents (content_hash)"))
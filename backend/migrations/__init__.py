@@ -0,0 +1,64 @@
+"""
+Schema migrations.
+
+Each module here is named <version>_<name>.py and defines upgrade(conn),
+which receives a SQLAlchemy Connection inside the migration transaction.
+upgrade() below applies the pending ones in version order at startup and
+records each in schema_migrations.
+
+0001_baseline creates any missing tables from the current models, so on a
+fresh database it already produces the latest schema. Later migrations
+bring existing databases up to date and must therefore be idempotent
+(CREATE INDEX IF NOT EXISTS, checking columns before adding them, ...).
+"""
+
+import datetime
+import importlib
+import os
+import pkgutil
+from typing import List, Tuple
+from sqlalchemy import insert, select, text
+import models
+
+# Arbitrary constant shared by every worker for the Postgres advisory lock
+MIGRATION_LOCK_KEY = 724_113_001
+
+def discover() -> List[Tuple[str, str, object]]:
+    """
+    (version, name, module) for every migration, in version order.
+    """
+    found = []
+    for info in pkgutil.iter_modules([os.path.dirname(__file__)]):
+        version, _, name = info.name.partition("_")
+        if not version.isdigit():
+            continue
+        found.append((version, name, importlib.import_module(f"{__name__}.{info.name}")))
+    return sorted(found, key=lambda m: m[0])
+
+def upgrade(engine) -> List[str]:
+    """
+    Apply pending migrations in one transaction. Returns the versions applied.
+    """
+    with engine.begin() as conn:
+        # 1. Serialize workers starting at the same time
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        elif conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+        # 2. Find what this database already has
+        models.SchemaMigration.__table__.create(conn, checkfirst=True)
+        applied = set(conn.execute(select(models.SchemaMigration.version)).scalars())
+
+        # 3. Run the rest in order
+        ran = []
+        for version, name, module in discover():
+            if version in applied:
+                continue
+            module.upgrade(conn)
+            conn.execute(insert(models.SchemaMigration).values(
+                version=version, name=name, applied_at=datetime.datetime.utcnow()
+            ))
+            print(f"Applied migration {version}_{name}")
+            ran.append(version)
+        return ran
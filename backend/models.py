@@ -1,5 +1,5 @@
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Float, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 import datetime
 from database import Base
@@ -14,6 +14,7 @@ class User(Base):
     # Relationships
     documents = relationship("Document", back_populates="user", cascade="all, delete-orphan")
     sessions = relationship("Session", back_populates="user", cascade="all, delete-orphan")
+    category_model = relationship("CategoryModel", uselist=False, cascade="all, delete-orphan")
 
 class Session(Base):
     __tablename__ = "sessions"
@@ -22,12 +23,26 @@ class Session(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     token = Column(String, unique=True, index=True, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
-    expires_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True) # Expired rows are removed by services/sessions
     
     user = relationship("User", back_populates="sessions")
 
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+    
+    version = Column(String, primary_key=True) # Filename prefix in migrations/, e.g. "0002"
+    name = Column(String, nullable=False)
+    applied_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class AuthState(Base):
+    __tablename__ = "auth_state"
+    
+    id = Column(Integer, primary_key=True) # Single row
+    revocation_version = Column(Integer, nullable=False, default=0) # Bumped on logout so every worker drops cached sessions
+
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (Index("ix_documents_user_id_id", "user_id", "id"),) # Ownership checks and per-user joins
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -37,13 +52,87 @@ class Document(Base):
     upload_date = Column(DateTime, default=datetime.datetime.utcnow)
     category = Column(String, default="Uncategorized")
     summary = Column(String, nullable=True)
+    content_hash = Column(String, index=True, nullable=True) # sha256 of the uploaded bytes
+    status = Column(String, default="pending") # "pending", "processing", "ready", "failed"
     
     # Relationships
     user = relationship("User", back_populates="documents")
     chat_messages = relationship("ChatMessage", back_populates="document", cascade="all, delete-orphan")
+    chat_summary = relationship("ChatSummary", uselist=False, cascade="all, delete-orphan")
+
+class StoredFile(Base):
+    __tablename__ = "stored_files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String, unique=True, index=True, nullable=False)
+    file_path = Column(String, nullable=False)
+    size_bytes = Column(Integer, default=0)
+    ref_count = Column(Integer, default=0) # Number of Document rows using this file
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class ExtractedText(Base):
+    __tablename__ = "extracted_texts"
+    __table_args__ = (UniqueConstraint("content_hash", "parser_version"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String, index=True, nullable=False)
+    parser_version = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), index=True)
+    status = Column(String, default="queued") # "queued", "running", "succeeded", "failed"
+    stage = Column(String, nullable=True) # Pipeline stage currently (or last) running
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    document = relationship("Document", back_populates="jobs")
+
+class DocumentChunk(Base):
+    __tablename__ = "document_chunks"
+    __table_args__ = (UniqueConstraint("content_hash", "parser_version", "ordinal"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String, index=True, nullable=False)
+    parser_version = Column(Integer, nullable=False)
+    ordinal = Column(Integer, nullable=False) # Position of the chunk in the document
+    start_offset = Column(Integer, nullable=False) # Character offsets into the extracted text
+    end_offset = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    token_estimate = Column(Integer, default=0)
+    location_kind = Column(String) # "page", "slide", "paragraph" or "chunk"
+    location_start = Column(Integer) # First and last 0-based page/slide/paragraph covered
+    location_end = Column(Integer)
+
+class SearchIndex(Base):
+    __tablename__ = "search_indexes"
+    __table_args__ = (UniqueConstraint("content_hash", "parser_version"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String, index=True, nullable=False)
+    parser_version = Column(Integer, nullable=False)
+    data = Column(Text, nullable=False) # JSON-encoded BM25 postings over document_chunks
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache_entries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, unique=True, index=True, nullable=False) # sha256 of provider, model, prompt and params
+    endpoint = Column(String, index=True) # "flashcards", "quiz", "category", ...
+    value = Column(Text, nullable=False) # JSON-encoded response
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (Index("ix_chat_messages_document_id_timestamp", "document_id", "timestamp"),)
     
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(Integer, ForeignKey("documents.id"))
@@ -53,8 +142,26 @@ class ChatMessage(Base):
     
     document = relationship("Document", back_populates="chat_messages")
 
+class ChatSummary(Base):
+    __tablename__ = "chat_summaries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), unique=True, nullable=False)
+    content = Column(Text, nullable=False, default="") # Rolling summary of messages older than the prompt window
+    covered_through_id = Column(Integer, nullable=False, default=0) # Last chat_messages.id folded into content
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class CategoryModel(Base):
+    __tablename__ = "category_models"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
+    data = Column(Text, nullable=False) # JSON-encoded naive Bayes counts (see services/classifier.py)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
 class StudySession(Base):
     __tablename__ = "study_sessions"
+    __table_args__ = (Index("ix_study_sessions_document_id_start_time", "document_id", "start_time"),)
     
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(Integer, ForeignKey("documents.id"))
@@ -65,8 +172,22 @@ class StudySession(Base):
     
     document = relationship("Document", back_populates="study_sessions")
 
+class StudyDay(Base):
+    __tablename__ = "study_days"
+    # One range scan per (user, offset) serves the whole stats dashboard
+    __table_args__ = (Index("ix_study_days_user_offset_date", "user_id", "tz_offset", "local_date", "activity_type", unique=True),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    tz_offset = Column(Integer, nullable=False) # Minutes behind UTC, as the browser reports it
+    local_date = Column(Date, nullable=False)
+    activity_type = Column(String, nullable=False)
+    seconds = Column(Integer, nullable=False, default=0)
+    sessions = Column(Integer, nullable=False, default=0)
+
 class Flashcard(Base):
     __tablename__ = "flashcards"
+    __table_args__ = (Index("ix_flashcards_document_id_next_review", "document_id", "next_review"),)
     
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(Integer, ForeignKey("documents.id"))
@@ -84,3 +205,4 @@ class Flashcard(Base):
 # Update Document to include relationships
 Document.study_sessions = relationship("StudySession", back_populates="document", cascade="all, delete-orphan")
 Document.flashcards = relationship("Flashcard", back_populates="document", cascade="all, delete-orphan")
+Document.jobs = relationship("IngestionJob", back_populates="document", cascade="all, delete-orphan")
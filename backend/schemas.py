@@ -14,10 +14,30 @@ class Document(DocumentBase):
     upload_date: datetime
     file_type: str
     summary: Optional[str] = None
+    status: Optional[str] = None
 
     class Config:
         from_attributes = True
 
+class IngestionJob(BaseModel):
+    id: int
+    document_id: int
+    status: str
+    stage: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class DocumentStatus(BaseModel):
+    document_id: int
+    status: str
+    category: str
+    job: Optional[IngestionJob] = None
+
 class ChatMessageBase(BaseModel):
     role: str
     content: str
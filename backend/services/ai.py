@@ -1,9 +1,11 @@
 import os
 import json
 import httpx
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, AsyncIterator, Callable
 from dotenv import load_dotenv
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+from services import json_stream, llm_cache, metrics, resilience
+from services.resilience import ProviderUnavailable
 
 load_dotenv(override=True)
 
@@ -13,21 +15,105 @@ ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-3-opus-20240229")
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
+# Provider to fail over to when the primary one errors or its circuit is open
+LLM_FALLBACK_PROVIDER = os.getenv("LLM_FALLBACK_PROVIDER", "").lower()
 
-# Initialize Anthropic client if needed
-anthropic_client = None
-if AI_PROVIDER == "anthropic" and ANTHROPIC_API_KEY:
-    anthropic_client = Anthropic(api_key=ANTHROPIC_API_KEY)
+# Connection pool size per provider client
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
 
-def generate_flashcards(text: str, num_cards: int = 5, exclude_topics: List[str] = None) -> List[Dict[str, str]]:
+# Length cap for the rolling chat summary (see services/conversation.py)
+CHAT_SUMMARY_WORDS = int(os.getenv("CHAT_SUMMARY_WORDS", "250"))
+# Length caps for ingest-time document summaries (see services/summarizer.py)
+SECTION_SUMMARY_WORDS = int(os.getenv("SECTION_SUMMARY_WORDS", "150"))
+DOCUMENT_SUMMARY_WORDS = int(os.getenv("DOCUMENT_SUMMARY_WORDS", "400"))
+
+# Shared async clients, created once at app startup so concurrent requests
+# reuse pooled connections instead of blocking the event loop
+http_client: Optional[httpx.AsyncClient] = None
+anthropic_client: Optional[AsyncAnthropic] = None
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE
+    )
+
+async def startup():
+    """
+    Create the shared provider clients. Called from the app startup hook.
+    """
+    global http_client, anthropic_client
+    if http_client is None:
+        http_client = httpx.AsyncClient(limits=_pool_limits())
+    if anthropic_client is None and "anthropic" in providers() and ANTHROPIC_API_KEY:
+        anthropic_client = AsyncAnthropic(
+            api_key=ANTHROPIC_API_KEY,
+            # Retries and deadlines are handled by services/resilience
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(limits=_pool_limits())
+        )
+
+async def shutdown():
+    """
+    Close the shared provider clients and their connection pools.
+    """
+    global http_client, anthropic_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+    if anthropic_client is not None:
+        await anthropic_client.close()
+        anthropic_client = None
+
+async def _clients():
+    # Scripts and tests may call in without the app startup hook
+    if http_client is None:
+        await startup()
+
+def providers() -> List[str]:
+    """
+    The provider failover chain: AI_PROVIDER, then LLM_FALLBACK_PROVIDER.
+    """
+    chain = [AI_PROVIDER]
+    if LLM_FALLBACK_PROVIDER and LLM_FALLBACK_PROVIDER != AI_PROVIDER:
+        chain.append(LLM_FALLBACK_PROVIDER)
+    return chain
+
+def _require_anthropic():
+    if not anthropic_client:
+        raise ProviderUnavailable("Anthropic client not initialized. Check API key.")
+
+async def generate_flashcards(text: str, num_cards: int = 5, exclude_topics: List[str] = None, use_cache: bool = True) -> List[Dict[str, str]]:
     """
     Generate flashcards using the configured AI provider.
+    Identical requests are served from the response cache unless use_cache is False.
     """
     if not text:
         return []
     
-    system_prompt = "You are a helpful study assistant. You MUST return a valid JSON array of objects. Do not include any other text."
+    prompt = _flashcard_prompt(text, num_cards, exclude_topics)
+    return await _generate("flashcards", prompt, _JSON_ARRAY_SYSTEM_PROMPT, _valid_flashcard, use_cache)
+
+async def stream_flashcards(
+    text: str,
+    num_cards: int = 5,
+    exclude_topics: List[str] = None,
+    use_cache: bool = True,
+    stats: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[Dict[str, str]]:
+    """
+    Like generate_flashcards, but yields each card as soon as the provider
+    has finished writing it. stats is filled with truncated/invalid counts.
+    """
+    if not text:
+        return
     
+    prompt = _flashcard_prompt(text, num_cards, exclude_topics)
+    async for card in _stream_generate("flashcards", prompt, _JSON_ARRAY_SYSTEM_PROMPT, _valid_flashcard, use_cache, stats):
+        yield card
+
+def _flashcard_prompt(text: str, num_cards: int, exclude_topics: List[str] = None) -> str:
     # Build the exclusion instruction if topics are provided
     exclusion_text = ""
     if exclude_topics:
@@ -40,7 +126,7 @@ def generate_flashcards(text: str, num_cards: int = 5, exclude_topics: List[str]
     Focus on NEW aspects, alternative perspectives, or related but distinct concepts.
     """
     
-    prompt = f"""
+    return f"""
     Generate EXACTLY {num_cards} flashcards based on the following text.
     Return ONLY a JSON array of objects with 'front' and 'back' keys.
     {exclusion_text}
@@ -54,22 +140,37 @@ def generate_flashcards(text: str, num_cards: int = 5, exclude_topics: List[str]
     Text:
     {text[:10000]}
     """
-    
-    if AI_PROVIDER == "ollama":
-        return _generate_with_ollama(prompt, system_prompt)
-    else:
-        return _generate_with_anthropic(prompt)
 
-def generate_quiz(text: str, num_questions: int = 5) -> List[Dict[str, Any]]:
+async def generate_quiz(text: str, num_questions: int = 5, use_cache: bool = True) -> List[Dict[str, Any]]:
     """
     Generate a quiz using the configured AI provider.
+    Identical requests are served from the response cache unless use_cache is False.
     """
     if not text:
         return []
-        
-    system_prompt = "You are a helpful study assistant. You MUST return a valid JSON array of objects. Do not include any other text."
+    
+    prompt = _quiz_prompt(text, num_questions)
+    return await _generate("quiz", prompt, _JSON_ARRAY_SYSTEM_PROMPT, _valid_question, use_cache)
 
-    prompt = f"""
+async def stream_quiz(
+    text: str,
+    num_questions: int = 5,
+    use_cache: bool = True,
+    stats: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Like generate_quiz, but yields each question as soon as the provider has
+    finished writing it. stats is filled with truncated/invalid counts.
+    """
+    if not text:
+        return
+    
+    prompt = _quiz_prompt(text, num_questions)
+    async for question in _stream_generate("quiz", prompt, _JSON_ARRAY_SYSTEM_PROMPT, _valid_question, use_cache, stats):
+        yield question
+
+def _quiz_prompt(text: str, num_questions: int) -> str:
+    return f"""
     Generate EXACTLY {num_questions} multiple-choice questions based on the following text.
     Return ONLY a JSON array of objects with the following structure:
     
@@ -86,143 +187,416 @@ def generate_quiz(text: str, num_questions: int = 5) -> List[Dict[str, Any]]:
     Text:
     {text[:10000]}
     """
+
+_JSON_ARRAY_SYSTEM_PROMPT = "You are a helpful study assistant. You MUST return a valid JSON array of objects. Do not include any other text."
+
+def _valid_flashcard(item: Any) -> Optional[Dict[str, str]]:
+    if not isinstance(item, dict):
+        return None
+    front, back = item.get("front"), item.get("back")
+    if not isinstance(front, str) or not isinstance(back, str) or not front.strip() or not back.strip():
+        return None
+    return {"front": front.strip(), "back": back.strip()}
+
+def _valid_question(item: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(item, dict):
+        return None
+    question, options, answer = item.get("question"), item.get("options"), item.get("correct_answer")
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if not isinstance(options, list) or len(options) < 2:
+        return None
+    if not all(isinstance(option, str) and option.strip() for option in options):
+        return None
+    if answer not in options:
+        return None
+    return {"question": question.strip(), "options": options, "correct_answer": answer}
+
+# Fields of a flashcard or question; an object with any of them is an item, not a wrapper
+_ITEM_KEYS = {"front", "back", "question", "options", "correct_answer"}
+
+def _validated(endpoint: str, items: Any, validate: Callable[[Any], Optional[dict]]) -> List[dict]:
+    """
+    Keep the items that pass validate, dropping (and counting) the rest.
+    Lists wrapped in an object (e.g. {"flashcards": [...]}) are unwrapped.
+    """
+    valid = []
+    for item in items if isinstance(items, list) else [items]:
+        if isinstance(item, dict) and not _ITEM_KEYS & item.keys():
+            nested = [value for value in item.values() if isinstance(value, list)]
+            if len(nested) == 1:
+                valid.extend(_validated(endpoint, nested[0], validate))
+                continue
+        checked = validate(item)
+        if checked is None:
+            metrics.incr(f"generation.{endpoint}.invalid")
+        else:
+            valid.append(checked)
+    return valid
+
+async def _generate(endpoint: str, prompt: str, system_prompt: str, validate: Callable[[Any], Optional[dict]], use_cache: bool) -> Any:
+    answered = {}
+    async def call():
+        try:
+            parsed = await resilience.call("generate", providers(), {
+                "anthropic": lambda: _generate_with_anthropic(prompt),
+                "ollama": lambda: _generate_with_ollama(prompt, system_prompt),
+            }, answered)
+        except Exception as e:
+            print(f"Generating {endpoint} failed: {str(e)}")
+            return []
+        return _validated(endpoint, parsed, validate)
     
-    if AI_PROVIDER == "ollama":
-        return _generate_with_ollama(prompt, system_prompt)
-    else:
-        return _generate_with_anthropic(prompt)
+    key = llm_cache.make_key(AI_PROVIDER, _model_name(), prompt, system=system_prompt, max_tokens=1024)
+    return await llm_cache.cached(endpoint, key, call, enabled=use_cache, store=_from_primary(answered))
 
-def _generate_with_anthropic(prompt: str) -> Any:
-    if not anthropic_client:
-        print("Anthropic client not initialized. Check API key.")
-        return []
-        
+async def _stream_generate(
+    endpoint: str,
+    prompt: str,
+    system_prompt: str,
+    validate: Callable[[Any], Optional[dict]],
+    use_cache: bool,
+    stats: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[dict]:
+    # Shares cache entries with _generate: a cached batch is replayed at once
+    key = llm_cache.make_key(AI_PROVIDER, _model_name(), prompt, system=system_prompt, max_tokens=1024)
+    enabled = use_cache and llm_cache.is_enabled(endpoint)
+    if stats is None:
+        stats = {}
+    stats.update(truncated=False, invalid=0)
+    if enabled:
+        cached = await llm_cache.get(endpoint, key)
+        if cached is not None:
+            for item in cached:
+                yield item
+            return
+    else:
+        metrics.incr(f"llm_cache.{endpoint}.bypass")
+    
+    parser = json_stream.JSONArrayStream()
+    items = []
+    failed = False
+    answered = {}
     try:
-        response = anthropic_client.messages.create(
-            model=ANTHROPIC_MODEL,
-            max_tokens=1024,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-        content = response.content[0].text
-        return _parse_json_response(content)
+        texts = resilience.stream("generate", providers(), {
+            "anthropic": lambda: _stream_text_with_anthropic(prompt, system_prompt, max_tokens=1024),
+            "ollama": lambda: _stream_text_with_ollama(prompt, system_prompt, max_tokens=1024),
+        }, answered)
+        async for text in texts:
+            for obj in parser.feed(text):
+                valid = _validated(endpoint, obj, validate)
+                if not valid:
+                    stats["invalid"] += 1
+                for item in valid:
+                    items.append(item)
+                    yield item
     except Exception as e:
-        print(f"Anthropic Error: {str(e)}")
-        return []
+        print(f"Streaming {endpoint} error: {str(e)}")
+        failed = True
+    
+    stats["invalid"] += parser.invalid
+    if parser.truncated:
+        # Usually max_tokens; the objects that did close were kept
+        stats["truncated"] = True
+        metrics.incr(f"generation.{endpoint}.truncated")
+        print(f"Streaming {endpoint} output was cut off; salvaged {len(items)} items")
+    if enabled and not failed and _from_primary(answered)(items):
+        await llm_cache.put(endpoint, key, items)
 
-def _generate_with_ollama(prompt: str, system_prompt: str = None) -> Any:
-    try:
-        url = f"{OLLAMA_URL}/api/generate"
-        payload = {
-            "model": OLLAMA_MODEL,
-            "prompt": prompt,
-            "stream": False,
-            "format": "json"
-        }
-        
-        if system_prompt:
-            payload["system"] = system_prompt
-        
-        print(f"Sending request to Ollama: {url}, model={OLLAMA_MODEL}")
-        response = httpx.post(url, json=payload, timeout=60.0)
+async def _stream_text_with_anthropic(prompt: str, system_prompt: str, max_tokens: int) -> AsyncIterator[str]:
+    # Raw completion text as the provider produces it
+    await _clients()
+    _require_anthropic()
+    async with anthropic_client.messages.stream(
+        model=ANTHROPIC_MODEL,
+        max_tokens=max_tokens,
+        system=system_prompt,
+        messages=[{"role": "user", "content": prompt}]
+    ) as stream:
+        async for text in stream.text_stream:
+            yield text
+
+async def _stream_text_with_ollama(prompt: str, system_prompt: str, max_tokens: int) -> AsyncIterator[str]:
+    await _clients()
+    url = f"{OLLAMA_URL}/api/generate"
+    payload = {
+        "model": OLLAMA_MODEL,
+        "prompt": prompt,
+        "system": system_prompt,
+        "stream": True,
+        "format": "json",
+        "options": {"num_predict": max_tokens}
+    }
+    async with http_client.stream("POST", url, json=payload, timeout=60.0) as response:
         response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            if chunk.get("response"):
+                yield chunk["response"]
+            if chunk.get("done"):
+                break
+
+def _model_name() -> str:
+    return OLLAMA_MODEL if AI_PROVIDER == "ollama" else ANTHROPIC_MODEL
+
+def _from_primary(answered: Dict[str, str]) -> Callable[[Any], bool]:
+    # Cache keys name AI_PROVIDER and its model, so answers from the fallback are not stored
+    return lambda value: bool(value) and answered.get("provider") == AI_PROVIDER
+
+# Provider calls below raise on errors; services/resilience decides whether
+# to retry, fail over or give up.
+
+async def _generate_with_anthropic(prompt: str) -> Any:
+    await _clients()
+    _require_anthropic()
+    
+    response = await anthropic_client.messages.create(
+        model=ANTHROPIC_MODEL,
+        max_tokens=1024,
+        messages=[
+            {"role": "user", "content": prompt}
+        ]
+    )
+    content = response.content[0].text
+    return _parse_json_response(content)
+
+async def _generate_with_ollama(prompt: str, system_prompt: str = None) -> Any:
+    url = f"{OLLAMA_URL}/api/generate"
+    payload = {
+        "model": OLLAMA_MODEL,
+        "prompt": prompt,
+        "stream": False,
+        "format": "json"
+    }
+    
+    if system_prompt:
+        payload["system"] = system_prompt
+    
+    print(f"Sending request to Ollama: {url}, model={OLLAMA_MODEL}")
+    await _clients()
+    response = await http_client.post(url, json=payload, timeout=60.0)
+    response.raise_for_status()
+    
+    result = response.json()
+    content = result.get("response", "")
+    print(f"Ollama Raw Response: {content[:200]}...") 
+    
+    parsed = _parse_json_response(content)
+    
+    # Fix: If model returns a single object instead of a list, wrap it
+    if isinstance(parsed, dict):
+        print("Warning: Model returned a single object instead of a list. Wrapping it.")
+        parsed = [parsed]
         
-        result = response.json()
-        content = result.get("response", "")
-        print(f"Ollama Raw Response: {content[:200]}...") 
-        
-        parsed = _parse_json_response(content)
+    if not parsed:
+        print(f"Failed to parse JSON. Raw content: {content}")
         
-        # Fix: If model returns a single object instead of a list, wrap it
-        if isinstance(parsed, dict):
-            print("Warning: Model returned a single object instead of a list. Wrapping it.")
-            parsed = [parsed]
-            
-        if not parsed:
-            print(f"Failed to parse JSON. Raw content: {content}")
-            
-        return parsed
-    except Exception as e:
-        print(f"Ollama Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return []
+    return parsed
 
-def generate_chat_response(messages: List[Dict[str, str]], context_text: str) -> str:
+async def generate_chat_response(
+    messages: List[Dict[str, str]],
+    context_text: str,
+    overview_text: str = "",
+    usage: Optional[Dict[str, int]] = None,
+    summary_text: str = ""
+) -> str:
     """
     Generate a chat response based on conversation history and document context.
+    The instructions and overview_text form a prefix that stays the same on every
+    turn, so the provider can cache it; context_text (the passages retrieved for
+    this turn, see retrieval.select_context) is attached to the latest user message.
+    summary_text summarizes earlier turns no longer in messages.
+    If usage is given it is filled with the provider's token counts.
     """
-    system_prompt = f"""You are a helpful AI study assistant. 
-    Answer the user's questions based ONLY on the provided context. 
-    If the answer is not in the context, say "I cannot answer this based on the document."
+    system_prompt = _chat_system_prompt(overview_text)
+    messages = _with_context(messages, context_text)
     
-    Context:
-    {context_text[:10000]}
+    try:
+        return await resilience.call("chat", providers(), {
+            "anthropic": lambda: _chat_with_anthropic(messages, system_prompt, usage, summary_text),
+            "ollama": lambda: _chat_with_ollama(messages, system_prompt + _summary_prompt(summary_text)),
+        })
+    except Exception as e:
+        print(f"Chat Error: {str(e)}")
+        return "I encountered an error while processing your request."
+
+async def stream_chat_response(
+    messages: List[Dict[str, str]],
+    context_text: str,
+    overview_text: str = "",
+    usage: Optional[Dict[str, int]] = None,
+    summary_text: str = ""
+) -> AsyncIterator[str]:
     """
+    Like generate_chat_response, but yields text fragments as the provider
+    produces them. usage is filled once the stream completes.
+    """
+    system_prompt = _chat_system_prompt(overview_text)
+    messages = _with_context(messages, context_text)
     
-    # Prepare messages for the AI
-    ai_messages = []
-    
-    # Add system prompt
-    if AI_PROVIDER == "anthropic":
-        # Anthropic uses a separate system parameter, but we can also prepend it to the first user message
-        # or strictly use the system parameter if the client supports it.
-        # For simplicity in this specific function structure, we'll handle it in the call.
-        pass 
-    elif AI_PROVIDER == "ollama":
-        # Ollama accepts system message in the list or as a parameter
-        pass
-
-    # Convert history to format expected by provider
-    # We assume messages is a list of {"role": "user"/"assistant", "content": "..."}
+    stream = resilience.stream("chat", providers(), {
+        "anthropic": lambda: _stream_chat_with_anthropic(messages, system_prompt, usage, summary_text),
+        "ollama": lambda: _stream_chat_with_ollama(messages, system_prompt + _summary_prompt(summary_text)),
+    })
     
-    if AI_PROVIDER == "ollama":
-        return _chat_with_ollama(messages, system_prompt)
-    else:
-        return _chat_with_anthropic(messages, system_prompt)
-
-def _chat_with_anthropic(messages: List[Dict[str, str]], system_prompt: str) -> str:
-    if not anthropic_client:
-        return "Error: Anthropic client not initialized."
-        
+    emitted = False
     try:
-        response = anthropic_client.messages.create(
-            model=ANTHROPIC_MODEL,
-            max_tokens=1024,
-            system=system_prompt,
-            messages=messages
-        )
-        return response.content[0].text
+        async for text in stream:
+            emitted = True
+            yield text
     except Exception as e:
-        print(f"Anthropic Chat Error: {str(e)}")
-        return "I encountered an error while processing your request."
+        print(f"Chat Stream Error: {str(e)}")
+        if not emitted:
+            yield "I encountered an error while processing your request."
 
-def _chat_with_ollama(messages: List[Dict[str, str]], system_prompt: str) -> str:
-    try:
-        url = f"{OLLAMA_URL}/api/chat"
-        
-        # Ollama expects system message as a message with role "system" in the messages list
-        # OR as a separate parameter. Let's use the messages list approach for chat.
-        full_messages = [{"role": "system", "content": system_prompt}] + messages
-        
-        payload = {
-            "model": OLLAMA_MODEL,
-            "messages": full_messages,
-            "stream": False
+def _chat_system_prompt(overview_text: str) -> str:
+    prompt = """You are a helpful AI study assistant. 
+    Answer the user's questions based ONLY on the provided document overview and passages. 
+    If the answer is not in them, say "I cannot answer this based on the document."
+    """
+    if overview_text:
+        prompt += f"""
+    Document overview:
+    {overview_text}
+    """
+    return prompt
+
+def _summary_prompt(summary_text: str) -> str:
+    if not summary_text:
+        return ""
+    return f"""
+    Summary of the earlier conversation:
+    {summary_text}
+    """
+
+def _with_context(messages: List[Dict[str, str]], context_text: str) -> List[Dict[str, str]]:
+    # Retrieved passages change every turn, so they go with the question rather
+    # than in the system prompt where they would invalidate the cached prefix
+    if not messages or not context_text:
+        return messages
+    *history, current = messages
+    content = f"Relevant passages:\n{context_text}\n\nQuestion: {current['content']}"
+    return history + [{"role": current["role"], "content": content}]
+
+def _cacheable(messages: List[Dict[str, str]], system_prompt: str, summary_text: str = ""):
+    """
+    Build Anthropic system blocks and messages with prompt-cache breakpoints:
+    one after the system prompt (instructions + overview) and one after the
+    history preceding the current question. The conversation summary sits
+    between the two, so compaction does not invalidate the overview.
+    """
+    system = [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+    if summary_text:
+        system.append({"type": "text", "text": _summary_prompt(summary_text)})
+    blocks = list(messages)
+    if len(blocks) > 1:
+        previous = blocks[-2]
+        blocks[-2] = {
+            "role": previous["role"],
+            "content": [{"type": "text", "text": previous["content"], "cache_control": {"type": "ephemeral"}}]
         }
-        
-        print(f"Sending chat request to Ollama: {url}, model={OLLAMA_MODEL}")
-        response = httpx.post(url, json=payload, timeout=60.0)
+    return system, blocks
+
+def _record_usage(provider_usage, usage: Optional[Dict[str, int]]):
+    counts = {
+        name: getattr(provider_usage, name, None) or 0
+        for name in ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+    }
+    metrics.incr("llm.chat.requests")
+    if counts["cache_read_input_tokens"]:
+        metrics.incr("llm.chat.cache_hits")
+    for name, value in counts.items():
+        metrics.incr(f"llm.chat.{name}", value)
+    if usage is not None:
+        usage.update(counts)
+
+async def _chat_with_anthropic(
+    messages: List[Dict[str, str]],
+    system_prompt: str,
+    usage: Optional[Dict[str, int]] = None,
+    summary_text: str = ""
+) -> str:
+    await _clients()
+    _require_anthropic()
+    
+    system, blocks = _cacheable(messages, system_prompt, summary_text)
+    response = await anthropic_client.messages.create(
+        model=ANTHROPIC_MODEL,
+        max_tokens=1024,
+        system=system,
+        messages=blocks
+    )
+    _record_usage(response.usage, usage)
+    return response.content[0].text
+
+async def _chat_with_ollama(messages: List[Dict[str, str]], system_prompt: str) -> str:
+    url = f"{OLLAMA_URL}/api/chat"
+    
+    # Ollama expects system message as a message with role "system" in the messages list
+    # OR as a separate parameter. Let's use the messages list approach for chat.
+    full_messages = [{"role": "system", "content": system_prompt}] + messages
+    
+    payload = {
+        "model": OLLAMA_MODEL,
+        "messages": full_messages,
+        "stream": False
+    }
+    
+    print(f"Sending chat request to Ollama: {url}, model={OLLAMA_MODEL}")
+    await _clients()
+    response = await http_client.post(url, json=payload, timeout=60.0)
+    response.raise_for_status()
+    
+    result = response.json()
+    return result.get("message", {}).get("content", "")
+
+async def _stream_chat_with_anthropic(
+    messages: List[Dict[str, str]],
+    system_prompt: str,
+    usage: Optional[Dict[str, int]] = None,
+    summary_text: str = ""
+) -> AsyncIterator[str]:
+    await _clients()
+    _require_anthropic()
+    
+    system, blocks = _cacheable(messages, system_prompt, summary_text)
+    async with anthropic_client.messages.stream(
+        model=ANTHROPIC_MODEL,
+        max_tokens=1024,
+        system=system,
+        messages=blocks
+    ) as stream:
+        async for text in stream.text_stream:
+            yield text
+        final = await stream.get_final_message()
+        _record_usage(final.usage, usage)
+
+async def _stream_chat_with_ollama(messages: List[Dict[str, str]], system_prompt: str) -> AsyncIterator[str]:
+    url = f"{OLLAMA_URL}/api/chat"
+    payload = {
+        "model": OLLAMA_MODEL,
+        "messages": [{"role": "system", "content": system_prompt}] + messages,
+        "stream": True
+    }
+    
+    print(f"Sending streaming chat request to Ollama: {url}, model={OLLAMA_MODEL}")
+    await _clients()
+    async with http_client.stream("POST", url, json=payload, timeout=60.0) as response:
         response.raise_for_status()
-        
-        result = response.json()
-        return result.get("message", {}).get("content", "")
-    except Exception as e:
-        print(f"Ollama Chat Error: {str(e)}")
-        return "I encountered an error while processing your request."
+        # Ollama streams one JSON object per line
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            text = chunk.get("message", {}).get("content", "")
+            if text:
+                yield text
+            if chunk.get("done"):
+                break
 
-def suggest_category(text: str) -> str:
+async def suggest_category(text: str, use_cache: bool = True) -> str:
     """
     Suggest a category for the document based on its content.
     Returns a short string (e.g., "History", "Science", "Business").
@@ -240,40 +614,127 @@ def suggest_category(text: str) -> str:
     {text[:5000]}
     """
     
+    key = llm_cache.make_key(AI_PROVIDER, _model_name(), prompt, system=system_prompt, max_tokens=50)
+    answered = {}
     try:
-        if AI_PROVIDER == "ollama":
-            # Reuse _generate_with_ollama but we need to handle non-JSON response
-            # Since _generate_with_ollama expects JSON, we'll make a simple direct call here.
-            url = f"{OLLAMA_URL}/api/generate"
-            payload = {
-                "model": OLLAMA_MODEL,
-                "prompt": prompt,
-                "system": system_prompt,
-                "stream": False
-            }
-            response = httpx.post(url, json=payload, timeout=30.0)
-            if response.status_code == 200:
-                return response.json().get("response", "").strip()
-            return "Uncategorized"
-        else:
-            if not anthropic_client:
-                return "Uncategorized"
-            response = anthropic_client.messages.create(
-                model=ANTHROPIC_MODEL,
-                max_tokens=50,
-                system=system_prompt,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.content[0].text.strip()
+        category = await llm_cache.cached(
+            "category", key, lambda: _complete_text("category", prompt, system_prompt, max_tokens=50, answered=answered),
+            enabled=use_cache, store=_from_primary(answered)
+        )
+        return category or "Uncategorized"
     except Exception as e:
         print(f"Category suggestion error: {str(e)}")
         return "Uncategorized"
 
+async def summarize_conversation(previous_summary: str, messages: List[Dict[str, str]]) -> str:
+    """
+    Fold chat messages that have left the prompt window into the running
+    conversation summary. Returns "" on failure so the caller keeps the
+    previous summary and retries later.
+    """
+    system_prompt = "You are a helpful assistant that keeps concise running notes of a study conversation."
+    
+    transcript = "\n".join(f"{msg['role'].capitalize()}: {msg['content']}" for msg in messages)
+    prompt = f"""
+    Update the summary of the conversation so far with the new messages below.
+    Keep the facts, definitions and explanations given, the questions the student asked, and anything they said they struggle with.
+    Write plain prose of at most {CHAT_SUMMARY_WORDS} words. Return ONLY the updated summary.
+    
+    Summary so far:
+    {previous_summary or "(none)"}
+    
+    New messages:
+    {transcript}
+    """
+    
+    try:
+        return await _complete_text("summary", prompt, system_prompt, max_tokens=CHAT_SUMMARY_WORDS * 2)
+    except Exception as e:
+        print(f"Conversation summary error: {str(e)}")
+        return ""
+
+async def summarize_section(text: str) -> str:
+    """
+    Summarize one section of a document. Returns "" on failure.
+    """
+    system_prompt = "You are a helpful study assistant that writes dense, factual summaries of course material."
+    
+    prompt = f"""
+    Summarize the following section of a document for a student.
+    Keep the key concepts, definitions, facts, figures and how they relate. Do not add anything that is not in the text.
+    Write plain prose of at most {SECTION_SUMMARY_WORDS} words. Return ONLY the summary.
+    
+    Text:
+    {text}
+    """
+    
+    try:
+        return await _complete_text("summary", prompt, system_prompt, max_tokens=SECTION_SUMMARY_WORDS * 2)
+    except Exception as e:
+        print(f"Section summary error: {str(e)}")
+        return ""
+
+async def combine_summaries(summaries: List[str]) -> str:
+    """
+    Merge consecutive section summaries into one summary of the whole,
+    in document order. Returns "" on failure.
+    """
+    system_prompt = "You are a helpful study assistant that writes dense, factual summaries of course material."
+    
+    sections = "\n\n".join(f"Section {i + 1}:\n{summary}" for i, summary in enumerate(summaries))
+    prompt = f"""
+    The following are summaries of consecutive sections of one document.
+    Combine them into a single summary of the whole document that follows its structure and keeps the most important concepts, definitions and facts.
+    Write plain prose of at most {DOCUMENT_SUMMARY_WORDS} words. Return ONLY the summary.
+    
+    {sections}
+    """
+    
+    try:
+        return await _complete_text("summary", prompt, system_prompt, max_tokens=DOCUMENT_SUMMARY_WORDS * 2)
+    except Exception as e:
+        print(f"Document summary error: {str(e)}")
+        return ""
+
+async def _complete_text(operation: str, prompt: str, system_prompt: str, max_tokens: int, answered: Optional[Dict[str, str]] = None) -> str:
+    # Plain-text completion. Raises on provider errors so failures are never cached
+    return await resilience.call(operation, providers(), {
+        "anthropic": lambda: _complete_with_anthropic(prompt, system_prompt, max_tokens),
+        "ollama": lambda: _complete_with_ollama(prompt, system_prompt),
+    }, answered)
+
+async def _complete_with_anthropic(prompt: str, system_prompt: str, max_tokens: int) -> str:
+    await _clients()
+    _require_anthropic()
+    response = await anthropic_client.messages.create(
+        model=ANTHROPIC_MODEL,
+        max_tokens=max_tokens,
+        system=system_prompt,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    return response.content[0].text.strip()
+
+async def _complete_with_ollama(prompt: str, system_prompt: str) -> str:
+    # _generate_with_ollama expects JSON, so make a simple direct call here
+    await _clients()
+    url = f"{OLLAMA_URL}/api/generate"
+    payload = {
+        "model": OLLAMA_MODEL,
+        "prompt": prompt,
+        "system": system_prompt,
+        "stream": False
+    }
+    response = await http_client.post(url, json=payload, timeout=60.0)
+    response.raise_for_status()
+    return response.json().get("response", "").strip()
+
 def _parse_json_response(content: str) -> Any:
     try:
         # Clean up potential markdown formatting
         content = content.replace("```json", "").replace("```", "").strip()
         return json.loads(content)
     except json.JSONDecodeError:
-        print(f"Failed to parse JSON response: {content[:100]}...")
-        return []
+        # Keep whatever objects did complete (e.g. output cut off at max_tokens)
+        salvaged = json_stream.salvage(content)
+        print(f"Failed to parse JSON response, salvaged {len(salvaged)} objects: {content[:100]}...")
+        return salvaged
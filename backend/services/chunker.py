@@ -0,0 +1,164 @@
+"""
+Split extracted document text into overlapping, boundary-aware chunks.
+
+Chunks are built from whole pages, slides or paragraphs where they fit; only
+segments larger than a chunk are split further (on blank lines, then lines,
+then sentences, then words). Chunks are stored per (content hash, parser
+version) so identical uploads share them.
+"""
+
+import os
+from typing import Iterable, Iterator, List, NamedTuple
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import models
+from services import parser
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "400"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "50"))
+CHARS_PER_TOKEN = 4 # Rough average for English prose
+INSERT_BATCH_SIZE = 500
+
+_SEPARATORS = ["\n\n", "\n", ". ", " "]
+
+class Chunk(NamedTuple):
+    text: str
+    start_offset: int
+    end_offset: int
+    token_estimate: int
+    location_kind: str
+    location_start: int
+    location_end: int
+
+class _Unit(NamedTuple):
+    text: str
+    start: int
+    kind: str
+    index: int
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+def chunk_segments(
+    segments: Iterable[parser.TextSegment],
+    max_tokens: int = CHUNK_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS
+) -> Iterator[Chunk]:
+    """
+    Pack parser segments into chunks of at most max_tokens, each repeating up
+    to overlap_tokens of whole units from the end of the previous chunk.
+    Consumes segments lazily, so memory is bounded by one chunk.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    overlap_chars = overlap_tokens * CHARS_PER_TOKEN
+
+    window: List[_Unit] = []
+    window_chars = 0
+    fresh = 0 # Non-blank units in the window not carried over from the previous chunk
+
+    for unit in _units(segments, max_chars):
+        while window and window_chars + len(unit.text) > max_chars:
+            if fresh:
+                yield _make_chunk(window)
+                window = _tail(window, overlap_chars)
+                fresh = 0
+            else:
+                # The carried-over overlap leaves no room for this unit
+                window = window[1:]
+            window_chars = sum(len(u.text) for u in window)
+        window.append(unit)
+        window_chars += len(unit.text)
+        if unit.text.strip():
+            fresh += 1
+
+    if fresh:
+        yield _make_chunk(window)
+
+def ensure_chunks(db: Session, document: models.Document) -> int:
+    """
+    Chunk a document's content unless chunks for the current parser version
+    already exist. Returns the number of chunks stored.
+    """
+    existing = _chunk_query(db, document.content_hash).count()
+    if existing:
+        return existing
+
+    count = 0
+    segments = parser.iter_text(document.file_path, document.file_type)
+    try:
+        for ordinal, chunk in enumerate(chunk_segments(segments)):
+            db.add(models.DocumentChunk(
+                content_hash=document.content_hash,
+                parser_version=parser.PARSER_VERSION,
+                ordinal=ordinal,
+                **chunk._asdict()
+            ))
+            count += 1
+            if count % INSERT_BATCH_SIZE == 0:
+                db.flush()
+        db.commit()
+    except IntegrityError:
+        # Another job chunked the same content first
+        db.rollback()
+        return _chunk_query(db, document.content_hash).count()
+    return count
+
+def get_chunks(db: Session, document: models.Document) -> List[models.DocumentChunk]:
+    return _chunk_query(db, document.content_hash).order_by(models.DocumentChunk.ordinal).all()
+
+def _chunk_query(db: Session, content_hash: str):
+    return db.query(models.DocumentChunk).filter(
+        models.DocumentChunk.content_hash == content_hash,
+        models.DocumentChunk.parser_version == parser.PARSER_VERSION
+    )
+
+def _units(segments: Iterable[parser.TextSegment], max_chars: int) -> Iterator[_Unit]:
+    offset = 0
+    for segment in segments:
+        for start, text in _split(segment.text, offset, max_chars, _SEPARATORS):
+            if text:
+                yield _Unit(text, start, segment.kind, segment.index)
+        offset += len(segment.text)
+
+def _split(text: str, start: int, max_chars: int, separators: List[str]):
+    """
+    Yield (offset, piece) pieces of at most max_chars, cutting on the
+    coarsest separator available. Separators stay attached to the left piece.
+    """
+    if len(text) <= max_chars:
+        yield start, text
+        return
+    for i, separator in enumerate(separators):
+        if separator in text:
+            pieces = text.split(separator)
+            for j, piece in enumerate(pieces):
+                if j < len(pieces) - 1:
+                    piece += separator
+                yield from _split(piece, start, max_chars, separators[i + 1:])
+                start += len(piece)
+            return
+    for i in range(0, len(text), max_chars):
+        yield start + i, text[i:i + max_chars]
+
+def _tail(window: List[_Unit], overlap_chars: int) -> List[_Unit]:
+    tail = []
+    chars = 0
+    for unit in reversed(window):
+        if chars + len(unit.text) > overlap_chars:
+            break
+        tail.insert(0, unit)
+        chars += len(unit.text)
+    return tail
+
+def _make_chunk(window: List[_Unit]) -> Chunk:
+    text = "".join(unit.text for unit in window)
+    first, last = window[0], window[-1]
+    return Chunk(
+        text=text,
+        start_offset=first.start,
+        end_offset=last.start + len(last.text),
+        token_estimate=estimate_tokens(text),
+        location_kind=first.kind,
+        location_start=first.index,
+        location_end=last.index
+    )
@@ -0,0 +1,224 @@
+"""
+Per-user document category classifier.
+
+A multinomial naive Bayes model over hashed word features, trained on the
+categories of the user's own documents. Ingestion asks it first and only
+calls the LLM (ai.suggest_category) when it is unsure. Categories picked by
+the LLM or corrected by the user are learned incrementally; the model's own
+guesses are not, so it cannot reinforce its mistakes. The model is a few
+count tables, stored as JSON per user; workers lock the user's row before
+changing it, so concurrent updates are not lost.
+"""
+
+import json
+import math
+import os
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import models
+from services import ai, metrics, retrieval, text_store
+
+CATEGORY_CONFIDENCE = float(os.getenv("CATEGORY_CONFIDENCE", "0.8"))
+CATEGORY_MIN_DOCUMENTS = int(os.getenv("CATEGORY_MIN_DOCUMENTS", "5")) # Labelled documents before the model is used
+
+FEATURE_BUCKETS = 2 ** 18
+FEATURE_TEXT_CHARS = 20000 # Only the start of long documents is featurized
+ALPHA = 0.1 # Additive smoothing
+# Words in a document are far from independent, so raw naive Bayes
+# posteriors are nearly always ~1. Scoring each document as if it had this
+# many independent features gives usable confidences.
+EFFECTIVE_FEATURES = 20
+UNCATEGORIZED = "Uncategorized"
+
+def features(text: str) -> List[int]:
+    """
+    Hashed bag of distinct words. crc32 rather than hash() so buckets are
+    stable across processes.
+    """
+    tokens = set(retrieval.tokenize(text[:FEATURE_TEXT_CHARS]))
+    return sorted({zlib.crc32(token.encode("utf-8")) % FEATURE_BUCKETS for token in tokens})
+
+class NaiveBayes:
+    def __init__(self, labels: Dict[str, dict] = None, documents: Dict[str, str] = None):
+        self.labels = labels or {} # label -> {"docs": n, "total": feature count, "counts": {bucket: n}}
+        self.documents = documents or {} # document id -> label it was learned under
+
+    @classmethod
+    def loads(cls, data: str) -> "NaiveBayes":
+        raw = json.loads(data)
+        return cls(raw["labels"], raw["documents"])
+
+    def dumps(self) -> str:
+        return json.dumps({"labels": self.labels, "documents": self.documents})
+
+    def learn(self, document_id: int, label: str, feats: List[int]):
+        """
+        Add a labelled document, first removing it from the label it was
+        previously learned under.
+        """
+        self.forget(document_id, feats)
+        stats = self.labels.setdefault(label, {"docs": 0, "total": 0, "counts": {}})
+        stats["docs"] += 1
+        stats["total"] += len(feats)
+        counts = stats["counts"]
+        for bucket in feats:
+            counts[str(bucket)] = counts.get(str(bucket), 0) + 1
+        self.documents[str(document_id)] = label
+
+    def forget(self, document_id: int, feats: List[int]):
+        label = self.documents.pop(str(document_id), None)
+        stats = self.labels.get(label)
+        if stats is None:
+            return
+        stats["docs"] -= 1
+        stats["total"] = max(0, stats["total"] - len(feats))
+        counts = stats["counts"]
+        for bucket in feats:
+            n = counts.get(str(bucket), 0) - 1
+            if n > 0:
+                counts[str(bucket)] = n
+            else:
+                counts.pop(str(bucket), None)
+        if stats["docs"] <= 0:
+            del self.labels[label]
+
+    @property
+    def trained_documents(self) -> int:
+        return sum(stats["docs"] for stats in self.labels.values())
+
+    def predict(self, feats: List[int]) -> Tuple[Optional[str], float]:
+        """
+        Return (most likely label, its posterior probability).
+        """
+        if not self.labels or not feats:
+            return None, 0.0
+        n_docs = self.trained_documents
+        weight = min(1.0, EFFECTIVE_FEATURES / len(feats))
+        scores = {}
+        for label, stats in self.labels.items():
+            counts = stats["counts"]
+            denominator = math.log(stats["total"] + ALPHA * FEATURE_BUCKETS)
+            likelihood = sum(math.log(counts.get(str(bucket), 0) + ALPHA) - denominator for bucket in feats)
+            prior = math.log((stats["docs"] + 1) / (n_docs + len(self.labels)))
+            scores[label] = prior + weight * likelihood
+        best = max(scores, key=scores.get)
+        total = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1 / total
+
+async def categorize(db: Session, document: models.Document, text: str) -> str:
+    """
+    Pick a category for a newly ingested document: the user's classifier when
+    it is confident, otherwise the LLM (whose answer is then learned). text
+    is what the LLM is shown, e.g. the document summary.
+    """
+    model = load(db, document.user_id)
+    feats = features(text_store.get_text(db, document))
+
+    # 1. Local prediction
+    if model.trained_documents >= CATEGORY_MIN_DOCUMENTS:
+        label, confidence = model.predict(feats)
+        metrics.observe("category.confidence", confidence)
+        if label and confidence >= CATEGORY_CONFIDENCE:
+            metrics.incr("category.local")
+            return label
+
+    # 2. Fall back to the LLM and learn its answer
+    metrics.incr("category.llm")
+    category = await ai.suggest_category(text)
+    if category != UNCATEGORIZED:
+        # Applied to the current model: another worker may have changed it during the call
+        _update(db, document.user_id, lambda model: model.learn(document.id, category, feats))
+    return category
+
+def learn(db: Session, document: models.Document, category: str):
+    """
+    Record a category chosen by the user, replacing whatever the model
+    learned for this document before.
+    """
+    feats = features(text_store.get_text(db, document))
+    def change(model: NaiveBayes):
+        if category == UNCATEGORIZED:
+            model.forget(document.id, feats)
+        else:
+            model.learn(document.id, category, feats)
+    _update(db, document.user_id, change)
+
+def forget_document(db: Session, document: models.Document):
+    """
+    Stop tracking a deleted document (committed with the caller's
+    transaction). What was learned from it is kept, but its id may be
+    reused, so it must not be unlearned later.
+    """
+    row = _locked_row(db, document.user_id)
+    if row is None:
+        return
+    model = NaiveBayes.loads(row.data)
+    if model.documents.pop(str(document.id), None) is not None:
+        row.data = model.dumps()
+
+def load(db: Session, user_id: int) -> NaiveBayes:
+    """
+    Load the user's model, training and storing it from their labelled
+    documents the first time.
+    """
+    row = _row(db, user_id)
+    if row is None:
+        row = _bootstrap(db, user_id)
+    return NaiveBayes.loads(row.data)
+
+def _bootstrap(db: Session, user_id: int) -> models.CategoryModel:
+    # Stored even when empty, so no later upload pays for this again
+    model = NaiveBayes()
+    labelled = db.query(models.Document).filter(
+        models.Document.user_id == user_id,
+        models.Document.status == "ready",
+        models.Document.category != UNCATEGORIZED
+    ).all()
+    for document in labelled:
+        text = text_store.get_text(db, document)
+        if text:
+            model.learn(document.id, document.category, features(text))
+
+    try:
+        with db.begin_nested():
+            row = models.CategoryModel(user_id=user_id, data=model.dumps())
+            db.add(row)
+        db.commit()
+        return row
+    except IntegrityError:
+        # Another worker stored the user's model first; its copy wins
+        return _row(db, user_id)
+
+def _update(db: Session, user_id: int, change: Callable[[NaiveBayes], None]):
+    """
+    Apply a change to the user's stored model and commit it.
+    """
+    if _row(db, user_id) is None:
+        _bootstrap(db, user_id)
+    row = _locked_row(db, user_id)
+    model = NaiveBayes.loads(row.data)
+    change(model)
+    row.data = model.dumps()
+    db.commit()
+
+def _locked_row(db: Session, user_id: int) -> Optional[models.CategoryModel]:
+    """
+    Lock the user's row until the transaction ends and read it afresh.
+    """
+    # A no-op write takes the lock on every backend (SQLite has no FOR UPDATE)
+    locked = db.execute(
+        update(models.CategoryModel)
+        .where(models.CategoryModel.user_id == user_id)
+        .values(data=models.CategoryModel.data)
+    ).rowcount
+    if not locked:
+        return None
+    return db.query(models.CategoryModel).filter(
+        models.CategoryModel.user_id == user_id
+    ).populate_existing().one()
+
+def _row(db: Session, user_id: int) -> Optional[models.CategoryModel]:
+    return db.query(models.CategoryModel).filter(models.CategoryModel.user_id == user_id).first()
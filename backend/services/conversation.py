@@ -0,0 +1,116 @@
+"""
+Rolling compaction of chat history.
+
+Chat prompts carry a per-document summary of the earlier conversation plus
+the most recent turns, within CHAT_HISTORY_TOKENS. When the unsummarized
+turns outgrow that budget, the oldest are folded into the summary until the
+rest fit in half of it. Compaction therefore runs every few turns rather than
+on every turn, and per-turn input stays flat however long the chat gets.
+
+Folding happens in batches of at most CHAT_HISTORY_TOKENS, so each summary
+call is bounded too. A long chat from before compaction existed is caught up
+CHAT_FOLD_BATCHES batches per turn; turns not yet folded are left out of the
+prompt meanwhile.
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from services import ai, chunker, metrics
+
+CHAT_HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", "2000"))
+CHAT_FOLD_BATCHES = int(os.getenv("CHAT_FOLD_BATCHES", "3")) # Summary calls per turn at most
+
+async def build_history(db: AsyncSession, document_id: int) -> Tuple[str, List[Dict[str, str]]]:
+    """
+    Return (summary, recent messages) for the next chat prompt, compacting
+    first if the unsummarized messages exceed the budget.
+    """
+    summary = await db.scalar(select(models.ChatSummary).where(
+        models.ChatSummary.document_id == document_id
+    ))
+    covered = summary.covered_through_id if summary else 0
+    summary_text = summary.content if summary else ""
+
+    pending = (await db.scalars(select(models.ChatMessage).where(
+        models.ChatMessage.document_id == document_id,
+        models.ChatMessage.id > covered
+    ).order_by(models.ChatMessage.id))).all()
+
+    if _tokens(pending) > CHAT_HISTORY_TOKENS:
+        split = _fold_point(pending, CHAT_HISTORY_TOKENS // 2)
+        if split:
+            folded, pending = pending[:split], pending[split:]
+            for batch in _batches(folded, CHAT_HISTORY_TOKENS)[:CHAT_FOLD_BATCHES]:
+                updated = await ai.summarize_conversation(summary_text, _as_prompt(batch))
+                # On failure the folded turns still leave this prompt; the next
+                # turn retries the fold from the last saved summary
+                if not updated:
+                    break
+                summary_text = updated
+                summary = await _save(db, summary, document_id, updated, batch[-1].id)
+                metrics.incr("chat.compactions")
+                if summary is None:
+                    break
+
+    metrics.observe("chat.history_tokens", _tokens(pending) + chunker.estimate_tokens(summary_text))
+    return summary_text, _as_prompt(pending)
+
+def _tokens(messages: List[models.ChatMessage]) -> int:
+    return sum(chunker.estimate_tokens(msg.content or "") for msg in messages)
+
+def _fold_point(messages: List[models.ChatMessage], keep_tokens: int) -> int:
+    """
+    Index of the first message to keep: the newest messages that fit in
+    keep_tokens (always at least the latest), starting on a user turn.
+    """
+    split = len(messages) - 1
+    kept = chunker.estimate_tokens(messages[split].content or "")
+    while split > 0:
+        size = chunker.estimate_tokens(messages[split - 1].content or "")
+        if kept + size > keep_tokens:
+            break
+        split -= 1
+        kept += size
+    # Providers expect the conversation to open with a user message
+    while split < len(messages) - 1 and messages[split].role != "user":
+        split += 1
+    return split
+
+def _batches(messages: List[models.ChatMessage], max_tokens: int) -> List[List[models.ChatMessage]]:
+    """
+    Split messages, in order, into runs of at most max_tokens (a longer
+    message gets a run of its own).
+    """
+    batches, size = [], 0
+    for msg in messages:
+        tokens = chunker.estimate_tokens(msg.content or "")
+        if not batches or size + tokens > max_tokens:
+            batches.append([])
+            size = 0
+        batches[-1].append(msg)
+        size += tokens
+    return batches
+
+def _as_prompt(messages: List[models.ChatMessage]) -> List[Dict[str, str]]:
+    return [{"role": msg.role, "content": msg.content} for msg in messages]
+
+async def _save(db: AsyncSession, summary: Optional[models.ChatSummary], document_id: int, content: str, covered_through_id: int) -> Optional[models.ChatSummary]:
+    """
+    Store the summary; returns it, or None if a concurrent turn got there first.
+    """
+    if summary is None:
+        summary = models.ChatSummary(document_id=document_id)
+        db.add(summary)
+    summary.content = content
+    summary.covered_through_id = covered_through_id
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent turn created the summary first; it is picked up next time
+        await db.rollback()
+        return None
+    return summary
@@ -0,0 +1,114 @@
+"""
+Whole-document flashcard generation (map-reduce).
+
+The document's chunks are packed into contiguous sections that each fit one
+generation prompt. num_cards is split across sections in proportion to their
+salience, the sections are generated concurrently (bounded by
+FLASHCARD_MAP_CONCURRENCY), and the results are merged in document order
+with duplicate questions removed.
+
+Loading the index and chunks (and building them for documents ingested
+before retrieval existed) is CPU-bound, so it runs in a worker thread with
+its own session.
+"""
+
+import asyncio
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+import database
+import models
+from services import ai, chunker, retrieval
+
+FLASHCARD_MAP_CONCURRENCY = int(os.getenv("FLASHCARD_MAP_CONCURRENCY", "8"))
+# Matches the text window of a single generate_flashcards prompt
+SECTION_CHARS = 10000
+
+async def generate_flashcards(
+    document: models.Document,
+    num_cards: int,
+    exclude_topics: Optional[List[str]] = None
+) -> List[Dict[str, str]]:
+    sections = await asyncio.to_thread(_load_sections, document.id)
+    if not sections:
+        return []
+    counts = allocate(num_cards, [weight for _, weight in sections])
+
+    semaphore = asyncio.Semaphore(FLASHCARD_MAP_CONCURRENCY)
+
+    async def generate(text: str, count: int):
+        async with semaphore:
+            return await ai.generate_flashcards(text, num_cards=count, exclude_topics=exclude_topics)
+
+    # Map: one call per section that was allotted cards
+    results = await asyncio.gather(*[
+        generate(text, count)
+        for (text, _), count in zip(sections, counts) if count > 0
+    ])
+
+    # Reduce: merge in document order, dropping repeats and known topics
+    seen = {_normalize(topic) for topic in exclude_topics or []}
+    merged = []
+    for cards in results:
+        for card in cards if isinstance(cards, list) else []:
+            if not isinstance(card, dict) or not card.get("front") or not card.get("back"):
+                continue
+            key = _normalize(card["front"])
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append({"front": card["front"], "back": card["back"]})
+    return merged[:num_cards]
+
+def _load_sections(document_id: int) -> List[Tuple[str, float]]:
+    db = database.SessionLocal()
+    try:
+        document = db.get(models.Document, document_id)
+        index = retrieval.get_index(db, document)
+        if index is None:
+            return []
+        chunks = chunker.get_chunks(db, document)
+        return plan_sections([(chunk.text, index.salience(chunk.text)) for chunk in chunks])
+    finally:
+        db.close()
+
+def plan_sections(weighted_chunks: List[Tuple[str, float]], max_chars: int = SECTION_CHARS) -> List[Tuple[str, float]]:
+    """
+    Pack consecutive (text, weight) chunks into sections of at most max_chars.
+    Returns (section text, summed weight) pairs in document order.
+    """
+    sections = []
+    texts: List[str] = []
+    weight = 0.0
+    length = 0
+    for text, chunk_weight in weighted_chunks:
+        if texts and length + len(text) > max_chars:
+            sections.append(("\n".join(texts), weight))
+            texts, weight, length = [], 0.0, 0
+        texts.append(text)
+        weight += chunk_weight
+        length += len(text)
+    if texts:
+        sections.append(("\n".join(texts), weight))
+    return sections
+
+def allocate(total: int, weights: List[float]) -> List[int]:
+    """
+    Split total into integer counts proportional to weights (largest remainder).
+    """
+    if not weights or total <= 0:
+        return [0] * len(weights)
+    weight_sum = sum(weights)
+    if weight_sum <= 0:
+        weights = [1.0] * len(weights)
+        weight_sum = float(len(weights))
+
+    shares = [total * weight / weight_sum for weight in weights]
+    counts = [int(share) for share in shares]
+    by_remainder = sorted(range(len(weights)), key=lambda i: shares[i] - counts[i], reverse=True)
+    for i in by_remainder[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+def _normalize(question: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", question.lower()).strip()
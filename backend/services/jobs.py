@@ -0,0 +1,171 @@
+"""
+Background ingestion pipeline.
+
+Uploads only save the file and queue an IngestionJob. Worker tasks pick jobs
+off an in-process queue and run each pipeline stage in order, updating the
+job and document status as they go so the frontend can poll for progress.
+"""
+
+import asyncio
+import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+import database
+import models
+from services import chunker, classifier, retrieval, summarizer, text_store
+
+WORKER_COUNT = int(os.getenv("INGEST_WORKERS", "2"))
+
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+_executor: Optional[ThreadPoolExecutor] = None
+_session_factory: Callable = None
+
+class StageError(Exception):
+    """Raised by a stage to fail the job with a user-facing message."""
+
+# --- Pipeline stages -------------------------------------------------------
+# Each stage takes (db, document). Sync stages run on the executor so parsing
+# never holds up the event loop; async stages (provider calls) are awaited.
+
+def _extract(db, document: models.Document):
+    if not text_store.get_text(db, document):
+        raise StageError("Could not extract text from document")
+
+def _chunk(db, document: models.Document):
+    chunker.ensure_chunks(db, document)
+
+def _index(db, document: models.Document):
+    retrieval.build_index(db, document)
+
+async def _summarize(db, document: models.Document):
+    if document.summary:
+        return # Copied from an earlier upload of the same bytes
+    # A failed summary is not fatal: prompts fall back to the document text
+    document.summary = await summarizer.summarize_document(db, document) or None
+    db.commit()
+
+async def _categorize(db, document: models.Document):
+    text = document.summary or text_store.get_text(db, document)
+    document.category = await classifier.categorize(db, document, text)
+    db.commit()
+
+STAGES: List[Tuple[str, Callable]] = [
+    ("extract", _extract),
+    ("chunk", _chunk),
+    ("index", _index),
+    ("summarize", _summarize),
+    ("categorize", _categorize),
+]
+
+# --- Queue management ------------------------------------------------------
+
+async def start(session_factory: Callable = None, worker_count: int = WORKER_COUNT):
+    """
+    Start the worker pool and re-queue jobs left unfinished by a previous run.
+    """
+    global _queue, _executor, _session_factory
+    _session_factory = session_factory or database.SessionLocal
+    _queue = asyncio.Queue()
+    _executor = ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="ingest")
+
+    db = _session_factory()
+    try:
+        unfinished = db.query(models.IngestionJob.id).filter(
+            models.IngestionJob.status.in_(["queued", "running"])
+        ).order_by(models.IngestionJob.id).all()
+        for (job_id,) in unfinished:
+            _queue.put_nowait(job_id)
+    finally:
+        db.close()
+
+    for _ in range(worker_count):
+        _workers.append(asyncio.create_task(_worker()))
+
+async def stop():
+    """
+    Cancel the workers. Jobs still queued are picked up again on next start.
+    """
+    global _queue, _executor
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    if _executor:
+        _executor.shutdown(wait=False)
+    _queue = None
+    _executor = None
+
+def enqueue(job_id: int):
+    """
+    Queue a committed IngestionJob for processing.
+    """
+    if _queue is None:
+        raise RuntimeError("Ingestion workers are not running")
+    _queue.put_nowait(job_id)
+
+async def join():
+    """
+    Wait until every queued job has been processed.
+    """
+    if _queue is not None:
+        await _queue.join()
+
+def create_job(db, document: models.Document) -> models.IngestionJob:
+    job = models.IngestionJob(document_id=document.id, status="queued")
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+# --- Workers ---------------------------------------------------------------
+
+async def _worker():
+    while True:
+        job_id = await _queue.get()
+        try:
+            await run_job(job_id)
+        except Exception as e:
+            print(f"Ingestion worker error for job {job_id}: {str(e)}")
+        finally:
+            _queue.task_done()
+
+async def run_job(job_id: int):
+    loop = asyncio.get_running_loop()
+    db = _session_factory()
+    try:
+        job = db.query(models.IngestionJob).filter(models.IngestionJob.id == job_id).first()
+        if not job or job.status in ("succeeded", "failed"):
+            return
+        document = job.document
+        if not document:
+            return
+
+        job.status = "running"
+        job.started_at = datetime.datetime.utcnow()
+        document.status = "processing"
+        db.commit()
+
+        try:
+            for name, stage in STAGES:
+                job.stage = name
+                db.commit()
+                if asyncio.iscoroutinefunction(stage):
+                    await stage(db, document)
+                else:
+                    await loop.run_in_executor(_executor, stage, db, document)
+        except Exception as e:
+            db.rollback()
+            print(f"Ingestion job {job_id} failed at stage {job.stage}: {str(e)}")
+            job.status = "failed"
+            job.error = str(e) if isinstance(e, StageError) else f"Stage '{job.stage}' failed"
+            document.status = "failed"
+        else:
+            job.status = "succeeded"
+            document.status = "ready"
+
+        job.finished_at = datetime.datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
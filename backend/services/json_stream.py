@@ -0,0 +1,82 @@
+"""
+Incremental parser for the JSON arrays LLMs return for flashcards and quizzes.
+
+Text is fed in as it streams from the provider. Each top-level object is
+decoded as soon as its closing brace arrives, so callers can act on it before
+the completion finishes. Anything before the opening bracket (a markdown
+fence, a preamble) is skipped, and when the output is cut off (e.g. by
+max_tokens) every object that did close is kept.
+"""
+
+import json
+from typing import Any, List
+
+class JSONArrayStream:
+    def __init__(self):
+        self.started = False # Seen the opening "[" (or a bare top-level "{")
+        self.closed = False # Seen the array's closing "]"
+        self._array = False
+        self.invalid = 0 # Completed objects that failed to decode
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object: List[str] = []
+
+    def feed(self, text: str) -> List[Any]:
+        """
+        Consume more text and return the objects completed by it.
+        """
+        completed = []
+        for char in text:
+            if self.closed:
+                break
+            if not self.started:
+                if char == "[":
+                    self.started = self._array = True
+                    continue
+                if char != "{":
+                    continue
+                # A single object (or a run of them) without the array
+                self.started = True
+
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                    self._object = [char]
+                elif char == "]":
+                    self.closed = True
+                continue
+
+            self._object.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        completed.append(json.loads("".join(self._object)))
+                    except json.JSONDecodeError:
+                        self.invalid += 1
+                    self._object = []
+        return completed
+
+    @property
+    def truncated(self) -> bool:
+        """True if the output ended inside the array or an object."""
+        return self._depth > 0 or (self._array and not self.closed)
+
+def salvage(content: str) -> List[Any]:
+    """
+    Recover every complete top-level object from a malformed or truncated
+    JSON array.
+    """
+    return JSONArrayStream().feed(content)
@@ -0,0 +1,150 @@
+"""
+Response cache for deterministic LLM generations (categories, quizzes,
+flashcards).
+
+Entries are keyed on provider, model, normalized prompt and generation
+parameters. The in-process LRU tier is bounded by LLM_CACHE_SIZE entries and
+LLM_CACHE_TTL seconds; setting LLM_CACHE_DB=1 adds a shared database tier so
+entries survive restarts and are visible to every worker. Endpoints listed in
+LLM_CACHE_DISABLED (comma-separated) always go to the provider.
+"""
+
+import asyncio
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+from sqlalchemy.exc import IntegrityError
+import database
+import models
+from services import metrics
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "0").lower() in ("1", "true", "yes")
+LLM_CACHE_DISABLED = {
+    name.strip() for name in os.getenv("LLM_CACHE_DISABLED", "").split(",") if name.strip()
+}
+
+_lock = threading.Lock()
+_entries: "OrderedDict[str, tuple]" = OrderedDict() # key -> (expires_at monotonic, JSON value)
+
+def make_key(provider: str, model: str, prompt: str, **params) -> str:
+    """
+    Build a cache key. Whitespace in the prompt is normalized so indentation
+    changes in prompt templates do not split entries.
+    """
+    normalized = re.sub(r"\s+", " ", prompt).strip()
+    raw = json.dumps(
+        {"provider": provider, "model": model, "prompt": normalized, "params": params},
+        sort_keys=True
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def is_enabled(endpoint: str) -> bool:
+    return endpoint not in LLM_CACHE_DISABLED
+
+async def cached(
+    endpoint: str,
+    key: str,
+    call: Callable[[], Awaitable[Any]],
+    enabled: bool = True,
+    store: Callable[[Any], bool] = bool
+) -> Any:
+    """
+    Return the cached response for key, or await call() and cache its result
+    if store(result) is true. By default that is any non-empty result; empty
+    results (failed generations) are never cached.
+    """
+    if not enabled or not is_enabled(endpoint):
+        metrics.incr(f"llm_cache.{endpoint}.bypass")
+        return await call()
+
+    value = await get(endpoint, key)
+    if value is not None:
+        return value
+
+    value = await call()
+    if store(value):
+        await put(endpoint, key, value)
+    return value
+
+async def get(endpoint: str, key: str) -> Optional[Any]:
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry and entry[0] > now:
+            _entries.move_to_end(key)
+            metrics.incr(f"llm_cache.{endpoint}.hit")
+            return json.loads(entry[1])
+        if entry:
+            del _entries[key]
+
+    if LLM_CACHE_DB:
+        stored = await asyncio.to_thread(_db_get, key)
+        if stored is not None:
+            value, ttl = stored
+            _remember(key, value, ttl)
+            metrics.incr(f"llm_cache.{endpoint}.hit_db")
+            return json.loads(value)
+
+    metrics.incr(f"llm_cache.{endpoint}.miss")
+    return None
+
+async def put(endpoint: str, key: str, value: Any) -> None:
+    encoded = json.dumps(value)
+    _remember(key, encoded, LLM_CACHE_TTL)
+    if LLM_CACHE_DB:
+        await asyncio.to_thread(_db_put, endpoint, key, encoded)
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+
+def size() -> int:
+    with _lock:
+        return len(_entries)
+
+def _remember(key: str, encoded: str, ttl: float) -> None:
+    with _lock:
+        _entries[key] = (time.monotonic() + ttl, encoded)
+        _entries.move_to_end(key)
+        while len(_entries) > LLM_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+def _db_get(key: str):
+    db = database.SessionLocal()
+    try:
+        entry = db.query(models.LLMCacheEntry).filter(models.LLMCacheEntry.key == key).first()
+        if not entry:
+            return None
+        remaining = (entry.expires_at - datetime.datetime.utcnow()).total_seconds()
+        if remaining <= 0:
+            db.delete(entry)
+            db.commit()
+            return None
+        return entry.value, remaining
+    finally:
+        db.close()
+
+def _db_put(endpoint: str, key: str, encoded: str) -> None:
+    db = database.SessionLocal()
+    try:
+        db.query(models.LLMCacheEntry).filter(models.LLMCacheEntry.key == key).delete()
+        db.add(models.LLMCacheEntry(
+            key=key,
+            endpoint=endpoint,
+            value=encoded,
+            expires_at=datetime.datetime.utcnow() + datetime.timedelta(seconds=LLM_CACHE_TTL)
+        ))
+        db.commit()
+    except IntegrityError:
+        # Another worker stored the same response first
+        db.rollback()
+    finally:
+        db.close()
@@ -0,0 +1,55 @@
+"""
+In-process counters, gauges and latency samples, exposed on GET /metrics.
+"""
+
+import threading
+from collections import defaultdict, deque
+from typing import Dict
+
+# Latency samples kept per timing; percentiles cover the most recent ones
+MAX_SAMPLES = 1000
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = defaultdict(int)
+_gauges: Dict[str, float] = {}
+_timings: Dict[str, deque] = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+
+def incr(name: str, amount: int = 1) -> None:
+    with _lock:
+        _counters[name] += amount
+
+def set_gauge(name: str, value: float) -> None:
+    """
+    Record the current value of a level (e.g. a table size).
+    """
+    with _lock:
+        _gauges[name] = value
+
+def observe(name: str, value: float) -> None:
+    """
+    Record one sample (e.g. a latency in milliseconds).
+    """
+    with _lock:
+        _timings[name].append(value)
+
+def snapshot() -> dict:
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        timings = {name: sorted(samples) for name, samples in _timings.items()}
+    return {
+        "counters": counters,
+        "gauges": gauges,
+        "timings": {name: _summarize(samples) for name, samples in timings.items() if samples}
+    }
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timings.clear()
+
+def _summarize(ordered) -> dict:
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))], 2)
+    return {"count": len(ordered), "p50": pct(50), "p95": pct(95), "p99": pct(99), "max": round(ordered[-1], 2)}
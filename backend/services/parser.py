@@ -1,8 +1,34 @@
 import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, NamedTuple
 from pypdf import PdfReader
 from pptx import Presentation
 from docx import Document
 
+# Bump whenever extraction output changes so cached text is re-parsed
+PARSER_VERSION = 1
+
+# PDFs with at least this many pages are split into page ranges and extracted
+# across a process pool; smaller files stay in-process
+PARALLEL_PDF_MIN_PAGES = int(os.getenv("PARALLEL_PDF_MIN_PAGES", "64"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+# Ranges per worker; more, smaller ranges balance uneven pages better
+PDF_RANGES_PER_WORKER = 4
+
+# TXT files are read in chunks of roughly this many characters
+TXT_CHUNK_CHARS = 64 * 1024
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+class TextSegment(NamedTuple):
+    text: str
+    kind: str # "page", "slide", "paragraph" or "chunk"
+    index: int # 0-based position of the page/slide/paragraph/chunk
+
 def extract_text(file_path: str, file_type: str) -> str:
     """
     Extract text from various file formats.
@@ -10,41 +36,115 @@ def extract_text(file_path: str, file_type: str) -> str:
     try:
         if file_type == "PDF":
             return _extract_from_pdf(file_path)
-        elif file_type == "PPTX":
-            return _extract_from_pptx(file_path)
-        elif file_type == "DOCX":
-            return _extract_from_docx(file_path)
-        elif file_type == "TXT":
-            return _extract_from_txt(file_path)
-        else:
-            raise ValueError(f"Unsupported file type: {file_type}")
+        return "".join(segment.text for segment in iter_text(file_path, file_type))
     except Exception as e:
         print(f"Error parsing {file_path}: {str(e)}")
         return ""
 
+def iter_text(file_path: str, file_type: str) -> Iterator[TextSegment]:
+    """
+    Yield a document's text one page, slide, paragraph or TXT chunk at a time.
+    Concatenating the segment texts gives exactly what extract_text returns,
+    so consumers can track offsets without holding the whole document.
+    Unlike extract_text, parse errors are raised to the caller.
+    """
+    if file_type == "PDF":
+        return _iter_pdf(file_path)
+    elif file_type == "PPTX":
+        return _iter_pptx(file_path)
+    elif file_type == "DOCX":
+        return _iter_docx(file_path)
+    elif file_type == "TXT":
+        return _iter_txt(file_path)
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
 def _extract_from_pdf(file_path: str) -> str:
     reader = PdfReader(file_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() + "\n"
-    return text
+    page_count = len(reader.pages)
+    if page_count < PARALLEL_PDF_MIN_PAGES or PDF_WORKERS < 2:
+        return "".join(_pdf_page_texts(reader, 0, page_count))
+    
+    ranges = _page_ranges(page_count, PDF_WORKERS * PDF_RANGES_PER_WORKER)
+    pool = _get_pdf_pool()
+    # map() yields results in submission order, so pages stay in order
+    parts = pool.map(
+        _extract_pdf_range,
+        [file_path] * len(ranges),
+        [start for start, _ in ranges],
+        [stop for _, stop in ranges]
+    )
+    return "".join(parts)
 
-def _extract_from_pptx(file_path: str) -> str:
+def _iter_pdf(file_path: str) -> Iterator[TextSegment]:
+    reader = PdfReader(file_path)
+    for i, text in enumerate(_pdf_page_texts(reader, 0, len(reader.pages))):
+        yield TextSegment(text, "page", i)
+
+def _pdf_page_texts(reader: PdfReader, start: int, stop: int):
+    for i in range(start, stop):
+        yield reader.pages[i].extract_text() + "\n"
+
+def _extract_pdf_range(file_path: str, start: int, stop: int) -> str:
+    # Runs in a worker process; each worker opens its own reader
+    return "".join(_pdf_page_texts(PdfReader(file_path), start, stop))
+
+def _page_ranges(page_count: int, parts: int):
+    """
+    Split [0, page_count) into at most `parts` contiguous, near-equal ranges.
+    """
+    parts = max(1, min(parts, page_count))
+    size, extra = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # spawn avoids forking a process that already has worker threads
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            atexit.register(_pdf_pool.shutdown)
+        return _pdf_pool
+
+def _iter_pptx(file_path: str) -> Iterator[TextSegment]:
     prs = Presentation(file_path)
-    text = ""
-    for slide in prs.slides:
-        for shape in slide.shapes:
-            if hasattr(shape, "text"):
-                text += shape.text + "\n"
-    return text
-
-def _extract_from_docx(file_path: str) -> str:
+    for i, slide in enumerate(prs.slides):
+        texts = [shape.text + "\n" for shape in slide.shapes if hasattr(shape, "text")]
+        yield TextSegment("".join(texts), "slide", i)
+
+def _iter_docx(file_path: str) -> Iterator[TextSegment]:
     doc = Document(file_path)
-    text = ""
-    for para in doc.paragraphs:
-        text += para.text + "\n"
-    return text
+    for i, para in enumerate(doc.paragraphs):
+        yield TextSegment(para.text + "\n", "paragraph", i)
 
-def _extract_from_txt(file_path: str) -> str:
+def _iter_txt(file_path: str) -> Iterator[TextSegment]:
+    # Read fixed-size chunks and cut each at its last newline so segments end
+    # on line boundaries; memory stays bounded by the chunk size.
     with open(file_path, 'r', encoding='utf-8') as f:
-        return f.read()
+        index = 0
+        carry = ""
+        while True:
+            block = f.read(TXT_CHUNK_CHARS)
+            if not block:
+                break
+            block = carry + block
+            cut = block.rfind("\n") + 1
+            if cut == 0 and len(block) < 2 * TXT_CHUNK_CHARS:
+                carry = block
+                continue
+            if cut == 0:
+                cut = len(block)
+            carry = block[cut:]
+            yield TextSegment(block[:cut], "chunk", index)
+            index += 1
+        if carry:
+            yield TextSegment(carry, "chunk", index)
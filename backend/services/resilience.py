@@ -0,0 +1,243 @@
+"""
+Deadlines, retries, circuit breaking and failover for LLM provider calls.
+
+Every provider call runs under a per-operation deadline. Transient failures
+(timeouts, connection errors, 429 and 5xx responses) are retried with full
+jitter exponential backoff while the deadline allows. Each provider has a
+circuit breaker: after LLM_BREAKER_FAILURES consecutive failures it opens and
+calls fail fast for LLM_BREAKER_RESET seconds, after which one trial call is
+let through. When a provider fails or is open, the next provider in the
+failover chain is tried.
+"""
+
+import asyncio
+import os
+import random
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+import anthropic
+import httpx
+from services import metrics
+
+# Seconds an operation may take on one provider, retries included
+DEADLINES = {
+    "chat": float(os.getenv("LLM_DEADLINE_CHAT", "45")),
+    "generate": float(os.getenv("LLM_DEADLINE_GENERATE", "60")),
+    "category": float(os.getenv("LLM_DEADLINE_CATEGORY", "20")),
+    "summary": float(os.getenv("LLM_DEADLINE_SUMMARY", "30")),
+}
+DEFAULT_DEADLINE = 30.0
+# Streams get this long to produce their first chunk, and may not stall longer between chunks
+STREAM_IDLE_TIMEOUT = float(os.getenv("LLM_STREAM_IDLE_TIMEOUT", "20"))
+
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "4"))
+
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+class ProviderUnavailable(Exception):
+    """Raised without calling the provider: its breaker is open or it is not configured."""
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = None, reset_timeout: float = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or LLM_BREAKER_FAILURES
+        self.reset_timeout = reset_timeout or LLM_BREAKER_RESET
+        self.failures = 0 # Consecutive
+        self.opened_at = None
+        self._trial_started = None # When the in-flight half-open trial call began
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        # One trial at a time; a trial that never reported back (e.g. it was
+        # cancelled) stops blocking after another reset_timeout
+        now = time.monotonic()
+        if state == "half_open" and (self._trial_started is None or now - self._trial_started >= self.reset_timeout):
+            self._trial_started = now
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_started is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                metrics.incr(f"llm.{self.name}.breaker_opened")
+            self.opened_at = time.monotonic()
+        self._trial_started = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        info = {"state": state, "consecutive_failures": self.failures}
+        if state == "open":
+            info["retry_in_seconds"] = round(self.reset_timeout - (time.monotonic() - self.opened_at), 1)
+        return info
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def breaker(provider: str) -> CircuitBreaker:
+    if provider not in _breakers:
+        _breakers[provider] = CircuitBreaker(provider)
+    return _breakers[provider]
+
+def snapshot(providers: List[str]) -> Dict[str, Dict[str, Any]]:
+    return {provider: breaker(provider).snapshot() for provider in providers}
+
+def reset():
+    _breakers.clear()
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Errors worth retrying: timeouts, dropped connections, rate limits and
+    server errors. Bad requests and auth failures are not.
+    """
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError, anthropic.APIConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None and isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+    return status is not None and (status == 429 or status >= 500)
+
+async def call(
+    operation: str,
+    providers: List[str],
+    calls: Dict[str, Callable[[], Awaitable[Any]]],
+    answered: Optional[Dict[str, str]] = None
+) -> Any:
+    """
+    Run calls[provider]() for the first provider in the chain that succeeds.
+    Raises the last error when every provider fails. If answered is given,
+    answered["provider"] is set to the provider that succeeded.
+    """
+    last_error = None
+    for i, provider in enumerate(providers):
+        try:
+            result = await _call_provider(provider, operation, calls[provider])
+        except Exception as e:
+            last_error = e
+            print(f"LLM {operation} failed on {provider}: {type(e).__name__}: {str(e)}")
+            if i < len(providers) - 1:
+                metrics.incr(f"llm.{operation}.failover")
+            continue
+        if answered is not None:
+            answered["provider"] = provider
+        return result
+    raise last_error or ProviderUnavailable("No LLM provider configured")
+
+async def stream(
+    operation: str,
+    providers: List[str],
+    factories: Dict[str, Callable[[], AsyncIterator[Any]]],
+    answered: Optional[Dict[str, str]] = None
+) -> AsyncIterator[Any]:
+    """
+    Streaming counterpart of call(). Retries and failover only happen until
+    the first chunk arrives; after that, chunks are relayed as they come and
+    a stall longer than STREAM_IDLE_TIMEOUT is an error.
+    """
+    last_error = None
+    for i, provider in enumerate(providers):
+        circuit = breaker(provider)
+        try:
+            source, first = await _first_chunk(provider, operation, factories[provider])
+        except Exception as e:
+            last_error = e
+            print(f"LLM {operation} stream failed on {provider}: {type(e).__name__}: {str(e)}")
+            if i < len(providers) - 1:
+                metrics.incr(f"llm.{operation}.failover")
+            continue
+
+        try:
+            if source is None:
+                return # Provider finished without output
+            if answered is not None:
+                answered["provider"] = provider
+            yield first
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(source.__anext__(), STREAM_IDLE_TIMEOUT)
+                except StopAsyncIteration:
+                    break
+                yield chunk
+        except Exception:
+            circuit.record_failure()
+            raise
+        finally:
+            if source is not None:
+                await source.aclose()
+        circuit.record_success()
+        return
+    raise last_error or ProviderUnavailable("No LLM provider configured")
+
+async def _call_provider(provider: str, operation: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+    circuit = breaker(provider)
+    if not circuit.allow():
+        metrics.incr(f"llm.{provider}.short_circuited")
+        raise ProviderUnavailable(f"{provider} circuit is open")
+
+    deadline = time.monotonic() + DEADLINES.get(operation, DEFAULT_DEADLINE)
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        try:
+            result = await asyncio.wait_for(fn(), remaining)
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                metrics.incr(f"llm.{provider}.timeouts")
+            delay = _backoff(attempt)
+            if is_transient(e) and attempt < LLM_RETRIES and time.monotonic() + delay < deadline:
+                attempt += 1
+                metrics.incr(f"llm.{provider}.retries")
+                await asyncio.sleep(delay)
+                continue
+            _record_failure(circuit, e)
+            raise
+        circuit.record_success()
+        return result
+
+async def _first_chunk(provider: str, operation: str, factory: Callable[[], AsyncIterator[Any]]):
+    """
+    Open a stream and wait for its first chunk, retrying transient failures.
+    Returns (stream, first chunk), or (None, None) for an empty stream.
+    """
+    async def first():
+        source = factory()
+        try:
+            return source, await asyncio.wait_for(source.__anext__(), STREAM_IDLE_TIMEOUT)
+        except StopAsyncIteration:
+            await source.aclose()
+            return None, None
+        except BaseException:
+            await source.aclose()
+            raise
+
+    return await _call_provider(provider, operation, first)
+
+def _record_failure(circuit: CircuitBreaker, error: Exception):
+    metrics.incr(f"llm.{circuit.name}.failures")
+    # Only provider-side trouble counts toward opening the breaker; a
+    # rejected request still shows the provider is up
+    if is_transient(error):
+        circuit.record_failure()
+    else:
+        circuit.record_success()
+
+def _backoff(attempt: int) -> float:
+    # Full jitter: spreads retries from concurrent callers
+    return random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * (2 ** attempt)))
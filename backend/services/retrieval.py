@@ -0,0 +1,237 @@
+"""
+BM25 retrieval over a document's chunks.
+
+An inverted index is built per (content hash, parser version) at ingest and
+stored as JSON in search_indexes. Chat uses it to pick the passages most
+relevant to the current question instead of the start of the document.
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import models
+from services import chunker, parser, text_store
+
+CHAT_CONTEXT_CHARS = int(os.getenv("CHAT_CONTEXT_CHARS", "10000"))
+CHAT_CONTEXT_TOP_K = int(os.getenv("CHAT_CONTEXT_TOP_K", "8"))
+CHAT_OVERVIEW_CHARS = int(os.getenv("CHAT_OVERVIEW_CHARS", "6000"))
+INDEX_CACHE_SIZE = int(os.getenv("INDEX_CACHE_SIZE", "32"))
+
+# Standard BM25 parameters
+K1 = 1.5
+B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in "
+    "into is it its me my no not of on or so than that the their them then "
+    "there these they this to was we what when where which who why will with "
+    "you your".split()
+)
+
+_cache: "OrderedDict[Tuple[str, int], BM25Index]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def tokenize(text: str) -> List[str]:
+    return [
+        token for token in _TOKEN_RE.findall(text.lower())
+        if len(token) > 1 and token not in _STOPWORDS
+    ]
+
+class BM25Index:
+    def __init__(self, lengths: List[int], postings: Dict[str, List[List[int]]]):
+        self.lengths = lengths # Token count per chunk ordinal
+        self.postings = postings # term -> [[ordinal, term frequency], ...]
+        self.avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+    @classmethod
+    def build(cls, chunks: Iterable[Tuple[int, str]]) -> "BM25Index":
+        lengths: List[int] = []
+        postings: Dict[str, List[List[int]]] = {}
+        for ordinal, text in chunks:
+            tokens = tokenize(text)
+            # Ordinals are dense and arrive in order
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append([ordinal, tf])
+        return cls(lengths, postings)
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """
+        Return up to k (ordinal, score) pairs with a positive score, best first.
+        """
+        n = len(self.lengths)
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for ordinal, tf in postings:
+                norm = K1 * (1 - B + B * self.lengths[ordinal] / self.avg_length)
+                scores[ordinal] = scores.get(ordinal, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def salience(self, text: str) -> float:
+        """
+        Information content of a passage: the summed IDF of its distinct
+        terms. Passages dense in rare, document-specific terms score highest.
+        """
+        n = len(self.lengths)
+        total = 0.0
+        for term in set(tokenize(text)):
+            df = len(self.postings.get(term, ()))
+            total += math.log(1 + (n - df + 0.5) / (df + 0.5))
+        return total
+
+    def to_json(self) -> str:
+        return json.dumps({"lengths": self.lengths, "postings": self.postings}, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, data: str) -> "BM25Index":
+        raw = json.loads(data)
+        return cls(raw["lengths"], raw["postings"])
+
+def build_index(db: Session, document: models.Document) -> BM25Index:
+    """
+    Build and store the BM25 index for a document's chunks.
+    """
+    chunks = chunker.get_chunks(db, document)
+    index = BM25Index.build((chunk.ordinal, chunk.text) for chunk in chunks)
+    db.add(models.SearchIndex(
+        content_hash=document.content_hash,
+        parser_version=parser.PARSER_VERSION,
+        data=index.to_json()
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another job indexed the same content first
+        db.rollback()
+    _remember((document.content_hash, parser.PARSER_VERSION), index)
+    return index
+
+def get_index(db: Session, document: models.Document) -> Optional[BM25Index]:
+    """
+    Load a document's index, building chunks and index for documents that
+    were ingested before retrieval existed.
+    """
+    if not document.content_hash and not text_store.get_text(db, document):
+        return None
+
+    key = (document.content_hash, parser.PARSER_VERSION)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    row = db.query(models.SearchIndex).filter(
+        models.SearchIndex.content_hash == document.content_hash,
+        models.SearchIndex.parser_version == parser.PARSER_VERSION
+    ).first()
+    if row:
+        index = BM25Index.from_json(row.data)
+        _remember(key, index)
+        return index
+
+    if not chunker.ensure_chunks(db, document):
+        return None
+    return build_index(db, document)
+
+def document_overview(
+    db: Session,
+    document: models.Document,
+    budget_chars: int = CHAT_OVERVIEW_CHARS
+) -> Tuple[str, Set[int]]:
+    """
+    Return the opening passages of a document that fit in budget_chars, and
+    their chunk ordinals. The text is identical on every call, so chat sends
+    it as a cacheable prompt prefix.
+    """
+    if get_index(db, document) is None:
+        return "", set()
+
+    selected = []
+    used = 0
+    rows = db.query(models.DocumentChunk).filter(
+        models.DocumentChunk.content_hash == document.content_hash,
+        models.DocumentChunk.parser_version == parser.PARSER_VERSION,
+        # Chunks overlap, so any chunk starting past the budget cannot fit
+        models.DocumentChunk.start_offset < budget_chars
+    ).order_by(models.DocumentChunk.ordinal).all()
+    for chunk in rows:
+        if used + len(chunk.text) > budget_chars:
+            break
+        selected.append(chunk)
+        used += len(chunk.text)
+    return _format(selected), {chunk.ordinal for chunk in selected}
+
+def select_context(
+    db: Session,
+    document: models.Document,
+    query: str,
+    budget_chars: int = CHAT_CONTEXT_CHARS,
+    top_k: int = CHAT_CONTEXT_TOP_K,
+    exclude: Iterable[int] = ()
+) -> str:
+    """
+    Return the top-k passages for the query that fit in budget_chars, in
+    document order and labelled with their page/slide location. Chunks in
+    exclude (e.g. already sent in the overview) are skipped. Falls back to
+    the earliest remaining chunks when nothing matches.
+    """
+    index = get_index(db, document)
+    if index is None:
+        return ""
+
+    exclude = set(exclude)
+    ranked = [ordinal for ordinal, _ in index.search(query, top_k + len(exclude)) if ordinal not in exclude][:top_k]
+    if not ranked:
+        ranked = [ordinal for ordinal in range(len(index.lengths)) if ordinal not in exclude][:top_k]
+
+    rows = db.query(models.DocumentChunk).filter(
+        models.DocumentChunk.content_hash == document.content_hash,
+        models.DocumentChunk.parser_version == parser.PARSER_VERSION,
+        models.DocumentChunk.ordinal.in_(ranked)
+    ).all()
+    by_ordinal = {row.ordinal: row for row in rows}
+
+    # Take passages best-first while they fit, then restore document order
+    selected = []
+    used = 0
+    for ordinal in ranked:
+        chunk = by_ordinal.get(ordinal)
+        if chunk is None or used + len(chunk.text) > budget_chars:
+            continue
+        selected.append(chunk)
+        used += len(chunk.text)
+
+    selected.sort(key=lambda chunk: chunk.ordinal)
+    return _format(selected)
+
+def _format(chunks: List[models.DocumentChunk]) -> str:
+    return "\n\n".join(f"[{_location_label(chunk)}]\n{chunk.text.strip()}" for chunk in chunks)
+
+def _location_label(chunk: models.DocumentChunk) -> str:
+    names = {"page": "Page", "slide": "Slide", "paragraph": "Paragraph"}
+    name = names.get(chunk.location_kind)
+    if not name:
+        return f"Section {chunk.ordinal + 1}"
+    if chunk.location_start == chunk.location_end:
+        return f"{name} {chunk.location_start + 1}"
+    return f"{name}s {chunk.location_start + 1}-{chunk.location_end + 1}"
+
+def _remember(key: Tuple[str, int], index: BM25Index) -> None:
+    with _cache_lock:
+        _cache[key] = index
+        _cache.move_to_end(key)
+        while len(_cache) > INDEX_CACHE_SIZE:
+            _cache.popitem(last=False)
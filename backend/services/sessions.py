@@ -0,0 +1,82 @@
+"""
+Periodic removal of expired login sessions.
+
+Every login adds a sessions row, and an expired one is otherwise only
+deleted if its token is presented again. A background task deletes expired
+rows every SESSION_SWEEP_INTERVAL seconds, SESSION_SWEEP_BATCH rows per
+transaction so a large backlog never holds a long write lock.
+"""
+
+import asyncio
+import datetime
+import os
+import time
+from typing import Callable, Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+import database
+import models
+from services import metrics
+
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "3600"))
+SESSION_SWEEP_BATCH = int(os.getenv("SESSION_SWEEP_BATCH", "5000"))
+
+_task: Optional[asyncio.Task] = None
+
+def sweep_expired(db: Session, now: datetime.datetime = None, batch_size: int = None) -> int:
+    """
+    Delete expired sessions in batches until none are left. Returns the
+    number of rows deleted.
+    """
+    now = now or datetime.datetime.utcnow()
+    batch_size = batch_size or SESSION_SWEEP_BATCH
+    started = time.perf_counter()
+    deleted = 0
+
+    while True:
+        # Each batch is its own short transaction, found through the expires_at index
+        batch = select(models.Session.id).where(models.Session.expires_at < now).limit(batch_size)
+        result = db.execute(delete(models.Session).where(models.Session.id.in_(batch.scalar_subquery())))
+        db.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            break
+
+    metrics.incr("sessions.swept", deleted)
+    metrics.observe("sessions.sweep_ms", (time.perf_counter() - started) * 1000)
+    metrics.set_gauge("sessions.rows", db.query(func.count(models.Session.id)).scalar())
+    return deleted
+
+async def start(session_factory: Callable = None, interval: float = None):
+    """
+    Start the sweeper task. The first sweep runs immediately.
+    """
+    global _task
+    if _task is None:
+        _task = asyncio.create_task(_run(session_factory or database.SessionLocal, interval or SESSION_SWEEP_INTERVAL))
+
+async def stop():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
+
+async def _run(session_factory: Callable, interval: float):
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            # Deletes are blocking database work; keep them off the event loop
+            await loop.run_in_executor(None, _sweep_once, session_factory)
+        except Exception as e:
+            print(f"Session sweep error: {str(e)}")
+        await asyncio.sleep(interval)
+
+def _sweep_once(session_factory: Callable):
+    db = session_factory()
+    try:
+        deleted = sweep_expired(db)
+        if deleted:
+            print(f"Removed {deleted} expired sessions")
+    finally:
+        db.close()
@@ -0,0 +1,35 @@
+"""
+Single-flight coalescing for expensive async work.
+
+Concurrent callers asking for the same key share one in-flight task instead
+of each starting their own (e.g. a double-clicked "Generate quiz"). The work
+runs as its own task, so one caller disconnecting does not cancel it for the
+others.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from services import metrics
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await fn() for the first caller with this key; later callers that
+        arrive before it finishes await the same result (or exception).
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            metrics.incr(f"singleflight.{self.name}.leader")
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            metrics.incr(f"singleflight.{self.name}.coalesced")
+        return await asyncio.shield(task)
+
+    def inflight(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,172 @@
+"""
+Content-addressed upload storage.
+
+Uploaded bytes are streamed to a staging file while being hashed, then
+stored once under uploads/<aa>/<sha256>. A StoredFile row tracks how many
+Document rows point at each file; the file is removed once the last one is
+deleted and committed.
+
+The StoredFile row doubles as the lock for its file: acquire() places the
+staged bytes only after it has written the row, and collect() removes the
+file only while its conditional delete of the row holds it. So a file is
+never removed while a committed or in-flight upload references it.
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Optional, Tuple
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import models
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(os.getcwd(), "uploads"))
+CHUNK_SIZE = 1024 * 1024
+
+def save_stream(source: BinaryIO) -> Tuple[str, str, int]:
+    """
+    Copy a file object to a staging file in fixed-size chunks, hashing it.
+    Returns (content_hash, staged_path, size_bytes); pass them to acquire().
+    Blocking; call from a thread.
+    """
+    tmp_dir = os.path.join(UPLOAD_DIR, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            for block in iter(lambda: source.read(CHUNK_SIZE), b""):
+                digest.update(block)
+                buffer.write(block)
+                size += len(block)
+            buffer.flush()
+            os.fsync(buffer.fileno())
+        return digest.hexdigest(), tmp_path, size
+    except Exception:
+        discard(tmp_path)
+        raise
+
+def path_for(content_hash: str) -> str:
+    # The hash alone: StoredFile is unique on it, whatever the upload's extension
+    return os.path.join(UPLOAD_DIR, content_hash[:2], content_hash)
+
+def acquire(db: Session, content_hash: str, staged_path: str, size_bytes: int) -> models.StoredFile:
+    """
+    Add a reference to a stored file, creating its row on first use, and
+    move the staged bytes into place if the file is not on disk. The
+    returned row's file_path is where the bytes live. The caller commits
+    together with the Document that holds the reference.
+    """
+    try:
+        stored = _get(db, content_hash)
+        updated = stored is not None and db.execute(
+            update(models.StoredFile)
+            .where(models.StoredFile.id == stored.id)
+            .values(ref_count=models.StoredFile.ref_count + 1)
+        ).rowcount
+        if not updated:
+            # New bytes, or the row was collected since _get
+            stored = _create(db, content_hash, size_bytes)
+        db.refresh(stored)
+
+        # The row is now locked by this transaction, so collect() cannot remove the file
+        if not os.path.exists(stored.file_path):
+            os.makedirs(os.path.dirname(stored.file_path), exist_ok=True)
+            os.replace(staged_path, stored.file_path)
+        return stored
+    finally:
+        discard(staged_path)
+
+def release(db: Session, document: models.Document) -> None:
+    """
+    Drop a document's reference to its file. The caller commits, then calls
+    collect() to delete the file if that was the last reference.
+    """
+    if not document.content_hash:
+        return
+    db.execute(
+        update(models.StoredFile)
+        .where(models.StoredFile.content_hash == document.content_hash)
+        .values(ref_count=models.StoredFile.ref_count - 1)
+    )
+
+def collect(db: Session, content_hash: Optional[str], file_path: str) -> None:
+    """
+    Delete a released file and its derived data if nothing references it,
+    in a transaction of its own. Call after release() has been committed.
+    """
+    if not content_hash:
+        # Files uploaded before content addressing belong to one document
+        _remove_file(file_path)
+        return
+
+    stored = _get(db, content_hash)
+    if not stored:
+        return
+    # Re-checked under the row lock: a concurrent upload may have taken a new reference
+    removed = db.execute(delete(models.StoredFile).where(
+        models.StoredFile.id == stored.id,
+        models.StoredFile.ref_count <= 0
+    )).rowcount
+    if removed:
+        _remove_file(stored.file_path)
+        # Derived data is keyed by content hash and now unused
+        for model in (models.ExtractedText, models.DocumentChunk, models.SearchIndex):
+            db.execute(delete(model).where(model.content_hash == content_hash))
+    db.commit()
+
+def discard(staged_path: str) -> None:
+    if staged_path and os.path.exists(staged_path):
+        os.remove(staged_path)
+
+def find_processed(db: Session, content_hash: str, user_id: int) -> Optional[models.Document]:
+    """
+    Return an already-ingested document with the same bytes, preferring the
+    uploading user's own copy. Only content-derived data (summary, text,
+    chunks, index) may be reused from another user's copy; categories are
+    per user.
+    """
+    query = db.query(models.Document).filter(
+        models.Document.content_hash == content_hash,
+        models.Document.status == "ready"
+    )
+    return (
+        query.filter(models.Document.user_id == user_id).first()
+        or query.first()
+    )
+
+def _create(db: Session, content_hash: str, size_bytes: int) -> models.StoredFile:
+    try:
+        with db.begin_nested():
+            stored = models.StoredFile(
+                content_hash=content_hash,
+                file_path=path_for(content_hash),
+                size_bytes=size_bytes,
+                ref_count=1
+            )
+            db.add(stored)
+        return stored
+    except IntegrityError:
+        # A concurrent upload of the same bytes created it first
+        stored = _get(db, content_hash)
+        db.execute(
+            update(models.StoredFile)
+            .where(models.StoredFile.id == stored.id)
+            .values(ref_count=models.StoredFile.ref_count + 1)
+        )
+        return stored
+
+def _get(db: Session, content_hash: str) -> Optional[models.StoredFile]:
+    return db.query(models.StoredFile).filter(
+        models.StoredFile.content_hash == content_hash
+    ).first()
+
+def _remove_file(file_path: str) -> None:
+    if file_path and os.path.exists(file_path):
+        try:
+            os.remove(file_path)
+        except Exception as e:
+            print(f"Error deleting file {file_path}: {e}")
@@ -0,0 +1,118 @@
+"""
+Per-day study rollups for the analytics dashboard.
+
+study_days holds, per user and local day, the seconds studied and sessions
+started for each activity type. Local days depend on the browser's UTC
+offset, so rows are kept per offset a user has asked for stats in (usually
+one, two across a DST change). The first stats request in a new offset
+builds that offset's rows from study_sessions; after that, starting and
+ending a session add to the rows of every offset the user already has, and
+the dashboard reads one index range instead of the session history.
+
+Session updates and backfills lock the user's row first, so a session that
+starts or ends while its user's rows are being built is either in the
+backfill's read or added after it, never missed.
+"""
+
+import datetime
+from typing import List
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from services import metrics
+
+async def record_start(db: AsyncSession, user_id: int, session: models.StudySession):
+    await _add(db, user_id, session.start_time, session.activity_type, seconds=0, sessions=1)
+
+async def record_end(db: AsyncSession, user_id: int, session: models.StudySession, duration: int):
+    # Counted on the day the session started, like its session count
+    await _add(db, user_id, session.start_time, session.activity_type, seconds=duration, sessions=0)
+
+async def load_days(db: AsyncSession, user_id: int, tz_offset: int) -> List[models.StudyDay]:
+    """
+    The user's rollup rows for this offset, newest day first.
+    """
+    query = select(models.StudyDay).where(
+        models.StudyDay.user_id == user_id,
+        models.StudyDay.tz_offset == tz_offset
+    ).order_by(models.StudyDay.local_date.desc())
+    days = (await db.scalars(query)).all()
+    if days:
+        metrics.incr("study_rollup.hits")
+        return days
+
+    metrics.incr("study_rollup.backfills")
+    if await _backfill(db, user_id, tz_offset):
+        days = (await db.scalars(query)).all()
+    return days
+
+async def invalidate(db: AsyncSession, user_id: int):
+    """
+    Drop a user's rollups (committed with the caller's transaction), e.g.
+    after sessions were deleted with a document. They rebuild on the next read.
+    """
+    await db.execute(delete(models.StudyDay).where(models.StudyDay.user_id == user_id))
+
+def local_date(start_time: datetime.datetime, tz_offset: int) -> datetime.date:
+    # Stored times are UTC; SQLite hands them back naive
+    if start_time.tzinfo is not None:
+        start_time = start_time.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (start_time - datetime.timedelta(minutes=tz_offset)).date()
+
+async def _lock_user(db: AsyncSession, user_id: int):
+    # Held until commit. A no-op write takes the lock on every backend (SQLite has no FOR UPDATE)
+    await db.execute(update(models.User).where(models.User.id == user_id).values(created_at=models.User.created_at))
+
+async def _add(db: AsyncSession, user_id: int, start_time: datetime.datetime, activity_type: str, seconds: int, sessions: int):
+    await _lock_user(db, user_id)
+    offsets = (await db.scalars(select(models.StudyDay.tz_offset).where(
+        models.StudyDay.user_id == user_id
+    ).distinct())).all()
+    for tz_offset in offsets:
+        await _upsert(db, user_id, tz_offset, local_date(start_time, tz_offset), activity_type or "", seconds, sessions)
+
+async def _upsert(db: AsyncSession, user_id: int, tz_offset: int, day: datetime.date, activity_type: str, seconds: int, sessions: int, accumulate: bool = True):
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    table = models.StudyDay.__table__
+    stmt = dialect.insert(table).values(
+        user_id=user_id, tz_offset=tz_offset, local_date=day,
+        activity_type=activity_type, seconds=seconds, sessions=sessions
+    )
+    index_elements = ["user_id", "tz_offset", "local_date", "activity_type"]
+    if accumulate:
+        # Concurrent sessions on the same day add to one row instead of racing to create it
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={"seconds": table.c.seconds + stmt.excluded.seconds, "sessions": table.c.sessions + stmt.excluded.sessions}
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+    await db.execute(stmt)
+
+async def _backfill(db: AsyncSession, user_id: int, tz_offset: int) -> bool:
+    """
+    Build this offset's rows from the full session history. Returns False
+    if the user has no sessions yet.
+    """
+    user_sessions = select(models.StudySession).join(models.Document).where(models.Document.user_id == user_id)
+    if await db.scalar(user_sessions.with_only_columns(models.StudySession.id).limit(1)) is None:
+        return False
+
+    await _lock_user(db, user_id)
+    rows = (await db.execute(user_sessions.with_only_columns(
+        models.StudySession.start_time,
+        models.StudySession.activity_type,
+        models.StudySession.duration_seconds
+    ))).all()
+
+    totals = {}
+    for start_time, activity_type, duration in rows:
+        key = (local_date(start_time, tz_offset), activity_type or "")
+        seconds, sessions = totals.get(key, (0, 0))
+        totals[key] = (seconds + (duration or 0), sessions + 1)
+    # A concurrent backfill for the same offset writes the same rows; keep whichever lands first
+    for (day, activity_type), (seconds, sessions) in totals.items():
+        await _upsert(db, user_id, tz_offset, day, activity_type, seconds, sessions, accumulate=False)
+    await db.commit()
+    return True
@@ -0,0 +1,72 @@
+"""
+Hierarchical document summaries, built at ingest.
+
+Consecutive chunks are grouped into sections of up to SUMMARY_SECTION_TOKENS
+and each section is summarized; the section summaries are then combined, a
+few at a time for long documents, until one summary of the whole document
+remains. It is stored on the document and used by chat, quiz and category
+prompts as a compact stand-in for the full text.
+"""
+
+import asyncio
+import os
+from typing import List
+from sqlalchemy.orm import Session
+import models
+from services import ai, chunker, metrics, text_store
+
+SUMMARY_SECTION_TOKENS = int(os.getenv("SUMMARY_SECTION_TOKENS", "3000"))
+SUMMARY_MERGE_FANOUT = int(os.getenv("SUMMARY_MERGE_FANOUT", "8")) # Summaries combined per call
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4")) # Provider calls in flight per document
+
+async def summarize_document(db: Session, document: models.Document) -> str:
+    """
+    Summarize a chunked document. Returns "" if any provider call fails, so
+    prompts fall back to the document text rather than a partial summary.
+    """
+    text = text_store.get_text(db, document)
+    sections = _sections(text, chunker.get_chunks(db, document))
+    if not sections:
+        return ""
+
+    limit = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+
+    async def bounded(call):
+        async with limit:
+            return await call
+
+    # 1. One summary per section
+    summaries = await asyncio.gather(*(bounded(ai.summarize_section(section)) for section in sections))
+    calls = len(sections)
+
+    # 2. Combine neighbouring summaries until one remains
+    while len(summaries) > 1 and all(summaries):
+        groups = [summaries[i:i + SUMMARY_MERGE_FANOUT] for i in range(0, len(summaries), SUMMARY_MERGE_FANOUT)]
+        summaries = await asyncio.gather(*(bounded(ai.combine_summaries(group)) for group in groups))
+        calls += len(groups)
+
+    metrics.observe("summary.sections", len(sections))
+    metrics.observe("summary.llm_calls", calls)
+    if not all(summaries):
+        metrics.incr("summary.failures")
+        return ""
+    return summaries[0]
+
+def _sections(text: str, chunks: List[models.DocumentChunk]) -> List[str]:
+    """
+    Group consecutive chunks into spans of the extracted text of at most
+    SUMMARY_SECTION_TOKENS. Slicing the text rather than joining chunk texts
+    keeps the overlap between chunks from being summarized twice.
+    """
+    sections = []
+    start = end = None
+    for chunk in chunks:
+        if start is not None and chunker.estimate_tokens(text[start:chunk.end_offset]) > SUMMARY_SECTION_TOKENS:
+            sections.append(text[start:end])
+            start = max(chunk.start_offset, end)
+        if start is None:
+            start = chunk.start_offset
+        end = chunk.end_offset
+    if start is not None:
+        sections.append(text[start:end])
+    return [section for section in sections if section.strip()]
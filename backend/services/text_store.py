@@ -0,0 +1,97 @@
+import asyncio
+import hashlib
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+import models
+from services import parser
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def hash_file(file_path: str) -> str:
+    """
+    Compute the sha256 of a file without loading it into memory.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def get_text(db: Session, document: models.Document) -> str:
+    """
+    Return the extracted text for a document.
+    Text is stored once per (content hash, parser version); the original file
+    is only parsed when no entry exists for the current parser version.
+    """
+    # 1. Make sure the document has a content hash (older rows may not)
+    if not document.content_hash:
+        try:
+            document.content_hash = hash_file(document.file_path)
+        except OSError as e:
+            print(f"Error hashing {document.file_path}: {str(e)}")
+            return ""
+        db.commit()
+
+    # 2. Serve from the store if the entry is current
+    cached = _lookup(db, document.content_hash)
+    if cached is not None:
+        return cached.text
+
+    # 3. Missing or stale: parse and store
+    text = parser.extract_text(document.file_path, document.file_type)
+    if text:
+        store_text(db, document.content_hash, text)
+    return text
+
+async def get_text_async(db: AsyncSession, document: models.Document) -> str:
+    """
+    get_text for request handlers: the store is queried asynchronously and
+    hashing and parsing run in a worker thread, off the event loop.
+    """
+    if not document.content_hash:
+        try:
+            document.content_hash = await asyncio.to_thread(hash_file, document.file_path)
+        except OSError as e:
+            print(f"Error hashing {document.file_path}: {str(e)}")
+            return ""
+        await db.commit()
+
+    cached = await db.scalar(_current(document.content_hash))
+    if cached is not None:
+        return cached.text
+
+    text = await asyncio.to_thread(parser.extract_text, document.file_path, document.file_type)
+    if text:
+        await db.run_sync(store_text, document.content_hash, text)
+    return text
+
+def store_text(db: Session, content_hash: str, text: str) -> None:
+    """
+    Save extracted text for the current parser version and drop stale versions.
+    """
+    db.query(models.ExtractedText).filter(
+        models.ExtractedText.content_hash == content_hash,
+        models.ExtractedText.parser_version != parser.PARSER_VERSION
+    ).delete(synchronize_session=False)
+
+    db.add(models.ExtractedText(
+        content_hash=content_hash,
+        parser_version=parser.PARSER_VERSION,
+        text=text
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request stored the same content first
+        db.rollback()
+
+def _lookup(db: Session, content_hash: str):
+    return db.scalar(_current(content_hash))
+
+def _current(content_hash: str):
+    return select(models.ExtractedText).where(
+        models.ExtractedText.content_hash == content_hash,
+        models.ExtractedText.parser_version == parser.PARSER_VERSION
+    ).limit(1)
@@ -0,0 +1,36 @@
+import asyncio
+import json
+import time
+import httpx
+from services import ai
+
+def _ollama_stub(delay: float):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delay)
+        payload = json.loads(request.content)
+        if request.url.path == "/api/chat":
+            question = payload["messages"][-1]["content"].rsplit("Question: ", 1)[-1]
+            return httpx.Response(200, json={"message": {"role": "assistant", "content": f"echo: {question}"}})
+        return httpx.Response(200, json={"response": "Science"})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+def test_concurrent_chats_overlap(monkeypatch):
+    monkeypatch.setattr(ai, "AI_PROVIDER", "ollama")
+
+    async def run():
+        monkeypatch.setattr(ai, "http_client", _ollama_stub(delay=0.2))
+        start = time.perf_counter()
+        replies = await asyncio.gather(*[
+            ai.generate_chat_response([{"role": "user", "content": f"question {i}"}], "context")
+            for i in range(5)
+        ])
+        elapsed = time.perf_counter() - start
+        category = await ai.suggest_category("Cells and enzymes")
+        await ai.shutdown()
+        return replies, elapsed, category
+
+    replies, elapsed, category = asyncio.run(run())
+
+    assert replies == [f"echo: question {i}" for i in range(5)]
+    assert elapsed < 0.6 # Serial calls would take at least 1.0s
+    assert category == "Science"
@@ -0,0 +1,73 @@
+import asyncio
+import datetime
+import pytest
+from sqlalchemy import delete
+import main, middleware, models
+from services import metrics
+
+@pytest.fixture
+def token(db, user):
+    token = "token-for-tester"
+    db.add(models.Session(
+        user_id=user.id,
+        token=token,
+        expires_at=datetime.datetime.utcnow() + datetime.timedelta(days=1)
+    ))
+    db.commit()
+    return token
+
+@pytest.fixture
+def auth_client(client):
+    # The real auth dependency instead of the fixed test user
+    main.app.dependency_overrides.pop(middleware.get_current_user)
+    return client
+
+def _me(client, token):
+    return client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+def test_repeat_requests_are_served_from_cache(auth_client, token, user, monkeypatch):
+    monkeypatch.setattr(middleware, "AUTH_REVOCATION_POLL", 60)
+    metrics.reset()
+
+    assert _me(auth_client, token).json() == {"id": user.id, "username": "tester"}
+    assert _me(auth_client, token).json() == {"id": user.id, "username": "tester"}
+
+    counters = metrics.snapshot()["counters"]
+    assert counters["auth.cache_misses"] == 1
+    assert counters["auth.cache_hits"] == 1
+
+def test_logout_invalidates_cached_token(auth_client, token):
+    assert _me(auth_client, token).status_code == 200
+
+    response = auth_client.post("/api/auth/logout", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert _me(auth_client, token).status_code == 401
+
+def test_logout_on_another_worker_is_seen_after_poll(auth_client, async_sessions, token, monkeypatch):
+    monkeypatch.setattr(middleware, "AUTH_REVOCATION_POLL", 60)
+    assert _me(auth_client, token).status_code == 200
+
+    # Another worker logs the token out: its own cache, not ours, is evicted
+    async def logout_elsewhere():
+        async with async_sessions() as other:
+            await other.execute(delete(models.Session).where(models.Session.token == token))
+            await middleware.revoke(other, "some-other-token")
+            await other.commit()
+    asyncio.run(logout_elsewhere())
+
+    assert _me(auth_client, token).status_code == 200 # Stale until the next check
+    monkeypatch.setattr(middleware, "AUTH_REVOCATION_POLL", 0)
+    assert _me(auth_client, token).status_code == 401
+
+def test_cached_entry_never_outlives_session(auth_client, db, token, user):
+    middleware._cache_put(token, datetime.datetime.utcnow() - datetime.timedelta(seconds=1), user)
+    db.query(models.Session).filter(models.Session.token == token).update(
+        {models.Session.expires_at: datetime.datetime.utcnow() - datetime.timedelta(seconds=1)}
+    )
+    db.commit()
+
+    response = _me(auth_client, token)
+
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Session expired"
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import httpx
+import models
+from services import ai, metrics
+
+def _ollama_stream(tokens):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        lines = [json.dumps({"message": {"content": t}, "done": False}) for t in tokens]
+        lines.append(json.dumps({"message": {"content": ""}, "done": True}))
+        return httpx.Response(200, content="\n".join(lines).encode())
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+def _events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+def test_stream_relays_tokens_and_saves_reply(client, db, user, tmp_path, monkeypatch):
+    path = tmp_path / "bio.txt"
+    path.write_text("Ribosomes synthesize proteins.\n", encoding="utf-8")
+    document = models.Document(filename="bio.txt", file_path=str(path), file_type="TXT", user_id=user.id)
+    db.add(document)
+    db.commit()
+
+    monkeypatch.setattr(ai, "AI_PROVIDER", "ollama")
+    monkeypatch.setattr(ai, "http_client", _ollama_stream(["Ribo", "somes ", "make proteins."]))
+    metrics.reset()
+
+    response = client.post(f"/api/chat/stream/{document.id}", json={"role": "user", "content": "What do ribosomes do?"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    assert [data["text"] for name, data in events if name == "token"] == ["Ribo", "somes ", "make proteins."]
+    name, done = events[-1]
+    assert name == "done"
+    assert done["message"]["content"] == "Ribosomes make proteins."
+    assert done["ttft_ms"] <= done["total_ms"]
+
+    saved = db.query(models.ChatMessage).order_by(models.ChatMessage.id).all()
+    assert [(m.role, m.content) for m in saved] == [
+        ("user", "What do ribosomes do?"),
+        ("assistant", "Ribosomes make proteins.")
+    ]
+    assert metrics.snapshot()["timings"]["chat_stream.ttft_ms"]["count"] == 1
+
+def test_partial_reply_is_saved_when_client_disconnects(client, db, user, tmp_path, monkeypatch):
+    import main
+    path = tmp_path / "bio.txt"
+    path.write_text("Ribosomes translate messenger RNA.\n", encoding="utf-8")
+    document = models.Document(filename="bio.txt", file_path=str(path), file_type="TXT", user_id=user.id)
+    db.add(document)
+    db.commit()
+
+    async def stalled_reply(*args, **kwargs):
+        yield "Ribo"
+        yield "somes "
+        await asyncio.sleep(30)
+        yield "never sent"
+    monkeypatch.setattr(ai, "stream_chat_response", stalled_reply)
+
+    async def disconnect_after_first_token():
+        body = json.dumps({"role": "user", "content": "What do ribosomes do?"}).encode()
+        got_token = asyncio.Event()
+        requested = False
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await got_token.wait()
+            return {"type": "http.disconnect"}
+        async def send(message):
+            if message["type"] == "http.response.body" and b"somes" in message.get("body", b""):
+                got_token.set()
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+            "scheme": "http", "path": f"/api/chat/stream/{document.id}", "raw_path": b"", "query_string": b"",
+            "root_path": "", "headers": [(b"content-type", b"application/json")],
+            "client": ("test", 1), "server": ("test", 80),
+        }
+        await asyncio.wait_for(main.app(scope, receive, send), 10)
+    asyncio.run(disconnect_after_first_token())
+
+    saved = db.query(models.ChatMessage).order_by(models.ChatMessage.id).all()
+    assert [(m.role, m.content) for m in saved] == [
+        ("user", "What do ribosomes do?"),
+        ("assistant", "Ribosomes ")
+    ]
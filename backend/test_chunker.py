@@ -0,0 +1,64 @@
+import models
+from services import chunker, parser
+from services.parser import TextSegment
+
+def _pages(count, words_per_page):
+    return [
+        TextSegment(" ".join(f"p{page}w{i}" for i in range(words_per_page)) + "\n", "page", page)
+        for page in range(count)
+    ]
+
+def test_chunks_are_contiguous_slices_of_the_text():
+    segments = _pages(20, 60)
+    full_text = "".join(segment.text for segment in segments)
+
+    chunks = list(chunker.chunk_segments(segments, max_tokens=200, overlap_tokens=60))
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert full_text[chunk.start_offset:chunk.end_offset] == chunk.text
+        assert len(chunk.text) <= 200 * chunker.CHARS_PER_TOKEN
+    assert chunks[0].start_offset == 0
+    assert chunks[-1].end_offset == len(full_text)
+
+def test_small_pages_are_never_split_and_chunks_overlap():
+    segments = _pages(10, 40)
+
+    chunks = list(chunker.chunk_segments(segments, max_tokens=200, overlap_tokens=100))
+
+    page_starts = {sum(len(s.text) for s in segments[:i]) for i in range(len(segments) + 1)}
+    for chunk in chunks:
+        assert chunk.start_offset in page_starts and chunk.end_offset in page_starts
+        assert chunk.location_kind == "page"
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.start_offset < previous.end_offset
+        assert current.location_start == previous.location_end
+
+def test_oversized_segment_is_split_on_sentences():
+    text = "".join(f"Sentence number {i} about enzymes. " for i in range(200)) + "\n"
+
+    chunks = list(chunker.chunk_segments([TextSegment(text, "paragraph", 0)], max_tokens=50, overlap_tokens=0))
+
+    assert "".join(chunk.text for chunk in chunks) == text
+    assert all(chunk.text.endswith((". ", "\n")) for chunk in chunks)
+    assert all(chunk.location_start == chunk.location_end == 0 for chunk in chunks)
+
+def test_ensure_chunks_stores_once_per_content(db, user, tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("".join(f"Line {i} on cellular respiration.\n" for i in range(500)), encoding="utf-8")
+    document = models.Document(
+        filename="notes.txt", file_path=str(path), file_type="TXT",
+        content_hash="abc123", user_id=user.id
+    )
+    db.add(document)
+    db.commit()
+
+    stored = chunker.ensure_chunks(db, document)
+    assert stored > 1
+    assert chunker.ensure_chunks(db, document) == stored
+
+    chunks = chunker.get_chunks(db, document)
+    text = parser.extract_text(str(path), "TXT")
+    assert [chunk.ordinal for chunk in chunks] == list(range(stored))
+    assert all(text[c.start_offset:c.end_offset] == c.text for c in chunks)
+    assert all(c.token_estimate == chunker.estimate_tokens(c.text) for c in chunks)
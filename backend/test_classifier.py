@@ -0,0 +1,115 @@
+import asyncio
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import models
+from services import ai, classifier, text_store
+
+BIOLOGY = [
+    "Cells use enzymes to catalyze reactions; mitochondria produce ATP through respiration.",
+    "DNA replication, transcription and translation produce proteins in the nucleus and ribosomes.",
+    "Photosynthesis in chloroplasts converts light energy into glucose across membranes.",
+]
+HISTORY = [
+    "The Roman Empire expanded under Augustus while the senate lost power to the emperor.",
+    "The French Revolution overthrew the monarchy in 1789 and the terror followed.",
+    "World War One began in 1914 after the assassination of Archduke Franz Ferdinand.",
+]
+
+def _add(db, user, tmp_path, name, text, category="Uncategorized", status="ready"):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    document = models.Document(
+        filename=name, file_path=str(path), file_type="TXT",
+        category=category, status=status, user_id=user.id
+    )
+    db.add(document)
+    db.commit()
+    return document
+
+def _count_llm_calls(monkeypatch, answer):
+    calls = []
+    async def fake_category(text):
+        calls.append(text)
+        return answer
+    monkeypatch.setattr(ai, "suggest_category", fake_category)
+    return calls
+
+def _labelled_library(db, user, tmp_path):
+    for i, text in enumerate(BIOLOGY):
+        _add(db, user, tmp_path, f"bio{i}.txt", text, "Biology")
+    for i, text in enumerate(HISTORY):
+        _add(db, user, tmp_path, f"hist{i}.txt", text, "History")
+
+def test_confident_prediction_skips_the_llm(db, user, tmp_path, monkeypatch):
+    _labelled_library(db, user, tmp_path)
+    calls = _count_llm_calls(monkeypatch, "Science")
+    document = _add(db, user, tmp_path, "new.txt", "Enzymes in the mitochondria help cells produce ATP.", status="processing")
+
+    category = asyncio.run(classifier.categorize(db, document, "summary"))
+
+    assert category == "Biology"
+    assert calls == []
+
+def test_first_model_is_stored_and_not_retrained(db, user, tmp_path, monkeypatch):
+    _labelled_library(db, user, tmp_path)
+    _count_llm_calls(monkeypatch, "Science")
+    document = _add(db, user, tmp_path, "new.txt", "Enzymes in the mitochondria help cells produce ATP.", status="processing")
+    asyncio.run(classifier.categorize(db, document, "summary"))
+    assert db.query(models.CategoryModel).filter(models.CategoryModel.user_id == user.id).count() == 1
+
+    texts = []
+    original_get_text = text_store.get_text
+    monkeypatch.setattr(text_store, "get_text", lambda db, document: texts.append(document.id) or original_get_text(db, document))
+    asyncio.run(classifier.categorize(db, document, "summary"))
+
+    assert texts == [document.id]
+
+def test_concurrent_llm_answers_are_both_learned(db, db_path, user, tmp_path, monkeypatch):
+    _labelled_library(db, user, tmp_path)
+    econ = _add(db, user, tmp_path, "econ.txt", "Supply and demand curves determine market prices.", status="processing")
+    law = _add(db, user, tmp_path, "law.txt", "Contracts require offer, acceptance and consideration.", status="processing")
+    classifier.load(db, user.id)
+
+    other = sessionmaker(bind=create_engine(f"sqlite:///{db_path}"))()
+    async def fake_category(text):
+        if text == "econ":
+            # Another worker learns its answer while this one waits on the LLM
+            await classifier.categorize(other, other.get(models.Document, law.id), "law")
+            return "Economics"
+        return "Law"
+    monkeypatch.setattr(ai, "suggest_category", fake_category)
+
+    asyncio.run(classifier.categorize(db, econ, "econ"))
+    other.close()
+
+    model = classifier.load(db, user.id)
+    assert model.documents[str(econ.id)] == "Economics"
+    assert model.documents[str(law.id)] == "Law"
+
+def test_unsure_prediction_falls_back_to_llm_and_learns(db, user, tmp_path, monkeypatch):
+    _labelled_library(db, user, tmp_path)
+    calls = _count_llm_calls(monkeypatch, "Economics")
+    text = "Supply and demand curves determine market prices and quantities."
+    document = _add(db, user, tmp_path, "econ.txt", text, status="processing")
+
+    category = asyncio.run(classifier.categorize(db, document, "summary"))
+
+    assert category == "Economics"
+    assert calls == ["summary"]
+    model = classifier.load(db, user.id)
+    assert model.documents[str(document.id)] == "Economics"
+    assert model.predict(classifier.features(text))[0] == "Economics"
+
+def test_correction_moves_document_to_new_label(client, db, user, tmp_path):
+    _labelled_library(db, user, tmp_path)
+    document = db.query(models.Document).filter(models.Document.filename == "bio2.txt").first()
+
+    response = client.put(f"/api/documents/{document.id}/category?category=Botany")
+
+    assert response.status_code == 200
+    model = classifier.load(db, user.id)
+    assert model.documents[str(document.id)] == "Botany"
+    assert model.labels["Biology"]["docs"] == 2
+    assert model.labels["Botany"]["docs"] == 1
+    feats = classifier.features(text_store.get_text(db, document))
+    assert all(model.labels["Botany"]["counts"][str(bucket)] == 1 for bucket in feats)
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import httpx
+import models
+from services import ai, chunker, conversation
+
+def _ollama_stub(chat_payloads, summaries):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        if request.url.path == "/api/chat":
+            chat_payloads.append(payload)
+            return httpx.Response(200, json={"message": {"role": "assistant", "content": "Answer. " * 20}})
+        summaries.append(payload["prompt"])
+        return httpx.Response(200, json={"response": f"Summary after {len(summaries)} folds."})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+def test_prompt_history_stays_within_budget(client, db, user, tmp_path, monkeypatch):
+    path = tmp_path / "notes.txt"
+    path.write_text("Enzymes lower activation energy.\n", encoding="utf-8")
+    document = models.Document(filename="notes.txt", file_path=str(path), file_type="TXT", user_id=user.id)
+    db.add(document)
+    db.commit()
+
+    chat_payloads, summaries = [], []
+    monkeypatch.setattr(ai, "AI_PROVIDER", "ollama")
+    monkeypatch.setattr(ai, "http_client", _ollama_stub(chat_payloads, summaries))
+    monkeypatch.setattr(conversation, "CHAT_HISTORY_TOKENS", 200)
+
+    for turn in range(12):
+        response = client.post(f"/api/chat/send/{document.id}", json={"role": "user", "content": f"Question {turn}: " + "why? " * 20})
+        assert response.status_code == 200
+
+    history_tokens = [
+        sum(chunker.estimate_tokens(msg["content"]) for msg in payload["messages"][1:-1])
+        for payload in chat_payloads
+    ]
+    assert max(history_tokens) <= 200
+    assert summaries, "older turns should have been folded into the summary"
+    # Compaction is batched, not once per turn
+    assert len(summaries) < 12
+
+    summary = db.query(models.ChatSummary).filter(models.ChatSummary.document_id == document.id).one()
+    assert summary.content == f"Summary after {len(summaries)} folds."
+    assert summary.content in chat_payloads[-1]["messages"][0]["content"]
+    # The window opens on a user turn and ends with the newest question
+    assert chat_payloads[-1]["messages"][1]["role"] == "user"
+    assert "Question 11" in chat_payloads[-1]["messages"][-1]["content"]
+    # Each fold carries the previous summary forward
+    assert "Summary after 1 folds." in summaries[1]
+
+def test_long_legacy_chat_is_folded_in_bounded_batches(db, user, async_sessions, monkeypatch):
+    document = models.Document(filename="notes.txt", file_path="notes.txt", file_type="TXT", user_id=user.id)
+    db.add(document)
+    db.commit()
+    for turn in range(40):
+        db.add(models.ChatMessage(document_id=document.id, role="user" if turn % 2 == 0 else "assistant", content=f"Turn {turn}: " + "word " * 60))
+    db.commit()
+
+    batches = []
+    async def fake_summary(previous, messages):
+        batches.append(messages)
+        return f"Summary of {len(batches)} batches."
+    monkeypatch.setattr(ai, "summarize_conversation", fake_summary)
+    monkeypatch.setattr(conversation, "CHAT_HISTORY_TOKENS", 200)
+
+    async def build():
+        async with async_sessions() as session:
+            return await conversation.build_history(session, document.id)
+
+    summary, recent = asyncio.run(build())
+
+    assert len(batches) == conversation.CHAT_FOLD_BATCHES
+    assert all(sum(chunker.estimate_tokens(msg["content"]) for msg in batch) <= 200 for batch in batches)
+    assert summary == f"Summary of {len(batches)} batches."
+    assert sum(chunker.estimate_tokens(msg["content"]) for msg in recent) <= 200
+    # The next turn carries on from the last folded message
+    first_turn = len(batches)
+    asyncio.run(build())
+    assert batches[first_turn][0]["content"] == f"Turn {sum(len(batch) for batch in batches[:first_turn])}: " + "word " * 60
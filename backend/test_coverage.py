@@ -0,0 +1,58 @@
+import asyncio
+from sqlalchemy.orm import sessionmaker
+import database
+import models
+from services import ai, coverage
+
+def test_allocate_is_proportional_and_exact():
+    assert coverage.allocate(10, [1, 1, 2]) == [3, 2, 5]
+    assert sum(coverage.allocate(7, [0.3, 5.0, 2.2, 1.0])) == 7
+    assert coverage.allocate(3, [0, 0, 0]) == [1, 1, 1]
+    assert coverage.allocate(0, [1, 2]) == [0, 0]
+
+def test_plan_sections_respects_size():
+    chunks = [("x" * 400, 1.0)] * 10
+    sections = coverage.plan_sections(chunks, max_chars=1000)
+    assert len(sections) == 5
+    assert all(weight == 2.0 for _, weight in sections)
+
+def test_generation_fans_out_over_whole_document(db, user, tmp_path, monkeypatch):
+    topics = ["mitochondria", "photosynthesis", "glycolysis", "transcription", "osmosis", "meiosis"]
+    pages = []
+    for i in range(300):
+        topic = topics[i * len(topics) // 300]
+        pages.append(f"Page {i} explains {topic} in detail with terms {topic}{i % 7}.\n" * 8)
+    path = tmp_path / "textbook.txt"
+    path.write_text("\n".join(pages), encoding="utf-8")
+    document = models.Document(filename="textbook.txt", file_path=str(path), file_type="TXT", user_id=user.id)
+    db.add(document)
+    db.commit()
+
+    calls = []
+    async def fake_generate(text, num_cards=5, exclude_topics=None, use_cache=True):
+        calls.append(num_cards)
+        await asyncio.sleep(0.05)
+        seen = [t for t in topics if t in text]
+        cards = [{"front": f"What is {seen[0]}?", "back": "..."}]
+        cards += [{"front": f"Card {len(calls)}-{i}", "back": "..."} for i in range(num_cards - 1)]
+        return cards
+    monkeypatch.setattr(ai, "generate_flashcards", fake_generate)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=db.get_bind()))
+
+    cards = asyncio.run(coverage.generate_flashcards(document, 24, exclude_topics=["What is osmosis?"]))
+
+    fronts = [card["front"] for card in cards]
+    assert len(fronts) == len(set(fronts))
+    assert "What is osmosis?" not in fronts
+    covered = {t for t in topics if f"What is {t}?" in fronts}
+    assert covered == set(topics) - {"osmosis"}
+    assert sum(calls) == 24
+
+def test_unknown_flashcard_mode_is_rejected(client, db, user):
+    document = models.Document(filename="notes.txt", file_path="notes.txt", file_type="TXT", user_id=user.id)
+    db.add(document)
+    db.commit()
+
+    response = client.post(f"/api/study/flashcards/{document.id}?mode=coverge")
+
+    assert response.status_code == 422
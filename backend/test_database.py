@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+import database
+
+def test_auto_profile_follows_backend():
+    assert database.resolve_profile("sqlite:///app.db", "auto") == "sqlite"
+    assert database.resolve_profile("postgresql://u:p@db/app", "auto") == "postgres"
+    assert database.resolve_profile("mysql://u:p@db/app", "auto") == "plain"
+    with pytest.raises(ValueError):
+        database.resolve_profile("sqlite:///app.db", "fast")
+
+def test_sqlite_profile_sets_pragmas_on_sync_and_async_connections(tmp_path):
+    path = tmp_path / "tuned.db"
+    engine = database.make_engine(f"sqlite:///{path}", "sqlite")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1 # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == database.SQLITE_BUSY_TIMEOUT_MS
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -database.SQLITE_CACHE_KB
+    engine.dispose()
+
+    async def async_pragmas():
+        async_engine = database.make_async_engine(f"sqlite+aiosqlite:///{path}", "sqlite")
+        async with async_engine.connect() as conn:
+            values = (
+                (await conn.execute(text("PRAGMA synchronous"))).scalar(),
+                (await conn.execute(text("PRAGMA mmap_size"))).scalar(),
+            )
+        await async_engine.dispose()
+        return values
+    assert asyncio.run(async_pragmas()) == (1, database.SQLITE_MMAP_BYTES)
+
+def test_plain_profile_keeps_defaults(tmp_path):
+    engine = database.make_engine(f"sqlite:///{tmp_path / 'plain.db'}", "plain")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+    engine.dispose()
+
+def test_postgres_profile_options():
+    sync = database.engine_options("postgresql://u:p@db/app", "postgres")
+    assert sync["pool_size"] == database.DB_POOL_SIZE
+    assert sync["pool_pre_ping"] is True
+    assert sync["connect_args"] == {"options": f"-c statement_timeout={database.DB_STATEMENT_TIMEOUT_MS}"}
+
+    request_path = database.engine_options("postgresql+asyncpg://u:p@db/app", "postgres")
+    assert request_path["max_overflow"] == database.DB_MAX_OVERFLOW
+    assert request_path["connect_args"]["prepared_statement_cache_size"] == database.DB_PREPARED_STATEMENT_CACHE
+    assert request_path["connect_args"]["server_settings"] == {"statement_timeout": str(database.DB_STATEMENT_TIMEOUT_MS)}
+
+def test_shutdown_releases_pooled_connections(db_path, user, monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+    from middleware import get_current_user
+
+    # The app's engines, tuned as in production, on the test database
+    async_engine = database.make_async_engine(f"sqlite+aiosqlite:///{db_path}", "sqlite")
+    engine = database.make_engine(f"sqlite:///{db_path}", "sqlite")
+    monkeypatch.setattr(database, "async_engine", async_engine)
+    monkeypatch.setattr(database, "AsyncSessionLocal", async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False))
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setitem(main.app.dependency_overrides, get_current_user, lambda: user)
+    threads_before = set(threading.enumerate())
+
+    try:
+        with TestClient(main.app) as client:
+            assert client.get("/api/documents/").status_code == 200
+            pool = async_engine.pool
+            assert pool.checkedin() == 1
+
+        assert pool.checkedin() == 0
+        # Nothing left that would keep the process from exiting
+        leftover = [t for t in threading.enumerate() if t not in threads_before and t.is_alive() and not t.daemon]
+        assert leftover == []
+    finally:
+        # Otherwise a failure here also hangs the test run on exit
+        asyncio.run(async_engine.dispose())
+        engine.dispose()
@@ -0,0 +1,65 @@
+import asyncio
+from sqlalchemy.orm import sessionmaker
+import models, schemas
+from services import ai, jobs
+
+def _run_pipeline(db, document):
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+
+    async def run():
+        await jobs.start(session_factory=session_factory, worker_count=1)
+        try:
+            job = jobs.create_job(db, document)
+            jobs.enqueue(job.id)
+            await jobs.join()
+        finally:
+            await jobs.stop()
+        return job.id
+
+    job_id = asyncio.run(run())
+    db.expire_all()
+    return db.query(models.IngestionJob).filter(models.IngestionJob.id == job_id).first()
+
+def _make_document(db, user, path):
+    document = models.Document(
+        filename=path.name,
+        file_path=str(path),
+        file_type=path.suffix.lstrip(".").upper(),
+        status="pending",
+        user_id=user.id
+    )
+    db.add(document)
+    db.commit()
+    return document
+
+def test_pipeline_marks_document_ready(db, user, tmp_path, monkeypatch):
+    async def fake_category(text):
+        return "Science"
+    monkeypatch.setattr(ai, "suggest_category", fake_category)
+    path = tmp_path / "cells.txt"
+    path.write_text("Mitochondria are the powerhouse of the cell.", encoding="utf-8")
+    document = _make_document(db, user, path)
+
+    job = _run_pipeline(db, document)
+
+    assert job.status == "succeeded"
+    assert job.started_at and job.finished_at
+    assert document.status == "ready"
+    assert document.category == "Science"
+
+    status = schemas.DocumentStatus(
+        document_id=document.id, status=document.status, category=document.category, job=job
+    )
+    assert status.job.stage == "categorize"
+
+def test_pipeline_marks_unreadable_document_failed(db, user, tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_text("", encoding="utf-8")
+    document = _make_document(db, user, path)
+
+    job = _run_pipeline(db, document)
+
+    assert job.status == "failed"
+    assert job.stage == "extract"
+    assert job.error == "Could not extract text from document"
+    assert document.status == "failed"
@@ -0,0 +1,74 @@
+import json
+import httpx
+import models
+from services import ai, json_stream, metrics
+
+def test_objects_are_emitted_as_they_close():
+    parser = json_stream.JSONArrayStream()
+    text = '```json\n[{"front": "What is {x}?", "back": "A \\"set\\" ]"}, {"front": "Q2", "back": "A2"}]\n```'
+    emitted = []
+    for i in range(0, len(text), 7):
+        emitted.append(parser.feed(text[i:i + 7]))
+
+    objects = [obj for batch in emitted for obj in batch]
+    assert objects == [{"front": "What is {x}?", "back": 'A "set" ]'}, {"front": "Q2", "back": "A2"}]
+    # Each card arrives with the chunk that closes it, not at the end
+    batches = [i for i, batch in enumerate(emitted) if batch]
+    assert len(batches) == 2 and batches[0] < batches[1]
+    assert not parser.truncated
+
+def test_truncated_output_is_salvaged():
+    content = '[{"front": "Q1", "back": "A1"}, {"front": "Q2", "back": "A2"}, {"front": "Q3", "ba'
+    assert ai._parse_json_response(content) == [{"front": "Q1", "back": "A1"}, {"front": "Q2", "back": "A2"}]
+
+    parser = json_stream.JSONArrayStream()
+    parser.feed(content)
+    assert parser.truncated
+
+def _ollama_stream(text: str):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        pieces = [text[i:i + 5] for i in range(0, len(text), 5)]
+        lines = [json.dumps({"response": piece, "done": False}) for piece in pieces]
+        lines.append(json.dumps({"response": "", "done": True}))
+        return httpx.Response(200, content="\n".join(lines).encode())
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+def test_stream_flashcards_validates_and_saves_each_card(client, db, user, tmp_path, monkeypatch):
+    path = tmp_path / "chem.txt"
+    path.write_text("Catalysts speed up reactions.\n", encoding="utf-8")
+    document = models.Document(filename="chem.txt", file_path=str(path), file_type="TXT", user_id=user.id)
+    db.add(document)
+    db.commit()
+
+    output = (
+        '[{"front": "What is a catalyst?", "back": "A substance that speeds up a reaction"},'
+        ' {"front": "", "back": "missing front"},'
+        ' {"front": "Is it consumed?", "back": "No"},'
+        ' {"front": "Activation energy?", "ba'
+    )
+    monkeypatch.setattr(ai, "AI_PROVIDER", "ollama")
+    monkeypatch.setattr(ai, "http_client", _ollama_stream(output))
+
+    response = client.post(f"/api/study/flashcards/{document.id}/stream?num_cards=4")
+
+    assert response.status_code == 200
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    cards = [data for name, data in events if name == "flashcard"]
+    assert [card["front"] for card in cards] == ["What is a catalyst?", "Is it consumed?"]
+    assert events[-1] == ("done", {"count": 2, "truncated": True, "invalid": 1})
+
+    saved = db.query(models.Flashcard).order_by(models.Flashcard.id).all()
+    assert [card.id for card in saved] == [card["id"] for card in cards]
+
+def test_invalid_item_counts_once():
+    metrics.reset()
+    wrapped = {"questions": [{"question": "2 + 2?", "options": ["3", "4"], "correct_answer": "4"}]}
+    assert [q["question"] for q in ai._validated("quiz", wrapped, ai._valid_question)] == ["2 + 2?"]
+
+    # The answer is not among the options; its options are not items of their own
+    bad = {"question": "Capital of France?", "options": ["Lyon", "Nice", "Lille"], "correct_answer": "Paris"}
+    assert ai._validated("quiz", bad, ai._valid_question) == []
+    assert metrics.snapshot()["counters"]["generation.quiz.invalid"] == 1
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import httpx
+from sqlalchemy.orm import sessionmaker
+import database
+from services import ai, llm_cache, metrics
+
+def _counting_ollama(calls):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content)["prompt"])
+        return httpx.Response(200, json={"response": json.dumps([{"front": "Q", "back": "A"}])})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+def test_identical_generations_hit_the_cache(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ai, "AI_PROVIDER", "ollama")
+    monkeypatch.setattr(ai, "http_client", _counting_ollama(calls))
+    metrics.reset()
+
+    async def run():
+        first = await ai.generate_flashcards("Enzymes lower activation energy.", num_cards=1)
+        second = await ai.generate_flashcards("Enzymes lower activation energy.", num_cards=1)
+        uncached = await ai.generate_flashcards("Enzymes lower activation energy.", num_cards=1, use_cache=False)
+        different = await ai.generate_flashcards("Enzymes lower activation energy.", num_cards=2)
+        return first, second, uncached, different
+
+    first, second, uncached, different = asyncio.run(run())
+
+    assert first == second == uncached == different == [{"front": "Q", "back": "A"}]
+    assert len(calls) == 3
+    counters = metrics.snapshot()["counters"]
+    assert counters["llm_cache.flashcards.hit"] == 1
+    assert counters["llm_cache.flashcards.miss"] == 2
+    assert counters["llm_cache.flashcards.bypass"] == 1
+
+def test_empty_results_are_not_cached():
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        return []
+
+    async def run():
+        await llm_cache.cached("quiz", "k", failing)
+        await llm_cache.cached("quiz", "k", failing)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+def test_lru_size_ttl_and_endpoint_opt_out(monkeypatch):
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_SIZE", 2)
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_DISABLED", {"quiz"})
+
+    async def run():
+        for key in ("a", "b", "c"):
+            await llm_cache.put("category", key, key.upper())
+        evicted = await llm_cache.get("category", "a")
+        kept = await llm_cache.get("category", "c")
+
+        monkeypatch.setattr(llm_cache, "LLM_CACHE_TTL", -1)
+        await llm_cache.put("category", "stale", "Old")
+        expired = await llm_cache.get("category", "stale")
+
+        calls = []
+        async def call():
+            calls.append(1)
+            return ["question"]
+        await llm_cache.cached("quiz", "q", call)
+        await llm_cache.cached("quiz", "q", call)
+        return evicted, kept, expired, len(calls)
+
+    evicted, kept, expired, quiz_calls = asyncio.run(run())
+    assert evicted is None
+    assert kept == "C"
+    assert expired is None
+    assert quiz_calls == 2
+
+def test_db_tier_survives_process_cache(db, monkeypatch):
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_DB", True)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=db.get_bind()))
+
+    async def run():
+        await llm_cache.put("category", "key", "History")
+        llm_cache.clear()
+        return await llm_cache.get("category", "key")
+
+    assert asyncio.run(run()) == "History"
+    assert llm_cache.size() == 1
@@ -0,0 +1,134 @@
+import datetime
+import os
+import pytest
+from sqlalchemy import create_engine, func, inspect, select, text
+from sqlalchemy.orm import Session
+import database
+import migrations
+import models
+
+HOT_PATH_INDEXES = {
+    "flashcards": "ix_flashcards_document_id_next_review",
+    "chat_messages": "ix_chat_messages_document_id_timestamp",
+    "study_sessions": "ix_study_sessions_document_id_start_time",
+    "documents": "ix_documents_user_id_id",
+    "sessions": "ix_sessions_expires_at",
+}
+
+def _index_names(engine, table):
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+def test_upgrade_applies_each_migration_once(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+
+    assert migrations.upgrade(engine) == [version for version, _, _ in migrations.discover()]
+    assert migrations.upgrade(engine) == []
+    for table, index in HOT_PATH_INDEXES.items():
+        assert index in _index_names(engine, table)
+    engine.dispose()
+
+# The schema main.py's create_all produced before migrations existed
+ORIGINAL_SCHEMA = [
+    "CREATE TABLE users (id INTEGER NOT NULL, username VARCHAR NOT NULL, created_at DATETIME, PRIMARY KEY (id))",
+    "CREATE UNIQUE INDEX ix_users_username ON users (username)",
+    "CREATE TABLE sessions (id INTEGER NOT NULL, user_id INTEGER NOT NULL, token VARCHAR NOT NULL, created_at DATETIME, "
+    "expires_at DATETIME NOT NULL, PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id))",
+    "CREATE UNIQUE INDEX ix_sessions_token ON sessions (token)",
+    "CREATE TABLE documents (id INTEGER NOT NULL, user_id INTEGER NOT NULL, filename VARCHAR, file_path VARCHAR, file_type VARCHAR, "
+    "upload_date DATETIME, category VARCHAR, summary VARCHAR, PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id))",
+    "CREATE INDEX ix_documents_filename ON documents (filename)",
+    "CREATE TABLE chat_messages (id INTEGER NOT NULL, document_id INTEGER, role VARCHAR, content VARCHAR, timestamp DATETIME, "
+    "PRIMARY KEY (id), FOREIGN KEY(document_id) REFERENCES documents (id))",
+    "CREATE TABLE study_sessions (id INTEGER NOT NULL, document_id INTEGER, activity_type VARCHAR, start_time DATETIME, "
+    "end_time DATETIME, duration_seconds INTEGER, PRIMARY KEY (id), FOREIGN KEY(document_id) REFERENCES documents (id))",
+    "CREATE TABLE flashcards (id INTEGER NOT NULL, document_id INTEGER, front VARCHAR, back VARCHAR, next_review DATETIME, "
+    "interval INTEGER, ease_factor FLOAT, repetitions INTEGER, PRIMARY KEY (id), FOREIGN KEY(document_id) REFERENCES documents (id))",
+]
+
+def test_upgrade_brings_original_schema_up_to_date(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'original.db'}")
+    with engine.begin() as conn:
+        for statement in ORIGINAL_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO users (id, username) VALUES (1, 'old')"))
+        conn.execute(text("INSERT INTO documents (id, user_id, filename) VALUES (1, 1, 'notes.pdf')"))
+
+    migrations.upgrade(engine)
+
+    for table, index in HOT_PATH_INDEXES.items():
+        assert index in _index_names(engine, table)
+    assert "ix_documents_content_hash" in _index_names(engine, "documents")
+    # Every mapped column exists, so ORM queries work on the upgraded database
+    for table in database.Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspect(engine).get_columns(table.name)}
+        assert set(table.columns.keys()) <= existing, table.name
+    with Session(engine) as db:
+        document = db.get(models.Document, 1)
+        assert (document.status, document.content_hash) == ("ready", None)
+    engine.dispose()
+
+# The request-path queries, as written in api/study_tools.py, api/chat.py and services/study_rollup.py
+def _due_cards():
+    return select(models.Flashcard).join(models.Document).where(
+        models.Flashcard.next_review <= datetime.datetime(2024, 1, 1),
+        models.Document.user_id == 1
+    )
+
+def _chat_history():
+    return select(models.ChatMessage).where(
+        models.ChatMessage.document_id == 1
+    ).order_by(models.ChatMessage.timestamp.asc())
+
+def _study_days():
+    return select(models.StudyDay).where(
+        models.StudyDay.user_id == 1,
+        models.StudyDay.tz_offset == 300
+    ).order_by(models.StudyDay.local_date.desc())
+
+def _study_history():
+    # Rollup backfill in services/study_rollup.py
+    return select(models.StudySession.start_time, models.StudySession.duration_seconds).join(models.Document).where(
+        models.Document.user_id == 1
+    )
+
+HOT_QUERIES = [
+    (_due_cards, ["ix_flashcards_document_id_next_review", "ix_documents_user_id_id"]),
+    (_chat_history, ["ix_chat_messages_document_id_timestamp"]),
+    (_study_days, ["ix_study_days_user_offset_date"]),
+    (_study_history, ["ix_study_sessions_document_id_start_time", "ix_documents_user_id_id"]),
+]
+
+def _plan(conn, stmt) -> str:
+    compiled = stmt.compile(dialect=conn.dialect)
+    if conn.dialect.name == "sqlite":
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        return "\n".join(row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params))
+    return "\n".join(row[0] for row in conn.exec_driver_sql("EXPLAIN " + str(compiled), compiled.params))
+
+@pytest.mark.parametrize("query, indexes", HOT_QUERIES, ids=lambda q: getattr(q, "__name__", ""))
+def test_hot_queries_use_indexes_on_sqlite(db, query, indexes):
+    plan = _plan(db.connection(), query())
+
+    for index in indexes:
+        assert index in plan, plan
+    assert "TEMP B-TREE" not in plan, plan
+
+@pytest.fixture(scope="module")
+def postgres():
+    url = os.getenv("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL not set")
+    engine = create_engine(url)
+    migrations.upgrade(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.mark.parametrize("query, indexes", HOT_QUERIES, ids=lambda q: getattr(q, "__name__", ""))
+def test_hot_queries_use_indexes_on_postgres(postgres, query, indexes):
+    with postgres.begin() as conn:
+        # Small test tables would otherwise be scanned whatever the indexes
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = _plan(conn, query())
+
+    for index in indexes:
+        assert index in plan, plan
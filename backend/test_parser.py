@@ -0,0 +1,45 @@
+from benchmarks.synthetic import write_pdf
+from services import parser
+
+def test_page_ranges_cover_every_page_once():
+    ranges = parser._page_ranges(10, 4)
+    assert ranges == [(0, 3), (3, 6), (6, 8), (8, 10)]
+    assert parser._page_ranges(2, 8) == [(0, 1), (1, 2)]
+
+def test_parallel_pdf_matches_serial(tmp_path, monkeypatch):
+    path = str(tmp_path / "lecture.pdf")
+    write_pdf(path, pages=12, lines_per_page=5)
+
+    monkeypatch.setattr(parser, "PARALLEL_PDF_MIN_PAGES", 10**9)
+    serial = parser.extract_text(path, "PDF")
+
+    monkeypatch.setattr(parser, "PARALLEL_PDF_MIN_PAGES", 1)
+    monkeypatch.setattr(parser, "PDF_WORKERS", 2)
+    parallel = parser.extract_text(path, "PDF")
+
+    assert serial.startswith("Page 1\n")
+    assert "Page 12\n" in serial
+    assert parallel == serial
+
+def test_iter_txt_streams_line_aligned_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(parser, "TXT_CHUNK_CHARS", 16)
+    content = "".join(f"line {i} of the notes\n" for i in range(50)) + "no trailing newline"
+    path = tmp_path / "notes.txt"
+    path.write_text(content, encoding="utf-8")
+
+    segments = list(parser.iter_text(str(path), "TXT"))
+
+    assert "".join(segment.text for segment in segments) == content
+    assert [segment.index for segment in segments] == list(range(len(segments)))
+    assert all(segment.kind == "chunk" for segment in segments)
+    assert all(segment.text.endswith("\n") for segment in segments[:-1])
+    assert max(len(segment.text) for segment in segments) <= 3 * parser.TXT_CHUNK_CHARS
+
+def test_iter_pdf_yields_pages_matching_extract_text(tmp_path):
+    path = str(tmp_path / "lecture.pdf")
+    write_pdf(path, pages=3, lines_per_page=2)
+
+    segments = list(parser.iter_text(path, "PDF"))
+
+    assert [(segment.kind, segment.index) for segment in segments] == [("page", 0), ("page", 1), ("page", 2)]
+    assert "".join(segment.text for segment in segments) == parser.extract_text(path, "PDF")
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import sys
+import pytest
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import models
+from services import ai, metrics
+
+def _stub_app(requests):
+    """
+    Minimal stand-in for the Anthropic messages API that models prompt caching:
+    a cache_control'd system prompt seen before is reported as a cache read,
+    otherwise as a cache write.
+    """
+    app = FastAPI()
+    cached = set()
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        payload = await request.json()
+        requests.append(payload)
+        prefix = "".join(block["text"] for block in payload["system"] if block.get("cache_control"))
+        prefix_tokens = len(prefix) // 4
+        usage = {
+            "input_tokens": 12,
+            "output_tokens": 3,
+            "cache_read_input_tokens": prefix_tokens if prefix in cached else 0,
+            "cache_creation_input_tokens": 0 if prefix in cached else prefix_tokens
+        }
+        cached.add(prefix)
+        message = {
+            "id": "msg_stub", "type": "message", "role": "assistant", "model": payload["model"],
+            "content": [{"type": "text", "text": "Stub reply."}],
+            "stop_reason": "end_turn", "stop_sequence": None, "usage": usage
+        }
+        if not payload.get("stream"):
+            return JSONResponse(message)
+
+        def event(name, data):
+            return f"event: {name}\ndata: {json.dumps(dict(type=name, **data))}\n\n"
+
+        async def body():
+            yield event("message_start", {"message": dict(message, content=[], stop_reason=None)})
+            yield event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+            for text in ["Stub ", "reply."]:
+                yield event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": text}})
+            yield event("content_block_stop", {"index": 0})
+            yield event("message_delta", {"delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": 3}})
+            yield event("message_stop", {})
+        return StreamingResponse(body(), media_type="text/event-stream")
+
+    return app
+
+@pytest.fixture
+def anthropic_stub(monkeypatch):
+    requests = []
+    # Serve the stub in-process through whichever httpx flavour the SDK is built on
+    httpx_module = sys.modules[DefaultAsyncHttpxClient.__mro__[1].__module__.split(".")[0]]
+    transport = httpx_module.ASGITransport(app=_stub_app(requests))
+
+    monkeypatch.setattr(ai, "AI_PROVIDER", "anthropic")
+    monkeypatch.setattr(ai, "anthropic_client", AsyncAnthropic(
+        api_key="test",
+        base_url="http://anthropic.stub",
+        http_client=DefaultAsyncHttpxClient(transport=transport)
+    ))
+    metrics.reset()
+    yield requests
+
+def test_overview_is_cached_across_turns(anthropic_stub):
+    overview = "[Page 1]\n" + "Photosynthesis converts light into chemical energy. " * 40
+    first, second = {}, {}
+
+    async def run():
+        await ai.generate_chat_response(
+            [{"role": "user", "content": "What is photosynthesis?"}],
+            "[Page 7]\nChlorophyll absorbs red and blue light.", overview, first
+        )
+        await ai.generate_chat_response(
+            [
+                {"role": "user", "content": "What is photosynthesis?"},
+                {"role": "assistant", "content": "Stub reply."},
+                {"role": "user", "content": "Where does it happen?"}
+            ],
+            "[Page 9]\nIt takes place in the chloroplasts.", overview, second
+        )
+        await ai.shutdown()
+
+    asyncio.run(run())
+
+    request = anthropic_stub[1]
+    # Instructions + overview form one cacheable system block
+    assert request["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert "Photosynthesis converts light" in request["system"][0]["text"]
+    assert "chloroplasts" not in request["system"][0]["text"]
+    # History before the current question is a second breakpoint
+    assert request["messages"][1]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    # This turn's passages ride along with the question
+    assert "chloroplasts" in request["messages"][-1]["content"]
+    assert request["messages"][-1]["content"].endswith("Question: Where does it happen?")
+
+    assert first["cache_creation_input_tokens"] > 0 and first["cache_read_input_tokens"] == 0
+    assert second["cache_read_input_tokens"] == first["cache_creation_input_tokens"]
+    counters = metrics.snapshot()["counters"]
+    assert counters["llm.chat.requests"] == 2
+    assert counters["llm.chat.cache_hits"] == 1
+
+def test_stream_done_event_reports_cache_usage(anthropic_stub, client, db, user, tmp_path):
+    path = tmp_path / "bio.txt"
+    path.write_text("Mitochondria produce ATP.\n", encoding="utf-8")
+    document = models.Document(filename="bio.txt", file_path=str(path), file_type="TXT", user_id=user.id)
+    db.add(document)
+    db.commit()
+
+    response = client.post(f"/api/chat/stream/{document.id}", json={"role": "user", "content": "What do mitochondria do?"})
+
+    done = json.loads(response.text.strip().split("\n\n")[-1].split("data: ", 1)[1])
+    assert done["message"]["content"] == "Stub reply."
+    assert done["usage"]["cache_creation_input_tokens"] > 0
+    assert "Mitochondria produce ATP." in anthropic_stub[0]["system"][0]["text"]
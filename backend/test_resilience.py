@@ -0,0 +1,108 @@
+import asyncio
+import json
+import time
+import httpx
+from services import ai, metrics, resilience
+
+class _DownAnthropic:
+    """Anthropic client whose every call fails to connect."""
+    def __init__(self):
+        self.calls = 0
+        self.messages = self
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        raise httpx.ConnectError("connection refused")
+
+def _ollama(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+async def _echo(request: httpx.Request) -> httpx.Response:
+    question = json.loads(request.content)["messages"][-1]["content"].rsplit("Question: ", 1)[-1]
+    return httpx.Response(200, json={"message": {"role": "assistant", "content": f"ollama: {question}"}})
+
+def test_transient_errors_are_retried(monkeypatch):
+    attempts = []
+
+    async def flaky(request: httpx.Request) -> httpx.Response:
+        attempts.append(request)
+        if len(attempts) < 3:
+            return httpx.Response(503, json={"error": "loading model"})
+        return await _echo(request)
+
+    monkeypatch.setattr(ai, "AI_PROVIDER", "ollama")
+    monkeypatch.setattr(ai, "http_client", _ollama(flaky))
+    monkeypatch.setattr(resilience, "LLM_RETRY_BASE_DELAY", 0.01)
+
+    reply = asyncio.run(ai.generate_chat_response([{"role": "user", "content": "hi"}], "context"))
+
+    assert reply == "ollama: hi"
+    assert len(attempts) == 3
+    assert resilience.breaker("ollama").state == "closed"
+
+def test_hung_provider_hits_the_deadline(monkeypatch):
+    async def hung(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(5)
+        return await _echo(request)
+
+    monkeypatch.setattr(ai, "AI_PROVIDER", "ollama")
+    monkeypatch.setattr(ai, "http_client", _ollama(hung))
+    monkeypatch.setitem(resilience.DEADLINES, "chat", 0.2)
+    metrics.reset()
+
+    start = time.perf_counter()
+    reply = asyncio.run(ai.generate_chat_response([{"role": "user", "content": "hi"}], "context"))
+
+    assert time.perf_counter() - start < 1.0
+    assert reply == "I encountered an error while processing your request."
+    assert metrics.snapshot()["counters"]["llm.ollama.timeouts"] == 1
+
+def test_breaker_opens_and_fails_over(client, monkeypatch):
+    down = _DownAnthropic()
+    monkeypatch.setattr(ai, "AI_PROVIDER", "anthropic")
+    monkeypatch.setattr(ai, "LLM_FALLBACK_PROVIDER", "ollama")
+    monkeypatch.setattr(ai, "anthropic_client", down)
+    monkeypatch.setattr(ai, "http_client", _ollama(_echo))
+    monkeypatch.setattr(resilience, "LLM_RETRIES", 1)
+    monkeypatch.setattr(resilience, "LLM_RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(resilience, "LLM_BREAKER_FAILURES", 2)
+    metrics.reset()
+
+    async def run():
+        return [
+            await ai.generate_chat_response([{"role": "user", "content": f"q{i}"}], "context")
+            for i in range(3)
+        ]
+
+    assert asyncio.run(run()) == ["ollama: q0", "ollama: q1", "ollama: q2"]
+    # Two requests with one retry each; the third skipped Anthropic entirely
+    assert down.calls == 4
+    counters = metrics.snapshot()["counters"]
+    assert counters["llm.anthropic.short_circuited"] == 1
+    assert counters["llm.chat.failover"] == 3
+
+    health = client.get("/health").json()
+    assert health["status"] == "healthy"
+    assert health["providers"]["anthropic"]["state"] == "open"
+    assert health["providers"]["ollama"]["state"] == "closed"
+
+def test_fallback_answers_are_not_cached(monkeypatch):
+    down = _DownAnthropic()
+    answers = []
+
+    async def category(request: httpx.Request) -> httpx.Response:
+        answers.append(request)
+        return httpx.Response(200, json={"response": "History"})
+
+    monkeypatch.setattr(ai, "AI_PROVIDER", "anthropic")
+    monkeypatch.setattr(ai, "LLM_FALLBACK_PROVIDER", "ollama")
+    monkeypatch.setattr(ai, "anthropic_client", down)
+    monkeypatch.setattr(ai, "http_client", _ollama(category))
+    monkeypatch.setattr(resilience, "LLM_RETRIES", 0)
+
+    async def run():
+        return [await ai.suggest_category("The Roman Empire") for _ in range(2)]
+
+    assert asyncio.run(run()) == ["History", "History"]
+    # Keyed as an Anthropic answer, so the Ollama one is asked for again
+    assert len(answers) == 2
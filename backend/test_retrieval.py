@@ -0,0 +1,63 @@
+import asyncio
+import models
+from services import ai, retrieval
+
+def test_bm25_ranks_matching_chunk_first():
+    index = retrieval.BM25Index.build([
+        (0, "The French Revolution began in 1789 with the storming of the Bastille."),
+        (1, "Photosynthesis takes place in the chloroplasts of plant cells."),
+        (2, "Plant cells also contain a large central vacuole and a cell wall."),
+    ])
+
+    results = index.search("Where does photosynthesis happen in plant cells?", k=2)
+
+    assert [ordinal for ordinal, _ in results] == [1, 2]
+    assert index.search("quantum chromodynamics", k=3) == []
+
+    restored = retrieval.BM25Index.from_json(index.to_json())
+    assert restored.search("bastille", k=1) == index.search("bastille", k=1)
+
+def test_select_context_finds_late_pages_within_budget(db, user, tmp_path):
+    pages = [f"Page {i} discusses routine filler material about study habits.\n" * 20 for i in range(200)]
+    pages[173] = "The Treaty of Westphalia was signed in 1648, ending the Thirty Years War.\n" * 3
+    path = tmp_path / "history.txt"
+    path.write_text("\n".join(pages), encoding="utf-8")
+    document = models.Document(filename="history.txt", file_path=str(path), file_type="TXT", user_id=user.id)
+    db.add(document)
+    db.commit()
+
+    context = retrieval.select_context(db, document, "When was the treaty of Westphalia signed?", budget_chars=2000)
+
+    assert "Treaty of Westphalia" in context
+    assert len(context) <= 2000 + 100
+    assert context.startswith("[Section ")
+    assert db.query(models.SearchIndex).count() == 1
+
+def test_chat_builds_a_missing_index_off_the_event_loop(client, db, user, tmp_path, monkeypatch):
+    path = tmp_path / "notes.txt"
+    path.write_text("The treaty of Westphalia was signed in 1648.\n" * 50, encoding="utf-8")
+    # Uploaded before retrieval existed: no chunks or index yet
+    document = models.Document(filename="notes.txt", file_path=str(path), file_type="TXT", user_id=user.id)
+    db.add(document)
+    db.commit()
+
+    loops = []
+    original = retrieval.build_index
+    def recording_build(db, document):
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)
+        return original(db, document)
+    monkeypatch.setattr(retrieval, "build_index", recording_build)
+    contexts = []
+    async def fake_chat(messages, context_text, overview_text="", usage=None, summary_text=""):
+        contexts.append(overview_text + context_text)
+        return "1648."
+    monkeypatch.setattr(ai, "generate_chat_response", fake_chat)
+
+    response = client.post(f"/api/chat/send/{document.id}", json={"role": "user", "content": "When was Westphalia signed?"})
+
+    assert response.status_code == 200
+    assert loops == [None]
+    assert "1648" in contexts[0]
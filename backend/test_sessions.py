@@ -0,0 +1,50 @@
+import datetime
+import os
+import pytest
+from sqlalchemy import text
+import models
+from services import metrics, sessions
+
+# Rows seeded for the sweep test, several batches' worth
+EXPIRED_ROWS = int(os.getenv("SESSION_SWEEP_TEST_ROWS", "5000"))
+# Set (e.g. to 1000000) to also check that batching holds up at scale; slow
+LARGE_EXPIRED_ROWS = int(os.getenv("SESSION_SWEEP_LARGE_ROWS", "0"))
+
+def _seed_and_sweep(db, user, rows: int, batch_size: int):
+    now = datetime.datetime.utcnow()
+    # Generated inside SQLite: inserting millions of ORM objects would take minutes
+    db.execute(text("""
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :rows)
+        INSERT INTO sessions (user_id, token, created_at, expires_at)
+        SELECT :user_id, 'expired-' || i, :created, :expired FROM n
+    """), {
+        "rows": rows,
+        "user_id": user.id,
+        "created": now - datetime.timedelta(days=30),
+        "expired": now - datetime.timedelta(days=1),
+    })
+    db.add(models.Session(user_id=user.id, token="live", expires_at=now + datetime.timedelta(days=1)))
+    db.commit()
+    metrics.reset()
+
+    deleted = sessions.sweep_expired(db, now=now, batch_size=batch_size)
+
+    assert deleted == rows
+    assert [s.token for s in db.query(models.Session).all()] == ["live"]
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["sessions.swept"] == rows
+    assert snapshot["gauges"]["sessions.rows"] == 1
+    assert snapshot["timings"]["sessions.sweep_ms"]["count"] == 1
+
+def test_sweep_deletes_expired_sessions_in_batches(db, user):
+    _seed_and_sweep(db, user, EXPIRED_ROWS, batch_size=1000)
+
+@pytest.mark.skipif(not LARGE_EXPIRED_ROWS, reason="SESSION_SWEEP_LARGE_ROWS not set")
+def test_sweep_at_scale(db, user):
+    _seed_and_sweep(db, user, LARGE_EXPIRED_ROWS, batch_size=50000)
+
+def test_expiry_lookup_uses_index(db):
+    plan = db.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM sessions WHERE expires_at < '2024-01-01' LIMIT 10"
+    )).fetchall()
+    assert any("ix_sessions_expires_at" in row[-1] for row in plan)
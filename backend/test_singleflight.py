@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+import models
+from services import ai, metrics
+from services.singleflight import SingleFlight
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight("test")
+    calls = []
+    metrics.reset()
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value * 2
+
+    async def run():
+        same = await asyncio.gather(*[flights.do("a", lambda: work(1)) for _ in range(5)])
+        other = await flights.do("b", lambda: work(2))
+        again = await flights.do("a", lambda: work(3)) # Not in flight any more
+        return same, other, again
+
+    same, other, again = asyncio.run(run())
+
+    assert same == [2] * 5
+    assert (other, again) == (4, 6)
+    assert calls == [1, 2, 3]
+    assert flights.inflight() == 0
+    counters = metrics.snapshot()["counters"]
+    assert counters["singleflight.test.leader"] == 3
+    assert counters["singleflight.test.coalesced"] == 4
+
+def test_errors_reach_every_caller_and_cancelling_one_does_not_stop_others():
+    flights = SingleFlight("test")
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("provider down")
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        results = await asyncio.gather(
+            flights.do("x", failing), flights.do("x", failing), return_exceptions=True
+        )
+        leader = asyncio.ensure_future(flights.do("y", slow))
+        follower = asyncio.ensure_future(flights.do("y", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return results, await follower
+
+    results, follower_result = asyncio.run(run())
+
+    assert all(isinstance(r, ValueError) for r in results)
+    assert follower_result == "done"
+
+def test_double_clicked_quiz_makes_one_provider_call(client, db, async_sessions, user, tmp_path, monkeypatch):
+    path = tmp_path / "econ.txt"
+    path.write_text("Inflation is a general rise in prices.\n", encoding="utf-8")
+    document = models.Document(filename="econ.txt", file_path=str(path), file_type="TXT", user_id=user.id)
+    db.add(document)
+    db.commit()
+
+    calls = []
+    async def fake_quiz(text, num_questions=5, use_cache=True):
+        calls.append(text)
+        await asyncio.sleep(0.1)
+        return [{"question": "What is inflation?", "options": ["A", "B", "C", "D"], "correct_answer": "A"}]
+    monkeypatch.setattr(ai, "generate_quiz", fake_quiz)
+
+    from api import study_tools
+    async def click():
+        async with async_sessions() as session:
+            return await study_tools.create_quiz(document.id, db=session, current_user=user)
+    async def run():
+        return await asyncio.gather(click(), click())
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert len(calls) == 1
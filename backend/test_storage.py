@@ -0,0 +1,114 @@
+import io
+import os
+import models
+from services import storage
+
+def _delete(db, document):
+    storage.release(db, document)
+    db.delete(document)
+    db.commit()
+    storage.collect(db, document.content_hash, document.file_path)
+
+def _upload(db, user, data, monkeypatch, tmp_path):
+    monkeypatch.setattr(storage, "UPLOAD_DIR", str(tmp_path))
+    content_hash, staged_path, size = storage.save_stream(io.BytesIO(data))
+    stored = storage.acquire(db, content_hash, staged_path, size)
+    document = models.Document(
+        filename="lecture1.txt",
+        file_path=stored.file_path,
+        file_type="TXT",
+        content_hash=content_hash,
+        user_id=user.id
+    )
+    db.add(document)
+    db.commit()
+    return document
+
+def test_identical_uploads_share_one_file(db, user, monkeypatch, tmp_path):
+    data = b"Lecture 1: supply and demand.\n" * 100000
+
+    first = _upload(db, user, data, monkeypatch, tmp_path)
+    second = _upload(db, user, data, monkeypatch, tmp_path)
+
+    assert first.file_path == second.file_path
+    assert open(first.file_path, "rb").read() == data
+    stored = db.query(models.StoredFile).one()
+    assert stored.ref_count == 2
+    assert stored.size_bytes == len(data)
+    assert os.listdir(tmp_path / "tmp") == []
+
+    _delete(db, first)
+    assert os.path.exists(second.file_path)
+
+    _delete(db, second)
+    assert not os.path.exists(second.file_path)
+    assert db.query(models.StoredFile).count() == 0
+
+def test_different_bytes_get_different_files(db, user, monkeypatch, tmp_path):
+    first = _upload(db, user, b"chapter one", monkeypatch, tmp_path)
+    second = _upload(db, user, b"chapter two", monkeypatch, tmp_path)
+
+    assert first.file_path != second.file_path
+    assert os.path.basename(first.file_path) == first.content_hash
+
+def test_same_bytes_with_another_extension_share_the_file(db, user, monkeypatch, tmp_path):
+    first = _upload(db, user, b"chapter one", monkeypatch, tmp_path)
+    content_hash, staged_path, size = storage.save_stream(io.BytesIO(b"chapter one"))
+    stored = storage.acquire(db, content_hash, staged_path, size)
+    db.add(models.Document(filename="lecture1.md", file_path=stored.file_path, file_type="MD", content_hash=content_hash, user_id=user.id))
+    db.commit()
+
+    assert stored.file_path == first.file_path
+    assert stored.ref_count == 2
+    assert os.listdir(os.path.dirname(first.file_path)) == [first.content_hash]
+
+def test_rolled_back_delete_keeps_the_file(db, user, monkeypatch, tmp_path):
+    document = _upload(db, user, b"chapter one", monkeypatch, tmp_path)
+
+    storage.release(db, document)
+    db.delete(document)
+    db.rollback()
+
+    assert os.path.exists(document.file_path)
+    assert db.query(models.StoredFile).one().ref_count == 1
+    # Collecting a file that is still referenced does nothing
+    storage.collect(db, document.content_hash, document.file_path)
+    assert os.path.exists(document.file_path)
+
+def test_upload_after_release_keeps_the_file(db, user, monkeypatch, tmp_path):
+    first = _upload(db, user, b"chapter one", monkeypatch, tmp_path)
+    storage.release(db, first)
+    db.delete(first)
+    db.commit()
+
+    # The same bytes arrive before the deleting request collects the file
+    second = _upload(db, user, b"chapter one", monkeypatch, tmp_path)
+    storage.collect(db, first.content_hash, first.file_path)
+
+    assert open(second.file_path, "rb").read() == b"chapter one"
+    assert db.query(models.StoredFile).one().ref_count == 1
+
+def test_same_bytes_from_another_user_keep_their_own_category(client, db, user, monkeypatch, tmp_path):
+    from services import jobs
+    other = models.User(username="other")
+    db.add(other)
+    db.commit()
+    earlier = _upload(db, other, b"chapter one", monkeypatch, tmp_path)
+    earlier.category, earlier.summary, earlier.status = "Corrected by other", "A chapter.", "ready"
+    db.commit()
+    queued = []
+    monkeypatch.setattr(jobs, "enqueue", queued.append)
+
+    response = client.post("/api/documents/upload", files={"file": ("mine.txt", b"chapter one", "text/plain")})
+
+    assert response.status_code == 200
+    document = response.json()
+    assert document["category"] != "Corrected by other"
+    assert document["summary"] == "A chapter."
+    # Categorized by this user's own classifier in the background
+    assert document["status"] == "pending"
+    assert len(queued) == 1
+
+    # The first copy is still pending, so it is not yet reused
+    again = client.post("/api/documents/upload", files={"file": ("again.txt", b"chapter one", "text/plain")})
+    assert again.json()["status"] == "pending" and len(queued) == 2
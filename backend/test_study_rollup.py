@@ -0,0 +1,107 @@
+import asyncio
+import datetime
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import models
+from services import metrics, study_rollup
+
+OFFSET = 300 # UTC-5, as the browser reports it
+
+@pytest.fixture
+def document(db, user):
+    document = models.Document(filename="bio.txt", file_path="bio.txt", file_type="TXT", user_id=user.id)
+    db.add(document)
+    db.commit()
+    return document
+
+def _local_noon_utc(days_ago: int) -> datetime.datetime:
+    today = (datetime.datetime.utcnow() - datetime.timedelta(minutes=OFFSET)).date()
+    local_noon = datetime.datetime.combine(today - datetime.timedelta(days=days_ago), datetime.time(12))
+    return local_noon + datetime.timedelta(minutes=OFFSET)
+
+def _stats(client, offset=OFFSET):
+    response = client.get(f"/api/analytics/stats?timezone_offset={offset}")
+    assert response.status_code == 200
+    return response.json()
+
+@pytest.fixture
+def history(db, document):
+    for days_ago, activity in [(0, "flashcards"), (1, "flashcards"), (2, "quiz"), (4, "flashcards")]:
+        start = _local_noon_utc(days_ago)
+        db.add(models.StudySession(
+            document_id=document.id, activity_type=activity, start_time=start,
+            end_time=start + datetime.timedelta(minutes=10), duration_seconds=600
+        ))
+    db.commit()
+
+def test_stats_are_served_from_rollups_after_first_request(client, history):
+    metrics.reset()
+    first = _stats(client)
+    assert first["total_minutes"] == 40
+    assert first["activity_breakdown"] == {"flashcards": 3, "quiz": 1}
+    assert first["current_streak"] == 3
+    seeded = {(_local_noon_utc(0) - datetime.timedelta(days=d, minutes=OFFSET)).strftime("%Y-%m-%d") for d in (0, 1, 2, 4)}
+    for day in first["daily_history"]:
+        assert day["minutes"] == (10 if day["date"] in seeded else 0)
+
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(Engine, "before_cursor_execute", capture)
+    try:
+        second = _stats(client)
+    finally:
+        event.remove(Engine, "before_cursor_execute", capture)
+
+    assert second == first
+    study_day_reads = [s for s in statements if "FROM study_days" in s]
+    assert len(study_day_reads) == 1
+    assert not any("study_sessions" in s for s in statements)
+    assert metrics.snapshot()["counters"]["study_rollup.backfills"] == 1
+
+def test_session_updates_match_a_rebuild(client, db, document, history):
+    _stats(client)
+    _stats(client, offset=-600) # A second time zone, kept up to date too
+    started = client.post("/api/analytics/session/start", json={"document_id": document.id, "activity_type": "quiz"}).json()
+    client.post("/api/analytics/session/end", json={"session_id": started["id"]})
+    client.post("/api/analytics/session/start", json={"document_id": document.id, "activity_type": "chat"})
+
+    incremental = [_stats(client), _stats(client, offset=-600)]
+    db.query(models.StudyDay).delete()
+    db.commit()
+    rebuilt = [_stats(client), _stats(client, offset=-600)]
+
+    assert incremental == rebuilt
+    assert incremental[0]["activity_breakdown"] == {"flashcards": 3, "quiz": 2, "chat": 1}
+
+def test_deleting_a_document_drops_its_study_time(client, db, user, document, history):
+    assert _stats(client)["total_minutes"] == 40
+
+    assert client.delete(f"/api/documents/{document.id}").status_code == 200
+
+    assert _stats(client)["total_minutes"] == 0
+
+def test_session_started_during_backfill_is_counted(db, user, document, history, async_sessions, monkeypatch):
+    upsert = study_rollup._upsert
+    async def slow_upsert(*args, **kwargs):
+        await asyncio.sleep(0.1)
+        await upsert(*args, **kwargs)
+    monkeypatch.setattr(study_rollup, "_upsert", slow_upsert)
+
+    async def start():
+        # Lands after the backfill has read the session history
+        await asyncio.sleep(0.05)
+        async with async_sessions() as session:
+            started = models.StudySession(document_id=document.id, activity_type="quiz", start_time=datetime.datetime.utcnow())
+            session.add(started)
+            await study_rollup.record_start(session, user.id, started)
+            await session.commit()
+
+    async def race():
+        async with async_sessions() as session:
+            await asyncio.gather(study_rollup.load_days(session, user.id, OFFSET), start())
+    asyncio.run(race())
+
+    days = db.query(models.StudyDay).filter(models.StudyDay.tz_offset == OFFSET).all()
+    assert sum(day.sessions for day in days) == db.query(models.StudySession).count() == 5
@@ -0,0 +1,82 @@
+import asyncio
+import models
+from services import ai, chunker, summarizer
+from test_jobs import _make_document, _run_pipeline
+
+def _fake_summaries(monkeypatch, fail_on=None):
+    calls = []
+
+    async def fake_section(text):
+        calls.append(("section", text))
+        return "" if fail_on and fail_on in text else f"S{len(calls)}"
+
+    async def fake_combine(summaries):
+        calls.append(("combine", summaries))
+        return "+".join(summaries)
+
+    monkeypatch.setattr(ai, "summarize_section", fake_section)
+    monkeypatch.setattr(ai, "combine_summaries", fake_combine)
+    return calls
+
+def _lecture(tmp_path, name):
+    path = tmp_path / name
+    path.write_text("\n\n".join(f"Topic {i} of {name}: " + "enzymes lower activation energy. " * 30 for i in range(12)), encoding="utf-8")
+    return path
+
+def test_sections_are_summarized_then_combined(db, user, tmp_path, monkeypatch):
+    calls = _fake_summaries(monkeypatch)
+    async def fake_category(text):
+        calls.append(("category", text))
+        return "Biology"
+    monkeypatch.setattr(ai, "suggest_category", fake_category)
+    monkeypatch.setattr(chunker, "CHUNK_TOKENS", 100)
+    monkeypatch.setattr(chunker, "CHUNK_OVERLAP_TOKENS", 0)
+    monkeypatch.setattr(summarizer, "SUMMARY_SECTION_TOKENS", 300)
+    monkeypatch.setattr(summarizer, "SUMMARY_MERGE_FANOUT", 3)
+    document = _make_document(db, user, _lecture(tmp_path, "enzymes-hierarchy.txt"))
+
+    job = _run_pipeline(db, document)
+
+    assert job.status == "succeeded"
+    sections = [arg for kind, arg in calls if kind == "section"]
+    combines = [arg for kind, arg in calls if kind == "combine"]
+    assert len(sections) > 3
+    # Sections cover the text in order, without repeating it
+    chunks = chunker.get_chunks(db, document)
+    text = (tmp_path / "enzymes-hierarchy.txt").read_text(encoding="utf-8")
+    assert "".join(sections) == text[chunks[0].start_offset:chunks[-1].end_offset]
+    assert all(len(group) <= 3 for group in combines)
+    assert document.summary.count("S") == len(sections)
+    # Categorization reads the summary rather than the text
+    assert calls[-1] == ("category", document.summary)
+
+def test_failed_section_leaves_no_summary(db, user, tmp_path, monkeypatch):
+    _fake_summaries(monkeypatch, fail_on="Topic 5")
+    monkeypatch.setattr(summarizer, "SUMMARY_SECTION_TOKENS", 300)
+    document = _make_document(db, user, _lecture(tmp_path, "enzymes-failure.txt"))
+    chunker.ensure_chunks(db, document)
+
+    assert asyncio.run(summarizer.summarize_document(db, document)) == ""
+
+def test_chat_uses_summary_as_overview(client, db, user, tmp_path, monkeypatch):
+    path = tmp_path / "photosynthesis.txt"
+    path.write_text("Chlorophyll absorbs light in the thylakoid membranes.\n", encoding="utf-8")
+    document = models.Document(
+        filename=path.name, file_path=str(path), file_type="TXT", user_id=user.id,
+        summary="Photosynthesis turns light into chemical energy."
+    )
+    db.add(document)
+    db.commit()
+    seen = {}
+
+    async def fake_chat(messages, context_text, overview_text="", usage=None, summary_text=""):
+        seen.update(context=context_text, overview=overview_text)
+        return "Light."
+    monkeypatch.setattr(ai, "generate_chat_response", fake_chat)
+
+    response = client.post(f"/api/chat/send/{document.id}", json={"role": "user", "content": "Where is chlorophyll?"})
+
+    assert response.status_code == 200
+    assert seen["overview"] == "Photosynthesis turns light into chemical energy."
+    # Passages are still retrieved from the full text
+    assert "thylakoid" in seen["context"]
@@ -0,0 +1,65 @@
+import asyncio
+import models
+from services import ai, parser, text_store
+
+def _make_document(db, user, tmp_path, content="Photosynthesis converts light into energy."):
+    path = tmp_path / "notes.txt"
+    path.write_text(content, encoding="utf-8")
+    document = models.Document(
+        filename="notes.txt",
+        file_path=str(path),
+        file_type="TXT",
+        user_id=user.id
+    )
+    db.add(document)
+    db.commit()
+    return document
+
+def test_text_is_parsed_once(db, user, tmp_path, monkeypatch):
+    document = _make_document(db, user, tmp_path)
+
+    calls = []
+    original = parser.extract_text
+    def counting_extract(file_path, file_type):
+        calls.append(file_path)
+        return original(file_path, file_type)
+    monkeypatch.setattr(parser, "extract_text", counting_extract)
+
+    first = text_store.get_text(db, document)
+    second = text_store.get_text(db, document)
+
+    assert first == second == "Photosynthesis converts light into energy."
+    assert len(calls) == 1
+    assert document.content_hash == text_store.hash_file(document.file_path)
+
+def test_stale_parser_version_is_reparsed(db, user, tmp_path, monkeypatch):
+    document = _make_document(db, user, tmp_path)
+    text_store.get_text(db, document)
+
+    monkeypatch.setattr(parser, "PARSER_VERSION", parser.PARSER_VERSION + 1)
+    assert text_store.get_text(db, document)
+
+    versions = [row.parser_version for row in db.query(models.ExtractedText).all()]
+    assert versions == [parser.PARSER_VERSION]
+
+def test_request_path_parses_off_the_event_loop(client, db, user, tmp_path, monkeypatch):
+    document = _make_document(db, user, tmp_path)
+
+    loops = []
+    original = parser.extract_text
+    def recording_extract(file_path, file_type):
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)
+        return original(file_path, file_type)
+    monkeypatch.setattr(parser, "extract_text", recording_extract)
+    async def no_cards(*args, **kwargs):
+        return []
+    monkeypatch.setattr(ai, "generate_flashcards", no_cards)
+
+    assert client.post(f"/api/study/flashcards/{document.id}").status_code == 200
+
+    assert loops == [None]
+    db.refresh(document)
+    assert document.content_hash == text_store.hash_file(document.file_path)
@@ -88,7 +88,7 @@ const ChatInterface = ({ documentId, documentTitle, onClose }) => {
         setMessages(prev => [...prev, tempUserMsg]);
 
         try {
-            const response = await authenticatedFetch(`/api/chat/send/${documentId}`, {
+            const response = await authenticatedFetch(`/api/chat/stream/${documentId}`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -100,8 +100,35 @@ const ChatInterface = ({ documentId, documentTitle, onClose }) => {
             });
 
             if (response.ok) {
-                const aiMsg = await response.json();
-                setMessages(prev => [...prev, aiMsg]);
+                // Show the reply as it streams in, then swap in the saved message
+                const updateStreamingMessage = (update) => setMessages(prev => (
+                    prev.some(msg => msg.streaming)
+                        ? prev.map(msg => msg.streaming ? update(msg) : msg)
+                        : [...prev, update({ role: 'assistant', content: '', timestamp: new Date().toISOString(), streaming: true })]
+                ));
+
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                while (true) {
+                    const { done, value } = await reader.read();
+                    if (done) break;
+                    buffer += decoder.decode(value, { stream: true });
+
+                    // Server-sent events are separated by a blank line
+                    const events = buffer.split('\n\n');
+                    buffer = events.pop();
+                    for (const block of events) {
+                        const lines = block.split('\n');
+                        const event = lines.find(line => line.startsWith('event: '))?.slice(7);
+                        const data = JSON.parse(lines.find(line => line.startsWith('data: '))?.slice(6) || '{}');
+                        if (event === 'token') {
+                            updateStreamingMessage(msg => ({ ...msg, content: msg.content + data.text }));
+                        } else if (event === 'done' && data.message) {
+                            updateStreamingMessage(() => data.message);
+                        }
+                    }
+                }
             } else {
                 console.error('Failed to send message');
                 // Remove optimistic message or show error
@@ -162,7 +189,7 @@ const ChatInterface = ({ documentId, documentTitle, onClose }) => {
                         </div>
                     ))}
 
-                    {loading && (
+                    {loading && !messages.some(msg => msg.streaming) && (
                         <div className="flex justify-start">
                             <div className="bg-white border border-gray-200 rounded-2xl rounded-bl-none px-4 py-3 shadow-sm">
                                 <div className="flex space-x-2">
@@ -16,11 +16,20 @@ const DocumentList = ({ refreshTrigger }) => {
     // Flashcard Configuration Modal State
     const [flashcardConfig, setFlashcardConfig] = useState(null); // { docId: 1 }
     const [flashcardCount, setFlashcardCount] = useState(5);
+    const [wholeDocument, setWholeDocument] = useState(false);
 
     useEffect(() => {
         fetchDocuments();
     }, [refreshTrigger]);
 
+    // Poll while any upload is still being processed in the background
+    useEffect(() => {
+        const inProgress = documents.some(doc => doc.status === 'pending' || doc.status === 'processing');
+        if (!inProgress) return;
+        const timer = setTimeout(fetchDocuments, 2000);
+        return () => clearTimeout(timer);
+    }, [documents]);
+
     const fetchDocuments = async () => {
         try {
             const response = await authenticatedFetch('/api/documents/');
@@ -47,7 +56,7 @@ const DocumentList = ({ refreshTrigger }) => {
 
         setGeneratingState({ docId, type: 'flashcards' });
         try {
-            const response = await authenticatedFetch(`/api/study/flashcards/${docId}?num_cards=${flashcardCount}`, {
+            const response = await authenticatedFetch(`/api/study/flashcards/${docId}?num_cards=${flashcardCount}${wholeDocument ? '&mode=coverage' : ''}`, {
                 method: 'POST'
             });
             if (response.ok) {
@@ -217,11 +226,15 @@ const DocumentList = ({ refreshTrigger }) => {
                                             className="text-xs text-gray-500 cursor-pointer hover:text-blue-600"
                                             onClick={() => handleUpdateCategory(doc.id, doc.category)}
                                         >
-                                            {doc.category} • {new Date(doc.upload_date).toLocaleDateString()}
+                                            {doc.status === 'pending' || doc.status === 'processing' ? 'Processing…' :
+                                                doc.status === 'failed' ? 'Processing failed' : doc.category} • {new Date(doc.upload_date).toLocaleDateString()}
                                         </p>
                                     </div>
                                 </div>
                             </div>
+                            {doc.summary && (
+                                <p className="mt-3 text-xs text-gray-600 line-clamp-3" title={doc.summary}>{doc.summary}</p>
+                            )}
                             <div className="mt-4 flex space-x-2">
                                 <button
                                     onClick={() => setActiveChat({ id: doc.id, title: doc.filename })}
@@ -312,6 +325,15 @@ const DocumentList = ({ refreshTrigger }) => {
                                 <option value={10}>10 Cards</option>
                                 <option value={15}>15 Cards</option>
                             </select>
+                            <label className="flex items-center mt-3 text-sm text-gray-700">
+                                <input
+                                    type="checkbox"
+                                    checked={wholeDocument}
+                                    onChange={(e) => setWholeDocument(e.target.checked)}
+                                    className="mr-2"
+                                />
+                                Cover the whole document
+                            </label>
                         </div>
 
                         <div className="flex justify-end space-x-3">